@@ -10,6 +10,8 @@ from app.api.controllers.task import TaskControllerInternal, TaskControllerPubli
 from app.api.controllers.result import ResultControllerInternal, ResultControllerPublic
 from app.api.controllers.image import ImageControllerInternal, ImageControllerPublic
 from app.api.controllers.gcp import GCPControllerInternal, GCPControllerPublic
+from app.api.controllers.sse import SSEControllerInternal
+from app.api.controllers.node import NodeControllerInternal
 from app.api.sse import sse_router
 
 
@@ -29,5 +31,7 @@ def create_api() -> NinjaExtraAPI:
         ImageControllerPublic,
         GCPControllerInternal,
         GCPControllerPublic,
+        SSEControllerInternal,
+        NodeControllerInternal,
     )
     return api
@@ -7,4 +7,4 @@ class ApiConfig(AppConfig):
     verbose_name = "API"
 
     def ready(self):
-        pass
+        from app.api import signals  # noqa: F401
@@ -1,7 +1,12 @@
 import hmac
 import hashlib
+from uuid import UUID
 from django.http import HttpRequest
 from django.conf import settings
+from ninja.security import APIKeyQuery
+from ninja_jwt.exceptions import TokenError
+
+from app.api.constants.token import DatasetToken
 
 
 class NodeODMServiceAuth:
@@ -20,3 +25,16 @@ class NodeODMServiceAuth:
 
         expected = self.generate_hmac_signature(self.HMAC_MESSAGE)
         return hmac.compare_digest(signature, expected)
+
+
+class NodeODMDatasetApiKeyAuth(APIKeyQuery):
+    param_name = "token"
+
+    def authenticate(self, request: HttpRequest, token: str):
+        try:
+            validated_token = DatasetToken(token)
+        except TokenError:
+            return False
+
+        setattr(request, "dataset_task_uuid", UUID(validated_token["task_uuid"]))
+        return True
@@ -158,6 +158,116 @@ class ODMProcessingStage(ChoicesMixin, StrEnum):
         except KeyError:
             return []
 
+    def through(self, end: ODMProcessingStage) -> List[ODMProcessingStage]:
+        """Stages from this one to ``end``, both included."""
+        stages = list(type(self))
+        return stages[stages.index(self) : stages.index(end) + 1]
+
+    @classmethod
+    def execution_plan(
+        cls, coalesce: bool = True
+    ) -> List[Tuple[ODMProcessingStage, ODMProcessingStage]]:
+        """
+        ``(rerun-from, end-with)`` stages of the NodeODM runs processing a
+        task. Coalesced runs keep going until a stage with results users
+        need, so results are still ingested once that stage is done.
+        """
+        plan, start = [], None
+        for stage in cls:
+            start = start or stage
+            if not coalesce or stage.stage_results or stage.next_stage is None:
+                plan.append((start, stage))
+                start = None
+        return plan
+
+    def run_end(self, coalesce: bool = True) -> ODMProcessingStage:
+        """Last stage of the planned run this stage belongs to."""
+        return next(
+            end
+            for start, end in self.execution_plan(coalesce)
+            if self in start.through(end)
+        )
+
+
+class IllegalTransitionError(ValueError):
+    pass
+
+
+class StageChange(StrEnum):
+    SAME = auto()  # The step stays
+    NEXT_RUN = auto()  # The step becomes the start of the next run
+    LAST_RUN = auto()  # The step stays, and its run is the last one
+
+
+_RUN_ENDED = {
+    ODMTaskStatus.QUEUED: StageChange.NEXT_RUN,
+    ODMTaskStatus.FINISHING: StageChange.LAST_RUN,
+    ODMTaskStatus.FAILED: StageChange.SAME,
+}
+
+# Status -> status it may move to -> how the step may change meanwhile.
+# A run can end (webhook) whenever NodeODM may still be processing it.
+TASK_TRANSITIONS: Dict[ODMTaskStatus, Dict[ODMTaskStatus, StageChange]] = {
+    ODMTaskStatus.QUEUED: {
+        ODMTaskStatus.RUNNING: StageChange.SAME,
+        ODMTaskStatus.CANCELLING: StageChange.SAME,
+        **_RUN_ENDED,
+    },
+    ODMTaskStatus.RUNNING: {
+        ODMTaskStatus.PAUSING: StageChange.SAME,
+        ODMTaskStatus.CANCELLING: StageChange.SAME,
+        **_RUN_ENDED,
+    },
+    ODMTaskStatus.PAUSING: {
+        ODMTaskStatus.PAUSED: StageChange.SAME,
+        ODMTaskStatus.CANCELLING: StageChange.SAME,
+        **_RUN_ENDED,
+    },
+    ODMTaskStatus.PAUSED: {
+        ODMTaskStatus.RESUMING: StageChange.SAME,
+        ODMTaskStatus.CANCELLING: StageChange.SAME,
+        ODMTaskStatus.FAILED: StageChange.SAME,
+    },
+    ODMTaskStatus.RESUMING: {
+        ODMTaskStatus.RUNNING: StageChange.SAME,
+        ODMTaskStatus.CANCELLING: StageChange.SAME,
+        **_RUN_ENDED,
+    },
+    ODMTaskStatus.CANCELLING: {
+        ODMTaskStatus.CANCELLED: StageChange.SAME,
+        ODMTaskStatus.FAILED: StageChange.SAME,
+    },
+    ODMTaskStatus.FINISHING: {
+        ODMTaskStatus.COMPLETED: StageChange.SAME,
+        ODMTaskStatus.FAILED: StageChange.SAME,
+    },
+    ODMTaskStatus.COMPLETED: {},
+    ODMTaskStatus.FAILED: {},
+    ODMTaskStatus.CANCELLED: {},
+}
+
+
+def check_transition(
+    status: ODMTaskStatus,
+    step: ODMProcessingStage,
+    to_status: ODMTaskStatus,
+    to_step: ODMProcessingStage,
+    coalesce: bool = True,
+) -> None:
+    """Raise ``IllegalTransitionError`` unless ``TASK_TRANSITIONS`` allows it."""
+    change = TASK_TRANSITIONS[status].get(to_status)
+    next_run = step.run_end(coalesce).next_stage
+    allowed = {
+        None: False,
+        StageChange.SAME: to_step == step,
+        StageChange.NEXT_RUN: next_run is not None and to_step == next_run,
+        StageChange.LAST_RUN: next_run is None and to_step == step,
+    }[change]
+    if not allowed:
+        raise IllegalTransitionError(
+            f"Task cannot go from {status} ({step}) to {to_status} ({to_step})"
+        )
+
 
 ODM_QUALITY_OPTION_MAPPING: Dict[
     str, Dict[str, Dict[str, str | int | float | bool]]
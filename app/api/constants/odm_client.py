@@ -1,31 +1,287 @@
 from __future__ import annotations
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Set, Tuple
 from uuid import UUID
+import requests
+from loguru import logger
 from pyodm import Node
+from pyodm.api import Task
+from pyodm.exceptions import NodeConnectionError, NodeResponseError, NodeServerError
+from pyodm.utils import MultipartEncoder, options_to_json
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
 from app.api.auth.nodeodm import NodeODMServiceAuth
 
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
+
+
+def call_route(method: str, url: str) -> str:
+    """``GET /task/{uuid}/info``: the call with task uuids folded away."""
+    return f"{method} {UUID_PATTERN.sub('{uuid}', url)}"
+
+
+class NodeODMCallStats:
+    """
+    Latency of NodeODM calls made by this process, per route.
+
+    Counters are reset each time a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, route: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            stats = self._routes.setdefault(
+                route, {"calls": 0, "errors": 0, "total": 0.0, "max": 0.0}
+            )
+            stats["calls"] += 1
+            stats["errors"] += failed
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            routes, self._routes = self._routes, {}
+        return {
+            route: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "latency_ms_avg": stats["total"] * 1000 / stats["calls"],
+                "latency_ms_max": stats["max"] * 1000,
+            }
+            for route, stats in routes.items()
+        }
+
+
+class NodeODMSessionPool:
+    """
+    Keep-alive HTTP sessions to NodeODM nodes, shared by the whole process.
+
+    There is one ``requests.Session`` per node, whose connection pool holds
+    at most ``NODEODM_HTTP_POOL_SIZE`` connections; threads asking for more
+    wait for a free one, which bounds the concurrency towards each node.
+    Sessions are dropped when the process forks (Celery prefork workers),
+    so children never share sockets with their parent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sessions: Dict[str, requests.Session] = {}
+        self.stats = NodeODMCallStats()
+
+    def session(self, node: str) -> requests.Session:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._sessions = {}
+                self.stats = NodeODMCallStats()
+            session = self._sessions.get(node)
+            if session is None:
+                session = self._sessions[node] = self._create_session()
+            return session
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+    @staticmethod
+    def _create_session() -> requests.Session:
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.NODEODM_HTTP_POOL_SIZE,
+            pool_block=True,
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+_session_pool = NodeODMSessionPool()
+
+
+def get_session_pool() -> NodeODMSessionPool:
+    return _session_pool
+
 
 class NodeODMClient(Node):
-    def __init__(self, uuid: UUID, *args, **kwargs):
+    """
+    ``pyodm.Node`` bound to one task, talking over the process' pooled
+    keep-alive sessions. ``timeout`` is the read timeout; connecting is
+    bounded separately by ``NODEODM_CONNECT_TIMEOUT_SECONDS``.
+    """
+
+    def __init__(self, uuid: Optional[UUID], *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.uuid = uuid
 
     @staticmethod
-    def for_task(uuid: UUID, timeout: int = 30) -> NodeODMClient:
-        node = Node.from_url(settings.NODEODM_URL, timeout)
+    def for_task(
+        uuid: UUID, timeout: Optional[float] = None, node_url: Optional[str] = None
+    ) -> NodeODMClient:
+        """Client for the task on ``node_url``, ``NODEODM_URL`` by default."""
+        return NodeODMClient.for_node(node_url or settings.NODEODM_URL, uuid, timeout)
+
+    @staticmethod
+    def for_node(
+        url: str, uuid: Optional[UUID] = None, timeout: Optional[float] = None
+    ) -> NodeODMClient:
+        node = Node.from_url(url, timeout or settings.NODEODM_READ_TIMEOUT_SECONDS)
         return NodeODMClient(uuid, node.host, node.port, node.token, node.timeout)
 
+    @property
+    def session(self) -> requests.Session:
+        return get_session_pool().session(f"{self.host}:{self.port}")
+
+    @property
+    def timeouts(self) -> Tuple[float, float]:
+        return settings.NODEODM_CONNECT_TIMEOUT_SECONDS, self.timeout
+
+    @property
+    def webhook_url(self) -> str:
+        expected_signature = NodeODMServiceAuth.generate_hmac_signature(
+            NodeODMServiceAuth.HMAC_MESSAGE
+        )
+        return f"{settings.NINJAODM_BASE_URL}/api/internal/tasks/{self.uuid}/webhooks/odm?signature={expected_signature}"
+
+    def get(self, url: str, query={}, **kwargs):
+        return self._request(
+            "GET",
+            url,
+            self.session.get,
+            self.url(url, query),
+            timeout=self.timeouts,
+            **kwargs,
+        )
+
     def post(self, url: str, data=None, headers={}):
+        headers = dict(headers)
         if url in ["/task/new/init", "/task/new"]:
             headers["set-uuid"] = str(self.uuid)
-        return super().post(url, data=data, headers=headers)
+        return self._request(
+            "POST",
+            url,
+            self.session.post,
+            self.url(url),
+            data=data,
+            headers=headers,
+            timeout=self.timeouts,
+        )
+
+    def _request(self, method: str, url: str, send, *args, **kwargs):
+        """Send a call through the pooled session, timing it per route."""
+        pool = get_session_pool()
+        route = call_route(method, url)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = self._handle_response(method, send(*args, **kwargs))
+            failed = False
+            return result
+        except json.decoder.JSONDecodeError as e:
+            raise NodeServerError(str(e))
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            raise NodeConnectionError(str(e))
+        finally:
+            elapsed = time.perf_counter() - started
+            pool.stats.record(route, elapsed, failed)
+            if elapsed >= settings.NODEODM_SLOW_CALL_SECONDS:
+                logger.warning(f"Slow NodeODM call {route} took {elapsed:.2f}s")
+            else:
+                logger.debug(f"NodeODM call {route} took {elapsed * 1000:.0f}ms")
+
+    @staticmethod
+    def _handle_response(method: str, res: requests.Response):
+        # Same status and error handling as ``Node.get`` / ``Node.post``
+        if res.status_code == 401:
+            raise NodeResponseError("Unauthorized. Do you need to set a token?")
+        if method == "GET" and res.status_code not in [200, 403, 206]:
+            raise NodeServerError(f"Unexpected status code: {res.status_code}")
+        if method == "POST" and res.status_code not in [200, 403]:
+            raise NodeServerError(res.status_code)
+
+        if "application/json" in res.headers.get("Content-Type", ""):
+            result = res.json()
+            if "error" in result:
+                raise NodeResponseError(result["error"])
+            return result
+        return res
 
     def create_task(self, *args, **kwargs):
-        expected_signature = NodeODMServiceAuth.generate_hmac_signature(
-            NodeODMServiceAuth.HMAC_MESSAGE
+        kwargs["webhook"] = self.webhook_url
+        return super().create_task(*args, **kwargs)
+
+    def list_tasks(self) -> Set[str]:
+        """``/task/list``: uuids of every task the node has."""
+        return {task["uuid"] for task in self.get("/task/list")}
+
+    # =====================
+    # Chunked task creation
+    # =====================
+
+    def init_task(self, name: str, options: dict) -> None:
+        """``/task/new/init``: register the task so files can be uploaded."""
+        encoder = MultipartEncoder(
+            fields={
+                "name": name,
+                "options": options_to_json(options),
+                "webhook": self.webhook_url,
+            }
         )
-        kwargs["webhook"] = (
-            f"{settings.NINJAODM_BASE_URL}/api/internal/tasks/{self.uuid}/webhooks/odm?signature={expected_signature}"
+        result = self.post(
+            "/task/new/init",
+            data=encoder,
+            headers={"Content-Type": encoder.content_type},
+        )
+        if not isinstance(result, dict) or "uuid" not in result:
+            raise NodeServerError(f"Invalid response from /task/new/init: {result}")
+
+    def upload_file(self, name: str, path: str) -> None:
+        """``/task/new/upload``: stream one file to an initialized task."""
+        content_type = mimetypes.guess_type(name)[0] or "image/jpg"
+        with open(path, "rb") as f:
+            encoder = MultipartEncoder(fields={"images": (name, f, content_type)})
+            result = self.post(
+                f"/task/new/upload/{self.uuid}",
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+            )
+        if not isinstance(result, dict) or not result.get("success"):
+            raise NodeServerError(f"Failed upload of {name}: {result}")
+
+    def commit_task(self) -> Task:
+        """``/task/new/commit``: start processing the uploaded files."""
+        return self.handle_task_new_response(
+            self.post(f"/task/new/commit/{self.uuid}", headers={})
+        )
+
+    def create_task_from_zipurl(self, zipurl: str, options: dict, name: str) -> Task:
+        """``/task/new`` with a ``zipurl``: NodeODM downloads the dataset."""
+        encoder = MultipartEncoder(
+            fields={
+                "name": name,
+                "options": options_to_json(options),
+                "zipurl": zipurl,
+                "webhook": self.webhook_url,
+            }
+        )
+        return self.handle_task_new_response(
+            self.post(
+                "/task/new",
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+            )
         )
-        return super().create_task(*args, **kwargs)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+from django.conf import settings
+from django_redis import get_redis_connection
+from loguru import logger
+from pyodm import Node
+from pyodm.exceptions import NodeConnectionError, OdmError
+
+from app.api.constants.odm_client import NodeODMClient
+
+DRAINED_NODES_KEY = "nodeodm_drained_nodes"
+
+
+def node_info_key(node_id: str) -> str:
+    return f"nodeodm_node_{node_id}_info"
+
+
+def node_assigned_key(node_id: str) -> str:
+    """Tasks sent to the node since its ``/info`` was last cached."""
+    return f"nodeodm_node_{node_id}_assigned"
+
+
+def node_failures_key(node_id: str) -> str:
+    return f"nodeodm_node_{node_id}_failures"
+
+
+def node_circuit_key(node_id: str) -> str:
+    """Set while the node's circuit is open."""
+    return f"nodeodm_node_{node_id}_circuit_open"
+
+
+def node_id(url: str) -> str:
+    """``host:port`` of a node URL, without its token."""
+    node = Node.from_url(url)
+    return f"{node.host}:{node.port}"
+
+
+class NoNodeAvailableError(NodeConnectionError):
+    pass
+
+
+class NodeCircuitOpenError(NodeConnectionError):
+    def __init__(self, node_id: str, retry_after: int):
+        super().__init__(f"NodeODM node {node_id} is down, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class NodeCircuitBreaker:
+    """
+    Stops sending work to a node once ``NODEODM_CIRCUIT_FAILURE_THRESHOLD``
+    operations on it failed for transient reasons within
+    ``NODEODM_CIRCUIT_WINDOW_SECONDS``.
+
+    The circuit then stays open for ``NODEODM_CIRCUIT_COOLDOWN_SECONDS``.
+    After that the next operation tries the node: success closes the
+    circuit, while a failure opens it again at once, as the failures are
+    still counted.
+    """
+
+    def __init__(self, url: str):
+        self.id = node_id(url)
+        self.conn = get_redis_connection("default")
+
+    def check(self) -> None:
+        """Raise ``NodeCircuitOpenError`` while the circuit is open."""
+        retry_after = self.conn.ttl(node_circuit_key(self.id))
+        if retry_after > 0:
+            raise NodeCircuitOpenError(self.id, retry_after)
+
+    def record_failure(self) -> None:
+        key = node_failures_key(self.id)
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.incr(key)
+        pipe.expire(key, settings.NODEODM_CIRCUIT_WINDOW_SECONDS)
+        failures, _ = pipe.execute()
+
+        if failures >= settings.NODEODM_CIRCUIT_FAILURE_THRESHOLD:
+            self.conn.set(
+                node_circuit_key(self.id),
+                failures,
+                ex=settings.NODEODM_CIRCUIT_COOLDOWN_SECONDS,
+            )
+            logger.warning(
+                f"NodeODM node {self.id} failed {failures} times, "
+                f"pausing calls for {settings.NODEODM_CIRCUIT_COOLDOWN_SECONDS}s"
+            )
+
+    def record_success(self) -> None:
+        self.conn.delete(node_failures_key(self.id), node_circuit_key(self.id))
+
+
+class NodeState(NamedTuple):
+    id: str
+    url: str
+    healthy: bool
+    drained: bool
+    checked_at: float
+    info: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    assigned: int = 0
+    circuit_open: bool = False
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.drained and not self.circuit_open
+
+    @property
+    def load(self) -> float:
+        """Queued and running tasks per CPU core."""
+        queued = (self.info or {}).get("task_queue_count") or 0
+        cores = (self.info or {}).get("cpu_cores") or 1
+        return (queued + self.assigned) / cores
+
+    def accepts(self, image_count: int) -> bool:
+        max_images = (self.info or {}).get("max_images")
+        return max_images is None or image_count <= max_images
+
+
+class NodeODMRegistry:
+    """
+    The NodeODM nodes of ``NODEODM_URLS`` (``NODEODM_URL`` when unset).
+
+    Each node's ``/info`` is cached in Redis for
+    ``NODEODM_NODE_INFO_TTL_SECONDS``; a node whose ``/info`` fails is
+    cached as unhealthy for as long. Drained nodes, and nodes whose circuit
+    is open (see ``NodeCircuitBreaker``), finish the tasks they have but
+    receive no new ones.
+    """
+
+    def __init__(self):
+        self.conn = get_redis_connection("default")
+
+    @property
+    def urls(self) -> List[str]:
+        return settings.NODEODM_URLS or [settings.NODEODM_URL]
+
+    def url_for(self, id: str) -> Optional[str]:
+        return next((url for url in self.urls if node_id(url) == id), None)
+
+    def states(self, refresh: bool = False) -> List[NodeState]:
+        urls = self.urls
+        ids = [node_id(url) for url in urls]
+        cached = (
+            [None] * len(ids) if refresh else self.conn.mget(map(node_info_key, ids))
+        )
+        assigned = self.conn.mget(map(node_assigned_key, ids))
+        circuits = self.conn.mget(map(node_circuit_key, ids))
+        drained = {member.decode() for member in self.conn.smembers(DRAINED_NODES_KEY)}
+
+        # Nodes missing from the cache are probed concurrently
+        stale = [url for url, info in zip(urls, cached) if info is None]
+        probed: Dict[str, Dict[str, Any]] = {}
+        if stale:
+            with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                probed = dict(zip(stale, executor.map(self._probe, stale)))
+
+        return [
+            NodeState(
+                id=key,
+                url=url,
+                drained=key in drained,
+                circuit_open=circuit is not None,
+                # A fresh probe already counts the tasks assigned before it
+                assigned=0 if url in probed else int(count or 0),
+                **(probed[url] if url in probed else json.loads(info)),
+            )
+            for key, url, info, count, circuit in zip(
+                ids, urls, cached, assigned, circuits
+            )
+        ]
+
+    def select(self, image_count: int = 0) -> NodeState:
+        """
+        Pick the least loaded available node able to take ``image_count``
+        images, preferring the one with more free memory on ties.
+        """
+        candidates = [
+            state
+            for state in self.states()
+            if state.available and state.accepts(image_count)
+        ]
+        if not candidates:
+            raise NoNodeAvailableError("No NodeODM node available")
+
+        state = min(
+            candidates,
+            key=lambda s: (s.load, -((s.info or {}).get("available_memory") or 0)),
+        )
+        # Counted until the next /info refresh, so tasks scheduled meanwhile
+        # do not all land on the same node
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.incr(node_assigned_key(state.id))
+        pipe.expire(node_assigned_key(state.id), self._ttl)
+        pipe.execute()
+        return state
+
+    def drain(self, id: str) -> None:
+        self.conn.sadd(DRAINED_NODES_KEY, id)
+
+    def undrain(self, id: str) -> None:
+        self.conn.srem(DRAINED_NODES_KEY, id)
+
+    # =====================
+    # Private helpers
+    # =====================
+
+    @property
+    def _ttl(self) -> int:
+        return max(1, round(settings.NODEODM_NODE_INFO_TTL_SECONDS))
+
+    def _probe(self, url: str) -> Dict[str, Any]:
+        probe: Dict[str, Any] = {"checked_at": time.time()}
+        try:
+            info = NodeODMClient.for_node(url).info()
+            probe.update(
+                healthy=True,
+                info={
+                    "version": info.version,
+                    "task_queue_count": info.task_queue_count,
+                    "available_memory": info.available_memory,
+                    "total_memory": info.total_memory,
+                    "cpu_cores": info.cpu_cores,
+                    "max_images": info.max_images,
+                    "max_parallel_tasks": info.max_parallel_tasks,
+                    "engine": info.engine,
+                    "engine_version": info.engine_version,
+                },
+            )
+        except OdmError as e:
+            logger.warning(f"NodeODM node {node_id(url)} is unhealthy: {e}")
+            probe.update(healthy=False, error=str(e))
+
+        key = node_id(url)
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.set(node_info_key(key), json.dumps(probe), ex=self._ttl)
+        pipe.delete(node_assigned_key(key))
+        pipe.execute()
+        return probe
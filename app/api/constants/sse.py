@@ -0,0 +1,8 @@
+from enum import auto, unique, StrEnum
+
+
+@unique
+class SSEOverflowPolicy(StrEnum):
+    DROP_OLDEST = auto()
+    COALESCE = auto()
+    DISCONNECT = auto()
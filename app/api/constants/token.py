@@ -1,8 +1,10 @@
 from __future__ import annotations
 from datetime import timedelta
+from django.conf import settings
 from ninja_jwt.tokens import Token
 
 from app.api.models.result import ODMTaskResult
+from app.api.models.task import ODMTask
 
 
 class ShareToken(Token):
@@ -21,3 +23,20 @@ class ShareToken(Token):
         token["result_uuid"] = str(result.uuid)
         token["shared_by_user_id"] = result.workspace.user_id
         return token
+
+
+class DatasetToken(Token):
+    """Lets NodeODM download a task's dataset through ``zipurl``."""
+
+    token_type: str = "dataset"
+    lifetime: timedelta = timedelta(minutes=30)
+
+    @classmethod
+    def for_task(cls, odm_task: ODMTask) -> DatasetToken:
+        token = cls()
+        token.set_exp(
+            from_time=token.current_time,
+            lifetime=timedelta(minutes=settings.NODEODM_DATASET_TOKEN_LIFETIME_MINUTES),
+        )
+        token["task_uuid"] = str(odm_task.uuid)
+        return token
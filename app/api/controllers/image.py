@@ -1,6 +1,9 @@
 from typing import List
 from uuid import UUID
-from django.http import FileResponse
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
 from ninja import Query
 from ninja_extra import (
     ModelControllerBase,
@@ -11,8 +14,9 @@ from ninja_extra import (
 
 from app.api.auth.service import ServiceHMACAuth
 from app.api.auth.user import ServiceUserJWTAuth
-from app.api.models.image import Image
+from app.api.models.image import Image, PREVIEW_CONTENT_TYPES
 from app.api.permissions.image import IsImageOwner
+from app.api.schemas.core import MessageSchema
 from app.api.schemas.image import ImageResponse, ImageFilterSchema
 from app.api.services.image import ImageModelService
 from app.api.permissions.core import IsAuthorizedService
@@ -62,6 +66,40 @@ class ImageControllerPublic(ModelControllerBase):
             filename=image.image_file.name,
         )
 
+    @http_get(
+        "/{uuid}/preview",
+        response={202: MessageSchema, 404: MessageSchema},
+        operation_id="previewImage",
+    )
+    def preview_image_file(self, request, uuid: UUID, size: int = Query(..., gt=0)):
+        image = self.get_object_or_exception(self.model_config.model, uuid=uuid)
+        if image.is_thumbnail:
+            # Only source images get previews, a render would never come
+            return 404, {"message": "Thumbnails have no previews"}
+        name = self.service.get_preview(image, size)
+        if name is None:
+            retry_after = settings.IMAGE_PREVIEW_RETRY_AFTER_SECONDS
+            self.context.response["Retry-After"] = str(retry_after)
+            return 202, {"message": "Preview is being rendered"}
+
+        # Previews of an image never change, so the name is a strong validator
+        etag = f'"{image.uuid}-{name.rsplit("/", 1)[-1]}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                default_storage.open(name, "rb"),
+                content_type=PREVIEW_CONTENT_TYPES[settings.IMAGE_PREVIEW_FORMAT],
+            )
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=settings.IMAGE_PREVIEW_MAX_AGE_SECONDS,
+            immutable=True,
+        )
+        return response
+
 
 @api_controller(
     "/internal/images",
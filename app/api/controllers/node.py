@@ -0,0 +1,38 @@
+from typing import List, Literal
+from ninja_extra import api_controller, http_get, http_post
+from injector import inject
+
+from app.api.auth.service import ServiceHMACAuth
+from app.api.schemas.core import MessageSchema
+from app.api.schemas.node import NodeResponseInternal
+from app.api.services.node import NodeService
+
+
+@api_controller(
+    "/internal/nodes",
+    auth=ServiceHMACAuth(),
+    tags=["node", "internal"],
+)
+class NodeControllerInternal:
+    @inject
+    def __init__(self, node_service: NodeService):
+        self.node_service = node_service
+
+    @http_get(
+        "/",
+        response=List[NodeResponseInternal],
+        operation_id="listNodesInternal",
+    )
+    def list_nodes(self, refresh: bool = False):
+        return self.node_service.list_nodes(refresh=refresh)
+
+    @http_post(
+        "/{node_id}/{action}",
+        response={200: NodeResponseInternal, 404: MessageSchema},
+        operation_id="callNodeActionInternal",
+    )
+    def node_action(self, node_id: str, action: Literal["drain", "undrain"]):
+        node = self.node_service.set_drained(node_id, drained=action == "drain")
+        if node is None:
+            return 404, {"message": f"Node {node_id} not found"}
+        return node
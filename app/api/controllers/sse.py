@@ -0,0 +1,25 @@
+from ninja_extra import api_controller, http_get
+from injector import inject
+
+from app.api.auth.service import ServiceHMACAuth
+from app.api.schemas.sse import SSEMetricsResponseInternal
+from app.api.services.sse import SSEMetricsService
+
+
+@api_controller(
+    "/internal/sse",
+    auth=ServiceHMACAuth(),
+    tags=["sse", "internal"],
+)
+class SSEControllerInternal:
+    @inject
+    def __init__(self, metrics_service: SSEMetricsService):
+        self.metrics_service = metrics_service
+
+    @http_get(
+        "/metrics",
+        response=SSEMetricsResponseInternal,
+        operation_id="getSSEMetricsInternal",
+    )
+    def metrics(self):
+        return self.metrics_service.get_metrics()
@@ -1,5 +1,8 @@
 from uuid import UUID
-from typing import List, Literal
+from typing import List, Literal, get_args
+from django.http import StreamingHttpResponse
+from django.urls import register_converter
+from django.urls.converters import StringConverter
 from ninja import Query, Body
 from ninja_extra import (
     api_controller,
@@ -8,13 +11,17 @@ from ninja_extra import (
     http_post,
     http_get,
 )
-from app.api.constants.odm import NodeODMTaskStatus
 from app.api.auth.service import ServiceHMACAuth
 from app.api.auth.user import ServiceUserJWTAuth
-from app.api.auth.nodeodm import NodeODMServiceAuth
+from app.api.auth.nodeodm import NodeODMServiceAuth, NodeODMDatasetApiKeyAuth
 from app.api.models.task import ODMTask
 from app.api.models.workspace import Workspace
-from app.api.permissions.task import IsTaskOwner, IsTaskStateTerminal, CanCreateTask
+from app.api.permissions.task import (
+    IsTaskOwner,
+    IsTaskStateTerminal,
+    CanCreateTask,
+    IsDatasetTokenForTask,
+)
 from app.api.permissions.core import IsAuthorizedService
 from app.api.permissions.workspace import IsWorkspaceOwner
 from app.api.schemas.task import (
@@ -23,10 +30,22 @@ from app.api.schemas.task import (
     ODMTaskWebhookInternal,
     TaskResponse,
     TaskFilterSchema,
+    TaskTransitionResponse,
 )
 from app.api.schemas.core import MessageSchema
 from app.api.services.task import TaskModelService
 
+TaskAction = Literal["pause", "resume", "cancel"]
+
+
+class TaskActionConverter(StringConverter):
+    """Matches only task action names, so sibling paths never route to actions"""
+
+    regex = "|".join(get_args(TaskAction))
+
+
+register_converter(TaskActionConverter, "task_action")
+
 
 @api_controller(
     "/tasks",
@@ -74,16 +93,23 @@ class TaskControllerPublic(ModelControllerBase):
         ).select_related("workspace")
         return filters.filter(queryset)
 
+    @http_get(
+        "/{uuid}/transitions",
+        response=List[TaskTransitionResponse],
+        operation_id="listTaskTransitions",
+    )
+    def list_task_transitions(self, request, uuid: UUID):
+        task = self.get_object_or_exception(ODMTask, uuid=uuid)
+        return task.transitions.all()
+
     @http_post(
-        "/{uuid}/{action}",
+        "/{uuid}/{task_action:action}",
         response=model_config.retrieve_schema,
         operation_id="callTaskAction",
     )
-    def task_action(
-        self, request, uuid: UUID, action: Literal["pause", "resume", "cancel"]
-    ):
+    def task_action(self, request, uuid: UUID, action: TaskAction):
         task = self.get_object_or_exception(ODMTask, uuid=uuid)
-        return self.service.action(action, task, self.model_config.update_schema())
+        return self.service.action(action, task)
 
 
 @api_controller(
@@ -119,13 +145,19 @@ class TaskControllerInternal(ModelControllerBase):
         self, request, uuid: UUID, signature: str, data: ODMTaskWebhookInternal
     ):
         task = self.get_object_or_exception(ODMTask, uuid=uuid)
-        match data.status.code:
-            case NodeODMTaskStatus.FAILED:
-                self.service.handle_failure(task)
-            case NodeODMTaskStatus.COMPLETED:
-                self.service.proceed_next_task_step(
-                    task, self.model_config.update_schema()
-                )
-            case _:  # QUEUED, CANCELED, RUNNING (server already handles that)
-                pass
-        return {"message": "ok"}
+        processed = self.service.handle_webhook(task, data)
+        return {"message": "ok" if processed else "duplicate"}
+
+    @http_get(
+        "/{uuid}/dataset.zip",
+        auth=NodeODMDatasetApiKeyAuth(),
+        permissions=[IsDatasetTokenForTask],
+        operation_id="downloadTaskDatasetInternal",
+    )
+    def download_dataset(self, request, uuid: UUID, token: str):
+        task = self.get_object_or_exception(ODMTask, uuid=uuid)
+        response = StreamingHttpResponse(
+            self.service.stream_dataset(task), content_type="application/zip"
+        )
+        response["Content-Disposition"] = f'attachment; filename="{task.uuid}.zip"'
+        return response
@@ -0,0 +1,32 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from app.api.sse.events import collect_events
+
+
+class EventCollectorMiddleware:
+    """
+    Publish the SSE events raised while handling a request in one Redis batch,
+    once their transactions have committed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        with collect_events():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with collect_events(flush=False) as collector:
+            try:
+                return await self.get_response(request)
+            finally:
+                await sync_to_async(collector.flush)()
@@ -1,9 +1,13 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
 from PIL import Image as PILImage
+import hashlib
 import io
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from app.api.models.workspace import Workspace
 from app.api.models.mixins import UUIDPrimaryKeyModelMixin, TimeStampedModelMixin
 
@@ -17,6 +21,65 @@ def dynamic_upload_path(instance, filename):
     return str(Path(base_dir) / str(instance.workspace.uuid) / filename)
 
 
+PREVIEW_CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+# (size, format) of one image rendered by ``render_variants``
+Variant = Tuple[Tuple[int, int], str]
+
+
+def render_variants(path, variants: Sequence[Variant]) -> List[bytes]:
+    """
+    Render several downscaled copies of the image at ``path`` in one pass.
+
+    The image is decoded once: JPEGs in draft mode, i.e. straight at 1/2,
+    1/4 or 1/8 scale, at the largest requested size. Each variant is then
+    shrunk from the next larger one.
+    """
+    results: List[bytes] = [b""] * len(variants)
+    order = sorted(range(len(variants)), key=lambda i: -max(variants[i][0]))
+
+    with PILImage.open(path) as im:
+        im.draft("RGB", variants[order[0]][0])
+        current = im
+        for index in order:
+            size, image_format = variants[index]
+            current = current.copy()
+            current.thumbnail(size)
+            if image_format == "JPEG" and current.mode not in ("RGB", "L"):
+                current = current.convert("RGB")
+
+            buf = io.BytesIO()
+            current.save(buf, format=image_format, **_save_options(image_format))
+            results[index] = buf.getvalue()
+
+    return results
+
+
+def render_thumbnail(path, size: Tuple[int, int] = (256, 256)) -> bytes:
+    """Render a PNG thumbnail of the image at ``path``."""
+    return render_variants(path, [(size, "PNG")])[0]
+
+
+def thumbnail_key(path, size: Tuple[int, int]) -> str:
+    """Hash of the source bytes and the thumbnail size."""
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    digest.update(f"{size[0]}x{size[1]}".encode())
+    return digest.hexdigest()
+
+
+class ThumbnailBatch(NamedTuple):
+    created: List["Image"]
+    skipped: int
+    hits: int
+
+
+def _save_options(image_format: str) -> Dict[str, int]:
+    if image_format in PREVIEW_CONTENT_TYPES:
+        return {"quality": settings.IMAGE_PREVIEW_QUALITY}
+    return {}
+
+
 class Image(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
     workspace = models.ForeignKey(
         Workspace, on_delete=models.CASCADE, related_name="images"
@@ -24,6 +87,8 @@ class Image(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
     name = models.CharField(max_length=50)
     image_file = models.ImageField(upload_to=dynamic_upload_path)
     is_thumbnail = models.BooleanField(default=False)
+    # Thumbnails only: ``thumbnail_key`` of the source image and size
+    source_hash = models.CharField(max_length=64, blank=True, db_index=True)
 
     class Meta:
         ordering = ["name"]
@@ -41,22 +106,152 @@ class Image(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
     def make_thumbnail(self, size=(256, 256)) -> "Image":
         """
         Create a thumbnail from this image.
-        Returns a new Image object with is_thumbnail=True.
+        Returns the Image object with is_thumbnail=True, which is only
+        regenerated when the source bytes or the size changed.
         """
         if self.is_thumbnail:
             return self
 
-        thumb = Image.objects.create(
-            workspace=self.workspace,
-            name=self.name,
+        Image.bulk_make_thumbnails([self], size)
+        return Image.objects.get(
+            workspace=self.workspace, name=self.file_name, is_thumbnail=True
+        )
+
+    @property
+    def file_name(self) -> str:
+        return self.name or Path(self.image_file.name).name
+
+    @property
+    def previews_dir(self) -> str:
+        return str(
+            Path(settings.PREVIEWS_DIR_NAME) / str(self.workspace_id) / str(self.uuid)
+        )
+
+    def preview_name(self, size: int) -> str:
+        extension = settings.IMAGE_PREVIEW_FORMAT.lower()
+        return str(Path(self.previews_dir) / f"{size}.{extension}")
+
+    def preview_size(self, requested: int) -> int:
+        """Smallest configured preview size covering ``requested`` pixels."""
+        sizes = sorted(settings.IMAGE_PREVIEW_SIZES)
+        return next((size for size in sizes if size >= requested), sizes[-1])
+
+    def make_previews(self) -> None:
+        """Render every configured preview size from a single decode."""
+        sizes = settings.IMAGE_PREVIEW_SIZES
+        variants = [((size, size), settings.IMAGE_PREVIEW_FORMAT) for size in sizes]
+        self._save_previews(sizes, render_variants(self.image_file.path, variants))
+
+    def preview_names(self) -> List[str]:
+        return [self.preview_name(size) for size in settings.IMAGE_PREVIEW_SIZES]
+
+    def _save_previews(self, sizes: Iterable[int], contents: Iterable[bytes]):
+        for size, content in zip(sizes, contents):
+            name = self.preview_name(size)
+            default_storage.delete(name)
+            default_storage.save(name, ContentFile(content))
+
+    def _copy_previews(self, source: "Image") -> bool:
+        """Copy the previews of ``source``; False if it does not have them."""
+        names = source.preview_names()
+        if not all(default_storage.exists(name) for name in names):
+            return False
+        contents = []
+        for name in names:
+            with default_storage.open(name, "rb") as f:
+                contents.append(f.read())
+        self._save_previews(settings.IMAGE_PREVIEW_SIZES, contents)
+        return True
+
+    @classmethod
+    def bulk_make_thumbnails(
+        cls, images: Iterable["Image"], size=(256, 256)
+    ) -> ThumbnailBatch:
+        """
+        Create thumbnails for many images with a single INSERT.
+
+        Thumbnails are keyed by ``thumbnail_key``, so an image whose
+        thumbnail is up to date is skipped without being decoded, and an
+        image with the same content as an already thumbnailed one (a hit)
+        gets a copy of that thumbnail and of its source's previews.
+        Everything else has its thumbnail and every preview size rendered
+        from one decode; outdated thumbnails are replaced. Thumbnails that a
+        concurrent run inserted first are counted as skipped.
+        """
+        images = [image for image in images if not image.is_thumbnail]
+        keys = [thumbnail_key(image.image_file.path, size) for image in images]
+        existing = cls.objects.filter(
+            Q(name__in={image.file_name for image in images})
+            | Q(source_hash__in=set(keys)),
+            workspace__in={image.workspace_id for image in images},
             is_thumbnail=True,
         )
+        by_name = {(thumb.workspace_id, thumb.name): thumb for thumb in existing}
+        by_key = {(thumb.workspace_id, thumb.source_hash): thumb for thumb in existing}
+        # Thumbnails are named after their source image, which has the previews
+        sources = cls.objects.filter(
+            name__in={thumb.name for thumb in by_key.values()},
+            workspace__in={image.workspace_id for image in images},
+            is_thumbnail=False,
+        )
+        by_source = {(source.workspace_id, source.name): source for source in sources}
+        preview_sources = {
+            (workspace_id, key): by_source.get((workspace_id, thumb.name))
+            for (workspace_id, key), thumb in by_key.items()
+        }
+        preview_sizes = settings.IMAGE_PREVIEW_SIZES
+        variants = [(size, "PNG")] + [
+            ((preview_size, preview_size), settings.IMAGE_PREVIEW_FORMAT)
+            for preview_size in preview_sizes
+        ]
 
-        # Open original image
-        with PILImage.open(self.image_file.path) as im:
-            im.thumbnail(size)
-            buf = io.BytesIO()
-            im.save(buf, format="PNG")
-            thumb.image_file.save(self.name, ContentFile(buf.getvalue()), save=True)
+        thumbs, outdated, skipped, hits = {}, [], 0, set()
+        for image, key in zip(images, keys):
+            current = by_name.get((image.workspace_id, image.file_name))
+            if current is not None and current.source_hash == key:
+                skipped += 1
+                continue
+            if current is not None:
+                outdated.append(current)
+
+            thumb = cls(
+                workspace=image.workspace,
+                name=image.file_name,
+                is_thumbnail=True,
+                source_hash=key,
+            )
+            source = by_key.get((image.workspace_id, key))
+            if source is not None:
+                with source.image_file.open("rb") as f:
+                    content = f.read()
+                preview_source = preview_sources.get((image.workspace_id, key))
+                if preview_source is None or not image._copy_previews(preview_source):
+                    image.make_previews()
+                hits.add(thumb.pk)
+            else:
+                content, *previews = render_variants(image.image_file.path, variants)
+                image._save_previews(preview_sizes, previews)
+            thumb.image_file.save(image.file_name, ContentFile(content), save=False)
+            by_name[(image.workspace_id, image.file_name)] = thumb
+            by_key[(image.workspace_id, key)] = thumb
+            preview_sources[(image.workspace_id, key)] = image
+            thumbs[(image.workspace_id, image.file_name)] = thumb
+
+        with transaction.atomic():
+            # Their files go once this commits (see app.api.signals)
+            cls.objects.filter(pk__in=[thumb.pk for thumb in outdated]).delete()
+            # Overlapping runs race to insert the same thumbnails
+            cls.objects.bulk_create(list(thumbs.values()), ignore_conflicts=True)
+            inserted = set(
+                cls.objects.filter(
+                    pk__in=[thumb.pk for thumb in thumbs.values()]
+                ).values_list("pk", flat=True)
+            )
+
+        created = [thumb for thumb in thumbs.values() if thumb.pk in inserted]
+        for thumb in thumbs.values():
+            if thumb.pk not in inserted:
+                thumb.image_file.delete(save=False)
+                skipped += 1
 
-        return thumb
+        return ThumbnailBatch(created, skipped, len(hits & inserted))
@@ -1,3 +1,7 @@
+import errno
+import hashlib
+import os
+from typing import NamedTuple, Tuple
 from django.db import models
 from django.conf import settings
 from pathlib import Path
@@ -6,6 +10,24 @@ from app.api.models.mixins import UUIDPrimaryKeyModelMixin, TimeStampedModelMixi
 from app.api.constants.odm import ODMTaskResultType
 from app.api.models.workspace import Workspace
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ``FICLONE`` ioctl: share the source's extents (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# The filesystem cannot share the file: cross-device, no reflink support
+_UNSUPPORTED_LINK_ERRORS = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EPERM,
+    errno.EMLINK,
+}
+
 
 def result_file_upload_path(instance, filename):
     return str(
@@ -13,6 +35,67 @@ def result_file_upload_path(instance, filename):
     )
 
 
+class IngestedFile(NamedTuple):
+    method: str
+    size: int
+    sha256: str
+
+
+def ingest_file(src: Path, dest: Path) -> IngestedFile:
+    """
+    Place ``src`` at ``dest`` without copying its bytes when possible.
+
+    Tries a reflink (copy-on-write clone), then, only in ``hardlink`` mode,
+    a hardlink, and falls back to a streamed copy with a
+    ``RESULTS_COPY_BUFFER_SIZE`` buffer. The size and SHA-256 are taken
+    during the copy, or with a single read of the linked file otherwise.
+    """
+    placers = {
+        "reflink": [("reflink", _reflink)],
+        # A hardlink is the same inode as NodeODM's output, so a rerun that
+        # writes the file in place changes the stored result too
+        "hardlink": [("reflink", _reflink), ("hardlink", os.link)],
+        "copy": [],
+    }[settings.RESULTS_INGEST_MODE]
+    for method, place in placers:
+        try:
+            place(src, dest)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_LINK_ERRORS:
+                raise
+            continue
+        with open(dest, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256")
+        return IngestedFile(method, dest.stat().st_size, digest.hexdigest())
+
+    return IngestedFile("copy", *_copy(src, dest))
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported")
+    with open(src, "rb") as fsrc, open(dest, "xb") as fdest:
+        try:
+            fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdest.close()
+            dest.unlink()
+            raise
+
+
+def _copy(src: Path, dest: Path) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray(settings.RESULTS_COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(src, "rb", buffering=0) as fsrc, open(dest, "xb") as fdest:
+        while read := fsrc.readinto(buffer):
+            digest.update(view[:read])
+            fdest.write(view[:read])
+            size += read
+    return size, digest.hexdigest()
+
+
 class ODMTaskResult(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
     result_type = models.CharField(
         choices=ODMTaskResultType.choices(),
@@ -23,6 +106,8 @@ class ODMTaskResult(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Mode
         on_delete=models.CASCADE,
     )
     file = models.FileField(upload_to=result_file_upload_path)
+    size = models.BigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
 
     class Meta:
         ordering = ["-created_at"]
@@ -33,3 +118,21 @@ class ODMTaskResult(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Mode
     @property
     def odm_result_type(self) -> ODMTaskResultType:
         return ODMTaskResultType(self.result_type)
+
+    def ingest(self, path: Path, filename: str) -> IngestedFile:
+        """
+        Store the file at ``path`` as this result's file, named after
+        ``filename``, without saving the instance.
+        """
+        storage = self.file.storage
+        name = storage.get_available_name(
+            self.file.field.generate_filename(self, filename)
+        )
+        dest = Path(storage.path(name))
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        ingested = ingest_file(path, dest)
+        self.file.name = name
+        self.size = ingested.size
+        self.sha256 = ingested.sha256
+        return ingested
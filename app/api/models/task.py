@@ -1,11 +1,17 @@
 import random
 import string
-from django.db import models
+from typing import Optional
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from pathlib import Path
 
 from app.api.models.mixins import UUIDPrimaryKeyModelMixin, TimeStampedModelMixin
-from app.api.constants.odm import ODMTaskStatus, ODMProcessingStage
+from app.api.constants.odm import (
+    ODMTaskStatus,
+    ODMProcessingStage,
+    check_transition,
+)
 from app.api.models.workspace import Workspace
 
 
@@ -52,7 +58,14 @@ class ODMTask(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
         choices=ODMProcessingStage.choices(),
         default=ODMProcessingStage.DATASET.value,
     )
+    # Stage NodeODM last reported running, within the run starting at step
+    run_step = models.CharField(
+        choices=ODMProcessingStage.choices(), blank=True, default=""
+    )
     options = models.JSONField(default=dict, blank=True)
+    # NodeODM node running the task, chosen when it is submitted
+    node_url = models.CharField(max_length=255, blank=True, default="")
+    status_changed_at = models.DateTimeField(default=timezone.now)
     workspace = models.ForeignKey(
         Workspace,
         related_name="tasks",
@@ -79,3 +92,95 @@ class ODMTask(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
 
     def get_current_step_options(self) -> dict:
         return self.options.get(self.step, {})
+
+    @property
+    def run_end(self) -> ODMProcessingStage:
+        """Last stage of the NodeODM run starting at ``step``."""
+        return self.odm_step.run_end(coalesce=settings.NODEODM_COALESCE_STAGES)
+
+    def check_transition(
+        self, status: ODMTaskStatus, step: Optional[ODMProcessingStage] = None
+    ) -> None:
+        """Raise ``IllegalTransitionError`` if the task cannot move there."""
+        check_transition(
+            self.odm_status,
+            self.odm_step,
+            status,
+            step or self.odm_step,
+            coalesce=settings.NODEODM_COALESCE_STAGES,
+        )
+
+    def transition(
+        self, status: ODMTaskStatus, step: Optional[ODMProcessingStage] = None
+    ) -> bool:
+        """
+        Move the task to ``status`` (and ``step``) with a conditional
+        UPDATE, and log the move. Returns False, changing nothing, when the
+        task no longer has the status and step it was read with.
+        """
+        step = step or self.odm_step
+        self.check_transition(status, step)
+        # A pause keeps the stage its run got to, a new run starts over
+        run_step = self.run_step if step.value == self.step else ""
+
+        now = timezone.now()
+        with transaction.atomic():
+            moved = ODMTask.objects.filter(
+                uuid=self.uuid, status=self.status, step=self.step
+            ).update(
+                status=status.value,
+                step=step.value,
+                run_step=run_step,
+                status_changed_at=now,
+            )
+            if not moved:
+                return False
+            ODMTaskTransition.objects.create(
+                task=self,
+                from_status=self.status,
+                from_step=self.step,
+                to_status=status.value,
+                to_step=step.value,
+                duration=(now - self.status_changed_at).total_seconds(),
+                created_at=now,
+            )
+
+        self.status, self.step, self.status_changed_at = status.value, step.value, now
+        self.run_step = run_step
+        return True
+
+    def get_run_options(self) -> dict:
+        """
+        NodeODM options running every stage up to ``run_end``, from the stage
+        the run got to (``run_step``) or else from ``step``, so a resumed
+        coalesced run does not redo the stages it already finished.
+        """
+        start = ODMProcessingStage(self.run_step or self.step)
+        options = {}
+        for stage in start.through(self.run_end):
+            options.update(self.options.get(stage, {}))
+        return {
+            **options,
+            "rerun-from": start.value,
+            "end-with": self.run_end.value,
+        }
+
+
+class ODMTaskTransition(UUIDPrimaryKeyModelMixin, TimeStampedModelMixin, models.Model):
+    task = models.ForeignKey(
+        ODMTask,
+        related_name="transitions",
+        on_delete=models.CASCADE,
+    )
+    from_status = models.CharField(choices=ODMTaskStatus.choices())
+    from_step = models.CharField(choices=ODMProcessingStage.choices())
+    to_status = models.CharField(choices=ODMTaskStatus.choices())
+    to_step = models.CharField(choices=ODMProcessingStage.choices())
+    # Seconds the task spent in its previous status and step
+    duration = models.FloatField()
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self) -> str:
+        return f"ODMTask {self.task_id}: {self.from_status} -> {self.to_status}"
@@ -20,3 +20,8 @@ class IsTaskStateTerminal(BaseObjectPermission):
         if not obj.odm_status.is_terminal():
             raise HttpError(409, "Task cannot be deleted while it is running")
         return True
+
+
+class IsDatasetTokenForTask(BaseObjectPermission):
+    def has_object_permission(self, request, controller, obj: ODMTask):
+        return obj.uuid == getattr(request, "dataset_task_uuid", None)
@@ -0,0 +1,27 @@
+from typing import Optional
+from ninja import Schema
+
+
+class NodeInfo(Schema):
+    version: str
+    task_queue_count: Optional[int] = None
+    available_memory: Optional[int] = None
+    total_memory: Optional[int] = None
+    cpu_cores: Optional[int] = None
+    max_images: Optional[int] = None
+    max_parallel_tasks: Optional[int] = None
+    engine: str
+    engine_version: str
+
+
+class NodeResponseInternal(Schema):
+    id: str
+    healthy: bool
+    drained: bool
+    circuit_open: bool
+    available: bool
+    load: float
+    assigned: int
+    checked_at: float
+    info: Optional[NodeInfo] = None
+    error: Optional[str] = None
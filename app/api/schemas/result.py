@@ -1,4 +1,4 @@
-from typing import Optional, Annotated
+from typing import List, Optional, Annotated
 from uuid import UUID
 from datetime import datetime
 from pydantic import Field
@@ -18,7 +18,7 @@ class ResultResponse(ModelSchema):
 
     class Meta:
         model = ODMTaskResult
-        fields = ["uuid", "created_at"]
+        fields = ["uuid", "created_at", "size", "sha256"]
 
 
 class ResultFilterSchema(FilterSchema):
@@ -42,3 +42,13 @@ class ResultDeletedSSEData(ResultBaseSSEData):
 
 class ResultCreatedSSEData(ResultBaseSSEData):
     workspace_name: str
+
+
+class ResultBulkCreatedItem(ResultBaseSSEData):
+    result_type: ODMTaskResultType
+
+
+class ResultBulkCreatedSSEData(Schema):
+    uuid: UUID  # task the results come from
+    workspace_name: str
+    results: List[ResultBulkCreatedItem]
@@ -1,4 +1,4 @@
-from typing import TypeVar, Generic, Union, Literal
+from typing import TypeVar, Generic, Dict, List, Optional, Union, Literal
 from ninja import Schema
 from pydantic import BaseModel
 
@@ -7,9 +7,14 @@ from .workspace import (
     WorkspaceUpdatedSSEData,
     WorkspaceDeletedSSEData,
     WorkspaceImagesUploadedSSEData,
+    WorkspaceThumbnailsCreatedSSEData,
 )
 from .image import ImageDeletedSSEData
-from .result import ResultDeletedSSEData, ResultCreatedSSEData
+from .result import (
+    ResultDeletedSSEData,
+    ResultCreatedSSEData,
+    ResultBulkCreatedSSEData,
+)
 from .task import (
     TaskCreatedSSEData,
     TaskUpdatedSSEData,
@@ -21,6 +26,8 @@ from .task import (
     TaskStartedSSEData,
     TaskCompletedSSEData,
     TaskFailedSSEData,
+    TaskProgressSSEData,
+    TaskUploadProgressSSEData,
 )
 from .gcp import GPCCreatedSSEData, GCPUpdatedSSEData, GCPDeletedSSEData
 
@@ -37,14 +44,26 @@ class HeartbeatEvent(Schema):
     event: Literal["heartbeat"] = "heartbeat"
 
 
+class ResyncSSEData(Schema):
+    reason: Literal["overflow", "trimmed"]
+    last_event_id: Optional[str] = None
+
+
+class ResyncEvent(Schema):
+    event: Literal["resync"] = "resync"
+    data: ResyncSSEData
+
+
 _EVENTS = {
     "workspace:created": WorkspaceCreatedSSEData,
     "workspace:updated": WorkspaceUpdatedSSEData,
     "workspace:deleted": WorkspaceDeletedSSEData,
     "workspace:images-uploaded": WorkspaceImagesUploadedSSEData,
+    "workspace:thumbnails-created": WorkspaceThumbnailsCreatedSSEData,
     "image:deleted": ImageDeletedSSEData,
     "task-result:deleted": ResultDeletedSSEData,
     "task-result:created": ResultCreatedSSEData,
+    "task-result:bulk-created": ResultBulkCreatedSSEData,
     "task:created": TaskCreatedSSEData,
     "task:updated": TaskUpdatedSSEData,
     "task:deleted": TaskDeletedSSEData,
@@ -55,6 +74,8 @@ _EVENTS = {
     "task:started": TaskStartedSSEData,
     "task:completed": TaskCompletedSSEData,
     "task:failed": TaskFailedSSEData,
+    "task:progress": TaskProgressSSEData,
+    "task:upload-progress": TaskUploadProgressSSEData,
     "gcp:created": GPCCreatedSSEData,
     "gcp:updated": GCPUpdatedSSEData,
     "gcp:deleted": GCPDeletedSSEData,
@@ -62,8 +83,33 @@ _EVENTS = {
 
 ServerSideEvent = Union[
     HeartbeatEvent,
+    ResyncEvent,
     *(
         SSEWrapper[Literal[event_name], payload]
         for event_name, payload in _EVENTS.items()
     ),
 ]
+
+
+class SSEWorkerMetrics(Schema):
+    worker: str
+    reported_at: float
+    clients: int
+    users: Dict[str, int]
+    dropped: int
+    high_water: int
+    delivered: int
+    latency_ms_avg: Optional[float] = None
+    latency_ms_max: Optional[int] = None
+
+
+class SSEMetricsResponseInternal(Schema):
+    workers: List[SSEWorkerMetrics]
+    clients: int
+    users: Dict[str, int]
+    published: int
+    publish_rate: float
+    window_seconds: int
+    delivered: int
+    latency_ms_avg: Optional[float] = None
+    latency_ms_max: Optional[int] = None
@@ -1,10 +1,10 @@
-from typing import Optional, Any, Dict, Annotated
+from typing import Optional, Any, Dict, List, Annotated
 from uuid import UUID
 from ninja import ModelSchema, Schema, FilterSchema, FilterLookup
 from pydantic import Field, BaseModel
 from datetime import datetime
 
-from app.api.models.task import ODMTask
+from app.api.models.task import ODMTask, ODMTaskTransition
 from app.api.constants.odm import (
     ODMTaskStatus,
     ODMProcessingStage,
@@ -55,6 +55,24 @@ class TaskResponse(ModelSchema):
         ]
 
 
+class TaskTransitionResponse(ModelSchema):
+    from_status: ODMTaskStatus
+    from_step: ODMProcessingStage
+    to_status: ODMTaskStatus
+    to_step: ODMProcessingStage
+
+    class Meta:
+        model = ODMTaskTransition
+        fields = [
+            "from_status",
+            "from_step",
+            "to_status",
+            "to_step",
+            "duration",
+            "created_at",
+        ]
+
+
 class TaskFilterSchema(FilterSchema):
     status: Annotated[Optional[ODMTaskStatus], FilterLookup("status")] = None
     step: Annotated[Optional[ODMProcessingStage], FilterLookup("step")] = None
@@ -100,3 +118,18 @@ class TaskCompletedSSEData(TaskBaseSSEData): ...
 
 class TaskFailedSSEData(TaskBaseSSEData):
     error: str | None = None
+
+
+class TaskUploadProgressSSEData(Schema):
+    uuid: UUID
+    uploaded: int
+    total: int
+    bytes: int
+    bytes_per_second: float
+
+
+class TaskProgressSSEData(Schema):
+    uuid: UUID
+    progress: float
+    offset: int
+    output: List[str]
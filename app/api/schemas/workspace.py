@@ -59,3 +59,12 @@ class WorkspaceDeletedSSEData(WorkspaceBaseSSEData): ...
 class WorkspaceImagesUploadedSSEData(Schema):
     uuid: UUID
     uploaded: int
+
+
+class WorkspaceThumbnailsCreatedSSEData(Schema):
+    uuid: UUID
+    created: int
+    skipped: int
+    hits: int
+    chunk: int
+    chunks: int
@@ -21,6 +21,7 @@ class GCPModelService(ModelService):
             instance.image.workspace.user_id,
             "gcp:created",
             {"uuid": str(instance.uuid), "label": instance.label},
+            workspace_uuid=instance.image.workspace.uuid,
         )
         return instance
 
@@ -37,13 +38,19 @@ class GCPModelService(ModelService):
             instance.image.workspace.user_id,
             "gcp:updated",
             {"uuid": str(instance.uuid), "label": instance.label},
+            workspace_uuid=instance.image.workspace.uuid,
         )
         return instance
 
     def delete(self, instance):
         payload = {"uuid": str(instance.uuid), "label": instance.label}
         instance.delete()
-        emit_event(instance.image.workspace.user_id, "gcp:deleted", payload)
+        emit_event(
+            instance.image.workspace.user_id,
+            "gcp:deleted",
+            payload,
+            workspace_uuid=instance.image.workspace.uuid,
+        )
 
     def queryset_to_geojson(self, queryset):
         qs = queryset.select_related("image").values(
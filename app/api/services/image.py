@@ -1,15 +1,42 @@
-from pathlib import Path
+from typing import Optional
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django_redis import get_redis_connection
 from ninja_extra import ModelService
 
 from app.api.sse import emit_event
+from app.api.tasks.workspace import make_image_previews
+
+
+def preview_render_key(instance) -> str:
+    """Set while a render of the image's previews is queued."""
+    return f"image_{instance.uuid}_previews_pending"
 
 
 class ImageModelService(ModelService):
     def delete(self, instance, **kwargs):
         payload = {"uuid": str(instance.uuid), "name": instance.name}
         instance.delete()
-        file_path = Path(instance.image_file.path)
-        if file_path.exists():
-            file_path.unlink()
 
-        emit_event(instance.workspace.user_id, "image:deleted", payload)
+        emit_event(
+            instance.workspace.user_id,
+            "image:deleted",
+            payload,
+            workspace_uuid=instance.workspace.uuid,
+        )
+
+    def get_preview(self, instance, size: int) -> Optional[str]:
+        """
+        Storage name of the preview covering ``size`` pixels, or None while
+        it is rendered. Images uploaded before previews existed get them
+        rendered by a worker on first request.
+        """
+        name = instance.preview_name(instance.preview_size(size))
+        if default_storage.exists(name):
+            return name
+
+        conn = get_redis_connection("default")
+        key = preview_render_key(instance)
+        if conn.set(key, 1, nx=True, ex=settings.IMAGE_PREVIEW_RENDER_TTL_SECONDS):
+            make_image_previews.delay(instance.uuid)
+        return None
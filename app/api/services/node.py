@@ -0,0 +1,18 @@
+from typing import List, Optional
+
+from app.api.constants.odm_nodes import NodeODMRegistry, NodeState
+
+
+class NodeService:
+    def list_nodes(self, refresh: bool = False) -> List[NodeState]:
+        return NodeODMRegistry().states(refresh=refresh)
+
+    def set_drained(self, node_id: str, drained: bool) -> Optional[NodeState]:
+        registry = NodeODMRegistry()
+        if registry.url_for(node_id) is None:
+            return None
+        if drained:
+            registry.drain(node_id)
+        else:
+            registry.undrain(node_id)
+        return next(state for state in registry.states() if state.id == node_id)
@@ -15,4 +15,9 @@ class ResultModelService(ModelService):
         if file_path.exists():
             file_path.unlink()
 
-        emit_event(instance.workspace.user_id, "task-result:deleted", payload)
+        emit_event(
+            instance.workspace.user_id,
+            "task-result:deleted",
+            payload,
+            workspace_uuid=instance.workspace.uuid,
+        )
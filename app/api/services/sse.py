@@ -0,0 +1,56 @@
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from app.api.sse.encoding import decode_json
+from app.api.sse.metrics import WORKERS_KEY, published_key
+
+
+class SSEMetricsService:
+    def get_metrics(self) -> Dict[str, Any]:
+        conn = get_redis_connection("default")
+        now = time.time()
+        window = settings.SSE_METRICS_WINDOW_SECONDS
+        stale_after = settings.SSE_METRICS_INTERVAL_SECONDS * 3
+
+        workers, stale = [], []
+        for worker, snapshot in conn.hgetall(WORKERS_KEY).items():
+            snapshot = decode_json(snapshot)
+            if now - snapshot["reported_at"] > stale_after:
+                stale.append(worker)
+            else:
+                workers.append(snapshot)
+        if stale:
+            conn.hdel(WORKERS_KEY, *stale)
+
+        second = int(now)
+        counts = conn.mget([published_key(s) for s in range(second - window, second)])
+        published = sum(int(count) for count in counts if count)
+
+        users: Counter = Counter()
+        for snapshot in workers:
+            users.update(snapshot["users"])
+
+        reporting = [snapshot for snapshot in workers if snapshot["delivered"]]
+        delivered = sum(snapshot["delivered"] for snapshot in reporting)
+
+        return {
+            "workers": sorted(workers, key=lambda snapshot: snapshot["worker"]),
+            "clients": sum(snapshot["clients"] for snapshot in workers),
+            "users": dict(users),
+            "published": published,
+            "publish_rate": published / window,
+            "window_seconds": window,
+            "delivered": delivered,
+            "latency_ms_avg": (
+                sum(s["latency_ms_avg"] * s["delivered"] for s in reporting) / delivered
+                if delivered
+                else None
+            ),
+            "latency_ms_max": max(
+                (snapshot["latency_ms_max"] for snapshot in reporting), default=None
+            ),
+        }
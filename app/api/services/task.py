@@ -1,7 +1,16 @@
+from contextlib import contextmanager
+from ninja.errors import HttpError
 from ninja_extra import ModelService
+from django.conf import settings
 from django.db import transaction
+from django_redis import get_redis_connection
+from loguru import logger
 
-from app.api.constants.odm import ODMTaskStatus
+from app.api.constants.odm import (
+    IllegalTransitionError,
+    NodeODMTaskStatus,
+    ODMTaskStatus,
+)
 from app.api.sse import emit_event
 from app.api.tasks.task import (
     on_task_create,
@@ -12,6 +21,27 @@ from app.api.tasks.task import (
     on_task_finish,
     on_task_failure,
 )
+from app.api.tasks.submission import stream_dataset_zip
+
+
+def webhook_delivery_key(instance, data) -> str:
+    """
+    Identity of one NodeODM callback. A NodeODM task is restarted for each
+    run, so the step the task is at tells the runs' callbacks apart, even
+    when NodeODM reports the same times for two of them.
+    """
+    return (
+        f"odm_task_{instance.uuid}_webhook_{instance.step}_{data.status.code}"
+        f"_{data.dateCreated}_{data.processingTime}"
+    )
+
+
+@contextmanager
+def conflict_on_illegal_transition():
+    try:
+        yield
+    except IllegalTransitionError as e:
+        raise HttpError(409, str(e)) from e
 
 
 class TaskModelService(ModelService):
@@ -37,6 +67,8 @@ class TaskModelService(ModelService):
                 "status": instance.odm_status,
                 "step": instance.odm_step,
             },
+            workspace_uuid=instance.workspace.uuid,
+            task_uuid=instance.uuid,
         )
         return instance
 
@@ -44,15 +76,7 @@ class TaskModelService(ModelService):
         with transaction.atomic():
             update_instance = super().update(instance, schema, **kwargs)
 
-        emit_event(
-            update_instance.workspace.user_id,
-            "task:updated",
-            {
-                "uuid": str(update_instance.uuid),
-                "status": update_instance.odm_status,
-                "step": update_instance.odm_step,
-            },
-        )
+        self._emit_updated(update_instance)
         return update_instance
 
     def delete(self, instance, **kwargs):
@@ -61,50 +85,105 @@ class TaskModelService(ModelService):
             "status": instance.odm_status,
             "step": instance.odm_step,
         }
-        user_id = instance.workspace.user_id
+        workspace = instance.workspace
         instance.delete()
-        emit_event(user_id, "task:deleted", payload)
+        emit_event(
+            workspace.user_id,
+            "task:deleted",
+            payload,
+            workspace_uuid=workspace.uuid,
+            task_uuid=payload["uuid"],
+        )
 
-    def action(self, action, instance, update_schema):
+    def action(self, action, instance):
         match action:
             case "pause":
-                updated_instance = self.update(
-                    instance, update_schema, status=ODMTaskStatus.PAUSING
-                )
-                on_task_pause.delay(updated_instance.uuid)
+                status, operation = ODMTaskStatus.PAUSING, on_task_pause
             case "resume":
-                updated_instance = self.update(
-                    instance, update_schema, status=ODMTaskStatus.RESUMING
-                )
-                on_task_resume.delay(updated_instance.uuid)
+                status, operation = ODMTaskStatus.RESUMING, on_task_resume
             case "cancel":
-                updated_instance = self.update(
-                    instance, update_schema, status=ODMTaskStatus.CANCELLING
-                )
-                on_task_cancel.delay(updated_instance.uuid)
+                status, operation = ODMTaskStatus.CANCELLING, on_task_cancel
             case _:
                 raise ValueError(f"{self.__class__.__name__} has no '{action}' action!")
 
-        return updated_instance
+        with conflict_on_illegal_transition():
+            if not self._transition(instance, status):
+                raise HttpError(409, "Task changed meanwhile, try again")
+        operation.delay(instance.uuid)
+        return instance
+
+    def handle_webhook(self, instance, data) -> bool:
+        """
+        Act on a NodeODM callback once. Deliveries already seen within
+        ``NODEODM_WEBHOOK_DEDUP_TTL_SECONDS`` are dropped and return False.
+        """
+        conn = get_redis_connection("default")
+        key = webhook_delivery_key(instance, data)
+        if not conn.set(key, 1, nx=True, ex=settings.NODEODM_WEBHOOK_DEDUP_TTL_SECONDS):
+            logger.info(f"Dropped duplicate webhook for task {instance.uuid}")
+            return False
+
+        try:
+            with conflict_on_illegal_transition():
+                match data.status.code:
+                    case NodeODMTaskStatus.FAILED:
+                        self.handle_failure(instance)
+                    case NodeODMTaskStatus.COMPLETED:
+                        self.proceed_next_task_step(instance)
+                    case _:  # QUEUED, CANCELED, RUNNING (server already handles that)
+                        pass
+        except Exception:
+            # Let NodeODM's retry of this delivery through
+            conn.delete(key)
+            raise
+
+        moved_key = webhook_delivery_key(instance, data)
+        if moved_key != key:
+            # A redelivery now finds the task at the step it moved it to
+            conn.set(moved_key, 1, ex=settings.NODEODM_WEBHOOK_DEDUP_TTL_SECONDS)
+        return True
 
-    def proceed_next_task_step(self, instance, update_schema):
-        odm_processing_stage = instance.odm_step.next_stage
+    def proceed_next_task_step(self, instance):
+        odm_processing_stage = instance.run_end.next_stage
         if not odm_processing_stage:
-            updated_instance = self.update(
-                instance,
-                update_schema,
-                status=ODMTaskStatus.FINISHING,
-            )
-            on_task_finish.delay(updated_instance.uuid)
+            if self._transition(instance, ODMTaskStatus.FINISHING):
+                on_task_finish.delay(instance.uuid)
             return
 
-        updated_instance = self.update(
-            instance,
-            update_schema,
-            status=ODMTaskStatus.QUEUED,
-            step=odm_processing_stage,
-        )
-        on_task_nodeodm_webhook.delay(updated_instance.uuid)
+        if self._transition(instance, ODMTaskStatus.QUEUED, odm_processing_stage):
+            on_task_nodeodm_webhook.delay(instance.uuid)
 
     def handle_failure(self, instance):
         on_task_failure.delay(instance.uuid)
+
+    def stream_dataset(self, instance):
+        return stream_dataset_zip(instance)
+
+    # =====================
+    # Private helpers
+    # =====================
+
+    def _transition(self, instance, status, step=None) -> bool:
+        """
+        Move the task through ``ODMTask.transition``; only one of racing
+        callers gets to move it from the status and step it was read with.
+        """
+        if not instance.transition(status, step):
+            logger.info(f"Task {instance.uuid} already moved past {instance.step}")
+            return False
+
+        self._emit_updated(instance)
+        return True
+
+    def _emit_updated(self, instance):
+        emit_event(
+            instance.workspace.user_id,
+            "task:updated",
+            {
+                "uuid": str(instance.uuid),
+                "status": instance.odm_status,
+                "step": instance.odm_step,
+            },
+            workspace_uuid=instance.workspace.uuid,
+            task_uuid=instance.uuid,
+        )
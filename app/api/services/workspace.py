@@ -17,6 +17,7 @@ class WorkspaceModelService(ModelService):
             instance.user_id,
             "workspace:created",
             {"uuid": str(instance.uuid), "name": instance.name},
+            workspace_uuid=instance.uuid,
         )
         return instance
 
@@ -26,13 +27,19 @@ class WorkspaceModelService(ModelService):
             update_instance.user_id,
             "workspace:updated",
             {"uuid": str(instance.uuid), "name": instance.name},
+            workspace_uuid=instance.uuid,
         )
         return update_instance
 
     def delete(self, instance):
         payload = {"uuid": str(instance.uuid), "name": instance.name}
         instance.delete()
-        emit_event(instance.user_id, "workspace:deleted", payload)
+        emit_event(
+            instance.user_id,
+            "workspace:deleted",
+            payload,
+            workspace_uuid=payload["uuid"],
+        )
 
     def save_images(self, instance, image_files: List[UploadedFile]):
         images = []
@@ -49,5 +56,6 @@ class WorkspaceModelService(ModelService):
                 "uuid": str(instance.uuid),
                 "uploaded": len(images),
             },
+            workspace_uuid=instance.uuid,
         )
         return images
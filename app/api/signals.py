@@ -0,0 +1,44 @@
+from contextlib import ExitStack
+from functools import partial
+from typing import List
+from celery.signals import task_prerun, task_postrun
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from app.api.models.image import Image
+from app.api.sse.events import collect_events
+
+_task_event_collectors = {}
+
+
+@task_prerun.connect
+def start_collecting_task_events(task_id, **kwargs):
+    stack = ExitStack()
+    stack.enter_context(collect_events())
+    _task_event_collectors[task_id] = stack
+
+
+@task_postrun.connect
+def flush_task_events(task_id, **kwargs):
+    stack = _task_event_collectors.pop(task_id, None)
+    if stack is not None:
+        stack.close()
+
+
+def _delete_files(names: List[str]):
+    for name in names:
+        default_storage.delete(name)
+
+
+@receiver(post_delete, sender=Image)
+def delete_image_files(sender, instance, **kwargs):
+    """
+    Remove the file and previews of a deleted image, also when its workspace
+    is deleted, once the deletion is committed.
+    """
+    names = [instance.image_file.name]
+    if not instance.is_thumbnail:
+        names += instance.preview_names()
+    transaction.on_commit(partial(_delete_files, names))
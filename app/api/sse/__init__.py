@@ -0,0 +1,25 @@
+from .events import (
+    PendingEvent,
+    EventCollector,
+    collect_events,
+    emit_event,
+    publish_events,
+    user_channel,
+    user_stream,
+)
+from .broker import RedisEventBroker, get_event_broker
+from .stream import redis_event_stream, sse_router
+
+__all__ = [
+    "PendingEvent",
+    "EventCollector",
+    "collect_events",
+    "emit_event",
+    "publish_events",
+    "user_channel",
+    "user_stream",
+    "RedisEventBroker",
+    "get_event_broker",
+    "redis_event_stream",
+    "sse_router",
+]
@@ -0,0 +1,233 @@
+from __future__ import annotations
+import asyncio
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from weakref import WeakKeyDictionary
+from django.conf import settings
+from redis import asyncio as aioredis
+from loguru import logger
+
+from app.api.constants.sse import SSEOverflowPolicy
+from app.api.sse.encoding import encode_json
+from app.api.sse.events import (
+    USER_CHANNEL_PATTERN,
+    EventMessage,
+    channel_user,
+    parse_event_id,
+    user_channel,
+    user_stream,
+)
+from app.api.sse.metrics import WORKERS_KEY, DeliveryStats, worker_id
+from app.api.sse.queue import SubscriberQueue
+
+
+class RedisEventBroker:
+    """
+    Process-wide Redis pub/sub multiplexer.
+
+    Holds a single pattern subscription on ``user_*_events`` and fans incoming
+    messages out to bounded per-connection queues. The Redis connection is
+    opened with the first subscriber and closed when the last one leaves.
+    While connected it periodically reports its connections and delivery
+    stats to Redis for the fleet-wide metrics endpoint.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self):
+        self._redis: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._reporter: Optional[asyncio.Task] = None
+        self.delivery = DeliveryStats()
+        self._lock = asyncio.Lock()
+        self._subscribers: Dict[str, Set[SubscriberQueue]] = defaultdict(set)
+        # Totals carried over from queues that already unsubscribed
+        self._dropped = 0
+        self._high_water = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @property
+    def channel_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def dropped_count(self) -> int:
+        return self._dropped + sum(queue.dropped for queue in self._queues())
+
+    @property
+    def high_water_mark(self) -> int:
+        return max([self._high_water, *(queue.high_water for queue in self._queues())])
+
+    def user_counts(self) -> Dict[str, int]:
+        return {
+            channel_user(channel): len(queues)
+            for channel, queues in self._subscribers.items()
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "worker": worker_id(),
+            "reported_at": time.time(),
+            "clients": self.subscriber_count,
+            "users": self.user_counts(),
+            "dropped": self.dropped_count,
+            "high_water": self.high_water_mark,
+            **self.delivery.snapshot(),
+        }
+
+    async def subscribe(
+        self,
+        user_id: str,
+        maxsize: Optional[int] = None,
+        policy: Optional[SSEOverflowPolicy] = None,
+    ) -> SubscriberQueue:
+        queue = SubscriberQueue(
+            maxsize or settings.SSE_QUEUE_MAXSIZE,
+            SSEOverflowPolicy(policy or settings.SSE_QUEUE_OVERFLOW_POLICY),
+        )
+        async with self._lock:
+            if self._reader is None:
+                await self._connect()
+            self._subscribers[user_channel(user_id)].add(queue)
+        return queue
+
+    async def unsubscribe(self, user_id: str, queue: SubscriberQueue) -> None:
+        async with self._lock:
+            channel = user_channel(user_id)
+            queues = self._subscribers.get(channel)
+            if queues is not None and queue in queues:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[channel]
+
+                self._dropped += queue.dropped
+                self._high_water = max(self._high_water, queue.high_water)
+                if queue.dropped:
+                    logger.warning(
+                        f"SSE subscriber of {user_id} dropped {queue.dropped} events "
+                        f"(queue high-water mark {queue.high_water}/{queue.maxsize})"
+                    )
+
+            if not self._subscribers:
+                await self._disconnect()
+
+    async def replay(
+        self, user_id: str, last_event_id: str
+    ) -> Tuple[List[EventMessage], bool]:
+        """
+        Return the events appended after ``last_event_id``, and whether the
+        stream was trimmed past it so that some of them are lost.
+        """
+        stream = user_stream(user_id)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xrange(stream, count=1)
+            pipe.xread({stream: last_event_id}, count=settings.SSE_STREAM_MAXLEN)
+            oldest, response = await pipe.execute()
+
+        trimmed = bool(oldest) and (
+            parse_event_id(oldest[0][0]) > parse_event_id(last_event_id)
+        )
+        if not response:
+            return [], trimmed
+
+        _, entries = response[0]
+        messages = [
+            EventMessage.from_parts(entry_id, fields[b"header"], fields[b"payload"])
+            for entry_id, fields in entries
+        ]
+        return messages, trimmed
+
+    # =====================
+    # Private helpers
+    # =====================
+
+    async def _connect(self) -> None:
+        self._redis = aioredis.from_url(settings.CACHES["default"]["LOCATION"])
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(USER_CHANNEL_PATTERN)
+        self._reader = asyncio.create_task(self._read())
+        self._reporter = asyncio.create_task(self._report())
+
+    async def _disconnect(self) -> None:
+        reader, reporter = self._reader, self._reporter
+        pubsub, redis = self._pubsub, self._redis
+        self._reader = self._reporter = self._pubsub = self._redis = None
+
+        for task in (reader, reporter):
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if redis is not None:
+            try:
+                await redis.hdel(WORKERS_KEY, worker_id())
+            except Exception:
+                logger.exception("SSE event broker could not retract its metrics")
+        if pubsub is not None:
+            await pubsub.aclose()
+        if redis is not None:
+            await redis.aclose()
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("SSE event broker lost its Redis subscription")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                await self._resubscribe()
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(settings.SSE_METRICS_INTERVAL_SECONDS)
+            try:
+                await self._redis.hset(
+                    WORKERS_KEY, worker_id(), encode_json(self.snapshot())
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("SSE event broker could not report its metrics")
+
+    async def _resubscribe(self) -> None:
+        try:
+            await self._pubsub.aclose()
+        except Exception:
+            pass
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.psubscribe(USER_CHANNEL_PATTERN)
+
+    def _dispatch(self, channel: bytes | str, data: bytes) -> None:
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+        for queue in self._subscribers.get(channel, ()):
+            queue.offer(data)
+
+    def _queues(self) -> Iterator[SubscriberQueue]:
+        for queues in self._subscribers.values():
+            yield from queues
+
+
+_brokers: WeakKeyDictionary[asyncio.AbstractEventLoop, RedisEventBroker] = (
+    WeakKeyDictionary()
+)
+
+
+def get_event_broker() -> RedisEventBroker:
+    """Return the broker bound to the running event loop (one per worker)."""
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = RedisEventBroker()
+    return broker
@@ -0,0 +1,44 @@
+import asyncio
+from typing import Dict, Hashable, Iterable, List
+
+from app.api.sse.events import EventMessage
+
+
+def coalesce_key(message: EventMessage) -> Hashable:
+    """
+    Key events by ``(event type, entity uuid)``; anything without an entity
+    uuid is keyed by its own id and therefore never collapsed.
+    """
+    if not message.uuid:
+        return message.id
+    return message.event, message.uuid
+
+
+def coalesce(messages: Iterable[EventMessage]) -> List[EventMessage]:
+    """
+    Collapse superseded events into the latest one per key.
+
+    Survivors are ordered by their latest occurrence, so stream ids stay
+    increasing and ``Last-Event-ID`` resumption keeps working.
+    """
+    latest: Dict[Hashable, EventMessage] = {}
+    for message in messages:
+        key = coalesce_key(message)
+        latest.pop(key, None)
+        latest[key] = message
+    return list(latest.values())
+
+
+async def drain_window(queue: asyncio.Queue, window: float) -> List[bytes]:
+    """Collect everything arriving on ``queue`` within ``window`` seconds."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + window
+    messages = []
+
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            messages.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+
+    return messages
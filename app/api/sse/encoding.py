@@ -0,0 +1,31 @@
+from decimal import Decimal
+from pathlib import PurePath
+from typing import Any
+
+import orjson
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (Decimal, PurePath)):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_json(value: Any) -> bytes:
+    """
+    Serialize with orjson. UUIDs, datetimes and enums such as
+    ``ODMTaskStatus`` are handled natively, so callers need not stringify.
+    """
+    return orjson.dumps(value, default=_default)
+
+
+decode_json = orjson.loads
+
+
+def encode_event(event_name: str, data: Any) -> bytes:
+    return encode_json({"event": event_name, "data": data})
+
+
+def sse_frame(event_id: bytes, payload: bytes) -> bytes:
+    """Frame an already encoded payload without decoding it."""
+    return b"".join((b"id: ", event_id, b"\ndata: ", payload, b"\n\n"))
@@ -0,0 +1,219 @@
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+
+from app.api.sse.encoding import encode_event
+from app.api.sse.metrics import published_key
+
+USER_CHANNEL_PATTERN = "user_*_events"
+
+
+def user_channel(user_id: str) -> str:
+    return f"user_{user_id}_events"
+
+
+def user_stream(user_id: str) -> str:
+    return f"user_{user_id}_events_stream"
+
+
+def channel_user(channel: str) -> str:
+    return channel.removeprefix("user_").removesuffix("_events")
+
+
+def parse_event_id(value: Optional[bytes | str]) -> Optional[Tuple[int, int]]:
+    """Parse a Redis Stream id (``<ms>-<seq>``) into a comparable tuple."""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    if not value:
+        return None
+
+    milliseconds, _, sequence = value.strip().partition("-")
+    try:
+        return int(milliseconds), int(sequence or 0)
+    except ValueError:
+        return None
+
+
+def event_header(event_name: str, *uuids: Optional[Any]) -> bytes:
+    """Routing header: event name, entity, workspace and task uuid."""
+    fields = [event_name, *(str(uuid) if uuid else "" for uuid in uuids)]
+    return "\t".join(fields).encode("utf-8")
+
+
+class PendingEvent(NamedTuple):
+    user_id: str
+    event_name: str
+    data: Dict[str, Any]
+    workspace_uuid: Optional[str] = None
+    task_uuid: Optional[str] = None
+
+    @property
+    def header(self) -> bytes:
+        return event_header(
+            self.event_name,
+            self.data.get("uuid"),
+            self.workspace_uuid,
+            self.task_uuid,
+        )
+
+
+class EventMessage(NamedTuple):
+    """
+    An event as subscribers receive it.
+
+    The routing header travels next to the JSON payload, so streams can
+    filter and coalesce without decoding it.
+    """
+
+    id: bytes
+    event: str
+    uuid: str
+    workspace_uuid: str
+    task_uuid: str
+    payload: bytes
+
+    @classmethod
+    def from_parts(cls, entry_id: bytes, header: bytes, payload: bytes):
+        event, uuid, workspace_uuid, task_uuid = header.decode("utf-8").split("\t")
+        return cls(entry_id, event, uuid, workspace_uuid, task_uuid, payload)
+
+    @classmethod
+    def decode(cls, message: bytes) -> EventMessage:
+        return cls.from_parts(*message.split(b"\n", 2))
+
+    def encode(self) -> bytes:
+        header = event_header(
+            self.event, self.uuid, self.workspace_uuid, self.task_uuid
+        )
+        return b"\n".join((self.id, header, self.payload))
+
+
+# KEYS: the published counter, then each event's stream.
+# ARGV: stream maxlen, stream TTL, counter TTL, then each event's channel,
+# header and payload. Stream ids only exist once XADD runs, so appending and
+# publishing happen server-side in one call.
+PUBLISH_EVENTS_SCRIPT = """
+local maxlen, stream_ttl = ARGV[1], ARGV[2]
+for i = 2, #KEYS do
+    local channel, header, payload = ARGV[3 * i - 2], ARGV[3 * i - 1], ARGV[3 * i]
+    local id = redis.call(
+        "XADD", KEYS[i], "MAXLEN", "~", maxlen, "*",
+        "header", header, "payload", payload
+    )
+    redis.call("EXPIRE", KEYS[i], stream_ttl)
+    redis.call("PUBLISH", channel, id .. "\\n" .. header .. "\\n" .. payload)
+end
+redis.call("INCRBY", KEYS[1], #KEYS - 1)
+redis.call("EXPIRE", KEYS[1], ARGV[3])
+"""
+
+
+def publish_events(events: List[PendingEvent]) -> None:
+    """
+    Append events to their users' capped streams and publish them live.
+
+    Published messages are ``<stream id>\\n<header>\\n<json payload>`` (see
+    ``EventMessage``) so subscribers can tag SSE frames with an ``id:`` and
+    deduplicate against a replay. The whole batch costs one round trip.
+    """
+    if not events:
+        return
+
+    conn = get_redis_connection("default")
+    keys = [published_key(int(time.time()))]
+    args = [
+        settings.SSE_STREAM_MAXLEN,
+        settings.SSE_STREAM_TTL_SECONDS,
+        settings.SSE_METRICS_WINDOW_SECONDS * 2,
+    ]
+    for event in events:
+        keys.append(user_stream(event.user_id))
+        args += [
+            user_channel(event.user_id),
+            event.header,
+            encode_event(event.event_name, event.data),
+        ]
+    conn.register_script(PUBLISH_EVENTS_SCRIPT)(keys=keys, args=args)
+
+
+class EventCollector:
+    """Buffers committed events and publishes them in a single batch."""
+
+    def __init__(self):
+        self.events: List[PendingEvent] = []
+
+    def add(self, event: PendingEvent) -> None:
+        self.events.append(event)
+
+    def flush(self) -> None:
+        events, self.events = self.events, []
+        publish_events(events)
+
+
+_current_collector: ContextVar[Optional[EventCollector]] = ContextVar(
+    "sse_event_collector", default=None
+)
+
+
+def get_current_collector() -> Optional[EventCollector]:
+    return _current_collector.get()
+
+
+@contextmanager
+def collect_events(flush: bool = True) -> Iterator[EventCollector]:
+    """
+    Batch every event emitted inside the block into one Redis flush.
+
+    Events raised inside ``transaction.atomic()`` only reach the collector once
+    their transaction commits, so rolled back work never gets announced. If
+    the block itself ends inside a transaction, the flush waits for it.
+    Pass ``flush=False`` to flush the yielded collector yourself.
+    """
+    collector = EventCollector()
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+        if flush and connection.in_atomic_block:
+            transaction.on_commit(collector.flush, robust=True)
+        elif flush:
+            collector.flush()
+
+
+def emit_event(
+    user_id: str,
+    event_name: str,
+    data: dict,
+    workspace_uuid: Optional[Any] = None,
+    task_uuid: Optional[Any] = None,
+):
+    """
+    Publish ``event_name`` to ``user_id``'s streams once the current
+    transaction commits. ``workspace_uuid`` and ``task_uuid`` scope the event
+    for subscribers filtering on them.
+    """
+    event = PendingEvent(
+        user_id,
+        event_name,
+        data,
+        str(workspace_uuid) if workspace_uuid else None,
+        str(task_uuid) if task_uuid else None,
+    )
+    collector = get_current_collector()
+    deliver = collector.add if collector is not None else _publish_one
+
+    if connection.in_atomic_block:
+        transaction.on_commit(partial(deliver, event))
+    else:
+        deliver(event)
+
+
+def _publish_one(event: PendingEvent) -> None:
+    publish_events([event])
@@ -0,0 +1,40 @@
+import re
+from fnmatch import translate
+from typing import Iterable, Optional
+from uuid import UUID
+
+from app.api.sse.events import EventMessage
+
+
+class EventFilter:
+    """
+    Per-connection topic matcher over event routing headers.
+
+    Event-type globs (``task:*``, ``workspace:updated``) are compiled into a
+    single regex once; uuid filters are plain string comparisons, so matching
+    never touches the JSON payload.
+    """
+
+    def __init__(
+        self,
+        events: Optional[Iterable[str]] = None,
+        workspace_uuid: Optional[UUID] = None,
+        task_uuid: Optional[UUID] = None,
+    ):
+        patterns = [translate(pattern) for pattern in events or () if pattern]
+        self._event = re.compile("|".join(patterns)).match if patterns else None
+        self._workspace_uuid = str(workspace_uuid) if workspace_uuid else None
+        self._task_uuid = str(task_uuid) if task_uuid else None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self._event or self._workspace_uuid or self._task_uuid)
+
+    def __call__(self, message: EventMessage) -> bool:
+        if self._event and not self._event(message.event):
+            return False
+        if self._workspace_uuid and message.workspace_uuid != self._workspace_uuid:
+            return False
+        if self._task_uuid and message.task_uuid != self._task_uuid:
+            return False
+        return True
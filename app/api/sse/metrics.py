@@ -0,0 +1,55 @@
+import os
+import socket
+import time
+from typing import Any, Dict
+
+# Hash of worker id -> JSON snapshot written by each worker's broker
+WORKERS_KEY = "sse_metrics_workers"
+
+
+def published_key(second: int) -> str:
+    """Per-second counter of events published fleet-wide."""
+    return f"sse_metrics_published_{second}"
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class DeliveryStats:
+    """
+    Publish-to-write latency of live events on one worker.
+
+    The publish time comes from the Redis stream id (milliseconds since the
+    epoch on the Redis server), so no timestamp has to travel with events.
+    Counters are reset each time a snapshot is taken.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def record(self, event_id: bytes) -> None:
+        try:
+            published_ms = int(event_id.partition(b"-")[0])
+        except ValueError:
+            return
+        latency = max(0, int(time.time() * 1000) - published_ms)
+        self.delivered += 1
+        self._total_ms += latency
+        self._max_ms = max(self._max_ms, latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        stats = {
+            "delivered": self.delivered,
+            "latency_ms_avg": (
+                self._total_ms / self.delivered if self.delivered else None
+            ),
+            "latency_ms_max": self._max_ms if self.delivered else None,
+        }
+        self._reset()
+        return stats
+
+    def _reset(self) -> None:
+        self.delivered = 0
+        self._total_ms = 0
+        self._max_ms = 0
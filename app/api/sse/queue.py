@@ -0,0 +1,58 @@
+import asyncio
+
+from app.api.constants.sse import SSEOverflowPolicy
+from app.api.sse.coalescing import coalesce
+from app.api.sse.events import EventMessage
+
+# Put on a queue that gave up on its consumer; the stream ends with a resync hint
+OVERFLOWED = None
+
+
+class SubscriberQueue(asyncio.Queue):
+    """
+    Bounded per-connection queue that never blocks the broker's reader.
+
+    When a slow consumer lets the queue fill up, ``offer`` applies the
+    overflow policy instead of growing: drop the oldest message, collapse
+    superseded events per entity (falling back to dropping the oldest), or
+    discard everything and signal the stream to disconnect.
+    """
+
+    def __init__(self, maxsize: int, policy: SSEOverflowPolicy):
+        super().__init__(maxsize)
+        self.policy = policy
+        self.dropped = 0
+        self.high_water = 0
+        self.overflowed = False
+
+    def offer(self, message: bytes) -> None:
+        if self.overflowed:
+            self.dropped += 1
+            return
+
+        if self.full():
+            if self.policy == SSEOverflowPolicy.DISCONNECT:
+                self._give_up()
+                return
+            if self.policy == SSEOverflowPolicy.COALESCE:
+                self._coalesce()
+            if self.full():
+                self.get_nowait()
+                self.dropped += 1
+
+        self.put_nowait(message)
+        self.high_water = max(self.high_water, self.qsize())
+
+    def _coalesce(self) -> None:
+        messages = [self.get_nowait() for _ in range(self.qsize())]
+        kept = coalesce(EventMessage.decode(message) for message in messages)
+        self.dropped += len(messages) - len(kept)
+        for message in kept:
+            self.put_nowait(message.encode())
+
+    def _give_up(self) -> None:
+        self.dropped += self.qsize() + 1
+        while not self.empty():
+            self.get_nowait()
+        self.overflowed = True
+        self.put_nowait(OVERFLOWED)
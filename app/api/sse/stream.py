@@ -0,0 +1,191 @@
+import asyncio
+from typing import AsyncIterator, List, NamedTuple, Optional, Union
+from uuid import UUID
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from ninja import Query
+from ninja.router import Router
+
+from app.api.auth.user import ServiceUserJWTAuth
+from app.api.schemas.sse import ServerSideEvent
+from app.api.sse.broker import RedisEventBroker, get_event_broker
+from app.api.sse.coalescing import coalesce, drain_window
+from app.api.sse.encoding import encode_event, sse_frame
+from app.api.sse.events import EventMessage, parse_event_id
+from app.api.sse.filters import EventFilter
+from app.api.sse.queue import OVERFLOWED, SubscriberQueue
+
+sse_router = Router()
+
+
+OK_FRAME = b": ok\n\n"
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+
+
+def resync_frame(last_event_id: Optional[str], reason: str) -> bytes:
+    """Tell a client that it missed events after ``last_event_id``."""
+    data = {"reason": reason, "last_event_id": last_event_id}
+    return b"data: " + encode_event("resync", data) + b"\n\n"
+
+
+class Resync(NamedTuple):
+    """
+    Marks missed events: a subscriber dropped on ``overflow`` should reconnect
+    and replay, while events ``trimmed`` from the stream must be refetched.
+    """
+
+    last_event_id: Optional[str]
+    reason: str = "overflow"
+
+
+async def event_messages(
+    broker: RedisEventBroker,
+    user_id: str,
+    queue: SubscriberQueue,
+    last_event_id: Optional[str] = None,
+    coalesce_window: float = 0,
+    event_filter: Optional[EventFilter] = None,
+    heartbeat: Optional[float] = None,
+) -> AsyncIterator[Union[EventMessage, Resync, None]]:
+    """
+    Turn a subscribed queue into the events a connection should receive.
+
+    Replays what followed ``last_event_id``, then relays live events after
+    filtering and coalescing them. Yields ``None`` when nothing was sent for
+    ``heartbeat`` seconds and ends with a ``Resync`` if the queue overflowed.
+    The replay starts with a ``Resync`` when the stream no longer reaches back
+    to ``last_event_id``.
+    """
+    if event_filter is not None and event_filter.is_empty:
+        event_filter = None
+
+    loop = asyncio.get_running_loop()
+    sent_at = loop.time()
+
+    cursor = None
+    delivered = last_event_id
+    if parse_event_id(last_event_id):
+        replayed, trimmed = await broker.replay(user_id, last_event_id)
+        if trimmed:
+            sent_at = loop.time()
+            yield Resync(last_event_id, "trimmed")
+        if replayed:
+            cursor = parse_event_id(replayed[-1].id)
+            delivered = replayed[-1].id.decode("utf-8")
+        if event_filter:
+            replayed = filter(event_filter, replayed)
+        if coalesce_window:
+            replayed = coalesce(replayed)
+        for message in replayed:
+            sent_at = loop.time()
+            yield message
+
+    while True:
+        # Events filtered out below do not reach the client, so only what
+        # was sent postpones the heartbeat
+        timeout = None
+        if heartbeat is not None:
+            timeout = max(0, sent_at + heartbeat - loop.time())
+        try:
+            raw = [await asyncio.wait_for(queue.get(), timeout=timeout)]
+        except asyncio.TimeoutError:
+            sent_at = loop.time()
+            yield None
+            continue
+
+        if coalesce_window:
+            raw += await drain_window(queue, coalesce_window)
+
+        overflowed = OVERFLOWED in raw
+        if overflowed:
+            raw = raw[: raw.index(OVERFLOWED)]
+
+        messages = []
+        for message in map(EventMessage.decode, raw):
+            if cursor and parse_event_id(message.id) <= cursor:
+                continue  # already delivered by the replay
+            delivered = message.id.decode("utf-8")
+            if event_filter is None or event_filter(message):
+                messages.append(message)
+
+        if coalesce_window:
+            messages = coalesce(messages)
+        for message in messages:
+            broker.delivery.record(message.id)
+            sent_at = loop.time()
+            yield message
+
+        if overflowed:
+            yield Resync(delivered)
+            return
+
+
+async def redis_event_stream(
+    user_id: str,
+    last_event_id: Optional[str] = None,
+    coalesce_window: float = 0,
+    event_filter: Optional[EventFilter] = None,
+):
+    broker = get_event_broker()
+    queue = await broker.subscribe(user_id)
+
+    try:
+        yield OK_FRAME
+
+        async for message in event_messages(
+            broker,
+            user_id,
+            queue,
+            last_event_id,
+            coalesce_window,
+            event_filter,
+            heartbeat=settings.SSE_HEARTBEAT_INTERVAL_SECONDS,
+        ):
+            if message is None:
+                yield HEARTBEAT_FRAME
+            elif isinstance(message, Resync):
+                yield resync_frame(message.last_event_id, message.reason)
+            else:
+                yield sse_frame(message.id, message.payload)
+
+    finally:
+        await broker.unsubscribe(user_id, queue)
+
+
+@sse_router.get(
+    "/events",
+    auth=ServiceUserJWTAuth(),
+    response=ServerSideEvent,
+    tags=["public", "sse"],
+    operation_id="listenToSSE",
+)
+async def sse_endpoint(
+    request,
+    coalesce_ms: Optional[int] = Query(
+        None, ge=0, le=settings.SSE_COALESCE_MAX_WINDOW_MS
+    ),
+    events: Optional[List[str]] = Query(None),
+    workspace_uuid: Optional[UUID] = Query(None),
+    task_uuid: Optional[UUID] = Query(None),
+):
+    """
+    Stream the user's events. ``coalesce_ms`` opens a window after each event
+    in which repeated events for the same entity collapse into the latest one.
+    ``events`` (event-type globs such as ``task:*``), ``workspace_uuid`` and
+    ``task_uuid`` restrict the stream to the matching events.
+    """
+    if coalesce_ms is None:
+        coalesce_ms = settings.SSE_COALESCE_WINDOW_MS
+
+    response = StreamingHttpResponse(
+        redis_event_stream(
+            request.user.id,
+            request.headers.get("Last-Event-ID"),
+            coalesce_window=coalesce_ms / 1000,
+            event_filter=EventFilter(events, workspace_uuid, task_uuid),
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
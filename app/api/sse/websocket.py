@@ -0,0 +1,305 @@
+import asyncio
+from fnmatch import filter as fnmatch_filter
+from itertools import count
+from typing import Any, Dict, List, Optional, Sequence, Union
+from urllib.parse import parse_qs
+from uuid import UUID
+
+import msgpack
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest
+from loguru import logger
+
+from app.api.auth.service import ServiceHMACAuth
+from app.api.auth.user import ServiceUserJWTAuth
+from app.api.constants.user import ServiceUser
+from app.api.models.service import AuthorizedService
+from app.api.models.workspace import Workspace
+from app.api.schemas.sse import _EVENTS
+from app.api.sse.broker import get_event_broker
+from app.api.sse.encoding import decode_json, encode_json
+from app.api.sse.events import EventMessage
+from app.api.sse.filters import EventFilter
+from app.api.sse.stream import Resync, event_messages
+
+WEBSOCKET_PATH = "/api/ws/events"
+
+# Application close codes (4000-4999 are free for applications to use)
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+
+Principal = Union[ServiceUser, AuthorizedService]
+
+
+class SubscriptionError(Exception):
+    pass
+
+
+class JSONFraming:
+    subprotocol = "json"
+
+    def decode(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return decode_json(message.get("text") or message.get("bytes") or b"{}")
+
+    def encode(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "websocket.send", "text": encode_json(data).decode("utf-8")}
+
+    def encode_event(self, topic: int, message: EventMessage) -> Dict[str, Any]:
+        # Splice the already serialized ``{"event": ..., "data": ...}`` payload
+        head = f'{{"topic": {topic}, "id": "{message.id.decode("utf-8")}", '
+        return {
+            "type": "websocket.send",
+            "text": head + message.payload[1:].decode("utf-8"),
+        }
+
+
+class MessagePackFraming:
+    subprotocol = "msgpack"
+
+    def decode(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return msgpack.unpackb(message.get("bytes") or b"\x80")
+
+    def encode(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "websocket.send", "bytes": msgpack.packb(data)}
+
+    def encode_event(self, topic: int, message: EventMessage) -> Dict[str, Any]:
+        return self.encode(
+            {
+                "topic": topic,
+                "id": message.id.decode("utf-8"),
+                **decode_json(message.payload),
+            }
+        )
+
+
+FRAMINGS = {
+    framing.subprotocol: framing for framing in (MessagePackFraming, JSONFraming)
+}
+
+
+def negotiate_framing(
+    subprotocols: Sequence[str],
+) -> Union[JSONFraming, MessagePackFraming]:
+    """Pick the first framing the client offers; JSON when it offers none."""
+    for subprotocol in subprotocols:
+        if subprotocol in FRAMINGS:
+            return FRAMINGS[subprotocol]()
+    return JSONFraming()
+
+
+class EventSocket:
+    """
+    WebSocket transport for the event bus.
+
+    One socket carries any number of topics. A topic is a user's event
+    stream narrowed by the same filters as ``/events``; users may only
+    subscribe to their own events, while services authenticated with
+    ``ServiceHMACAuth`` may subscribe to any user or workspace.
+
+    Client messages::
+
+        {"action": "subscribe", "user_id": ..., "workspace_uuid": ...,
+         "task_uuid": ..., "events": ["task:*"], "last_event_id": ...}
+        {"action": "unsubscribe", "topic": 1}
+
+    Server messages are ``{"topic", "id", "event", "data"}`` for events and
+    ``{"event": "subscribed" | "unsubscribed" | "resync" | "error", "data"}``
+    for control replies.
+    """
+
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self.receive = receive
+        self._send = send
+        self._send_lock = asyncio.Lock()
+        self._topics: Dict[int, asyncio.Task] = {}
+        self._topic_ids = count(1)
+        self.principal: Optional[Principal] = None
+        self.framing = negotiate_framing(scope.get("subprotocols") or [])
+
+    async def __call__(self) -> None:
+        message = await self.receive()
+        if message["type"] != "websocket.connect":
+            return
+
+        if self.scope["path"] != WEBSOCKET_PATH:
+            await self._send({"type": "websocket.close", "code": CLOSE_NOT_FOUND})
+            return
+
+        self.principal = await self._authenticate()
+        if self.principal is None:
+            await self._send({"type": "websocket.close", "code": CLOSE_UNAUTHORIZED})
+            return
+
+        subprotocols = self.scope.get("subprotocols") or []
+        await self._send(
+            {
+                "type": "websocket.accept",
+                "subprotocol": (
+                    self.framing.subprotocol
+                    if self.framing.subprotocol in subprotocols
+                    else None
+                ),
+            }
+        )
+
+        try:
+            while True:
+                message = await self.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message["type"] == "websocket.receive":
+                    await self._handle(message)
+        finally:
+            for task in self._topics.values():
+                task.cancel()
+            await asyncio.gather(*self._topics.values(), return_exceptions=True)
+
+    async def send(self, data: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self._send(data)
+
+    async def send_control(self, event: str, **data) -> None:
+        await self.send(self.framing.encode({"event": event, "data": data}))
+
+    # =====================
+    # Private helpers
+    # =====================
+
+    async def _authenticate(self) -> Optional[Principal]:
+        headers = dict(self.scope.get("headers") or [])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            # Browsers cannot set headers on a WebSocket handshake
+            query = parse_qs(self.scope.get("query_string", b"").decode("latin-1"))
+            token = query.get("token", [""])[0]
+        if not token:
+            return None
+
+        request = HttpRequest()
+        request.method = "GET"
+        request.path = self.scope["path"]
+
+        user = ServiceUserJWTAuth().authenticate(request, token)
+        if user is not None:
+            return user
+        return await sync_to_async(ServiceHMACAuth().authenticate)(request, token)
+
+    async def _handle(self, message: Dict[str, Any]) -> None:
+        try:
+            request = self.framing.decode(message)
+            action = request.get("action")
+            if action == "subscribe":
+                await self._subscribe(request)
+            elif action == "unsubscribe":
+                await self._unsubscribe(request.get("topic"))
+            else:
+                raise SubscriptionError(f"Unknown action: {action}")
+        except (SubscriptionError, ValueError, TypeError, AttributeError) as e:
+            await self.send_control("error", detail=str(e))
+
+    async def _subscribe(self, request: Dict[str, Any]) -> None:
+        workspace_uuid = _parse_uuid(request.get("workspace_uuid"))
+        task_uuid = _parse_uuid(request.get("task_uuid"))
+        events = _validate_event_patterns(request.get("events"))
+        user_id = await self._resolve_user(request.get("user_id"), workspace_uuid)
+
+        broker = get_event_broker()
+        queue = await broker.subscribe(user_id)
+        topic = next(self._topic_ids)
+        await self.send_control("subscribed", topic=topic, user_id=user_id)
+
+        self._topics[topic] = asyncio.create_task(
+            self._relay(
+                topic,
+                user_id,
+                queue,
+                request.get("last_event_id"),
+                EventFilter(events, workspace_uuid, task_uuid),
+            )
+        )
+
+    async def _unsubscribe(self, topic: Any) -> None:
+        task = self._topics.pop(topic, None)
+        if task is None:
+            raise SubscriptionError(f"Unknown topic: {topic}")
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await self.send_control("unsubscribed", topic=topic)
+
+    async def _resolve_user(
+        self, user_id: Optional[str], workspace_uuid: Optional[UUID]
+    ) -> str:
+        if isinstance(self.principal, ServiceUser):
+            if user_id is not None and str(user_id) != str(self.principal.id):
+                raise SubscriptionError("Users can only subscribe to their own events")
+            if workspace_uuid is not None:
+                owned = await Workspace.objects.filter(
+                    uuid=workspace_uuid, user_id=self.principal.id
+                ).aexists()
+                if not owned:
+                    raise SubscriptionError("Workspace not found")
+            return str(self.principal.id)
+
+        if workspace_uuid is not None:
+            owner = (
+                await Workspace.objects.filter(uuid=workspace_uuid)
+                .values_list("user_id", flat=True)
+                .afirst()
+            )
+            if owner is None:
+                raise SubscriptionError("Workspace not found")
+            if user_id is not None and str(user_id) != str(owner):
+                raise SubscriptionError("Workspace does not belong to user")
+            return str(owner)
+
+        if user_id is None:
+            raise SubscriptionError("Subscribe by user_id or workspace_uuid")
+        return str(user_id)
+
+    async def _relay(self, topic, user_id, queue, last_event_id, event_filter):
+        broker = get_event_broker()
+        try:
+            async for message in event_messages(
+                broker, user_id, queue, last_event_id, event_filter=event_filter
+            ):
+                if isinstance(message, Resync):
+                    # Only an overflow ends the stream; trimmed events are
+                    # flagged before a replay that goes on with the topic
+                    if message.reason == "overflow":
+                        self._topics.pop(topic, None)
+                    await self.send_control(
+                        "resync",
+                        topic=topic,
+                        reason=message.reason,
+                        last_event_id=message.last_event_id,
+                    )
+                elif message is not None:
+                    await self.send(self.framing.encode_event(topic, message))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"WebSocket topic {topic} of {user_id} failed")
+        finally:
+            await broker.unsubscribe(user_id, queue)
+
+
+def _parse_uuid(value: Any) -> Optional[UUID]:
+    return UUID(str(value)) if value else None
+
+
+def _validate_event_patterns(patterns: Any) -> Optional[List[str]]:
+    """Event globs must match at least one event of the SSE catalogue."""
+    if not patterns:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    for pattern in patterns:
+        if not fnmatch_filter(_EVENTS, pattern):
+            raise SubscriptionError(f"No events match {pattern!r}")
+    return list(patterns)
+
+
+async def websocket_application(scope, receive, send) -> None:
+    await EventSocket(scope, receive, send)()
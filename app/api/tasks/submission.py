@@ -0,0 +1,281 @@
+import random
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List
+from uuid import UUID
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from loguru import logger
+from pyodm.exceptions import NodeConnectionError, NodeResponseError, NodeServerError
+from redis.lock import Lock
+
+from app.api.constants.odm_client import NodeODMClient
+from app.api.constants.token import DatasetToken
+from app.api.models.gcp import GroundControlPoint
+from app.api.models.image import Image
+from app.api.models.task import ODMTask
+from app.api.sse import PendingEvent, publish_events
+
+# Connection drops and 5xx replies; error replies from the node are final
+RETRYABLE_ERRORS = (NodeConnectionError, NodeServerError)
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+def submission_key(odm_task: ODMTask) -> str:
+    return f"odm_task_{odm_task.uuid}_submission"
+
+
+def uploaded_files_key(odm_task: ODMTask) -> str:
+    return f"odm_task_{odm_task.uuid}_uploaded_files"
+
+
+def submission_lock_key(odm_task_uuid: UUID) -> str:
+    return f"odm_task_{odm_task_uuid}_submitting"
+
+
+def submission_lock(odm_task_uuid: UUID) -> Lock:
+    """
+    Held while a worker submits the task. NodeODM only lists a task once it
+    is committed, so this is how others tell a submission is in progress.
+    """
+    return get_redis_connection("default").lock(
+        submission_lock_key(odm_task_uuid),
+        timeout=settings.NODEODM_SUBMISSION_LOCK_TTL_SECONDS,
+    )
+
+
+def submission_active(odm_task: ODMTask) -> bool:
+    conn = get_redis_connection("default")
+    return bool(conn.exists(submission_lock_key(odm_task.uuid)))
+
+
+def dataset_files(odm_task: ODMTask) -> Dict[str, str]:
+    """Upload name -> path of every original image of the task's workspace."""
+    images = Image.objects.filter(workspace=odm_task.workspace, is_thumbnail=False)
+    return {Path(img.image_file.name).name: img.image_file.path for img in images}
+
+
+def render_gcp_file(odm_task: ODMTask) -> str:
+    gcps = (
+        GroundControlPoint.objects.filter(image__workspace=odm_task.workspace)
+        .select_related("image")
+        .order_by("label")
+    )
+    return "".join(["EPSG:4326\n", *(gcp.to_odm_repr() + "\n" for gcp in gcps)])
+
+
+def dataset_zip_url(odm_task: ODMTask) -> str:
+    token = DatasetToken.for_task(odm_task)
+    return f"{settings.NINJAODM_BASE_URL}/api/internal/tasks/{odm_task.uuid}/dataset.zip?token={token}"
+
+
+class _ZipSink:
+    """Write-only file object collecting what ``ZipFile`` writes to it."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def _iterate_in_thread(iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Hand out ``iterator``'s chunks, each produced in a worker thread."""
+    produce = sync_to_async(next, thread_sensitive=False)
+    while (chunk := await produce(iterator, None)) is not None:
+        yield chunk
+
+
+def stream_dataset_zip(odm_task: ODMTask) -> AsyncIterator[bytes]:
+    """
+    Zip the task's images and GCP file while it is being sent.
+
+    Nothing touches the disk: entries are stored uncompressed (photos do not
+    compress) with data descriptors, which is what ``ZipFile`` does on an
+    unseekable file, and every read chunk is handed out as soon as it is
+    written. The database is queried before the first chunk is produced.
+
+    The stream is asynchronous: under ASGI, Django would otherwise read a
+    synchronous iterator to the end before sending anything.
+    """
+    files = dataset_files(odm_task)
+    gcp_file = render_gcp_file(odm_task).encode("utf-8")
+
+    def _generate() -> Iterator[bytes]:
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            for name, path in files.items():
+                info = zipfile.ZipInfo.from_file(path, arcname=name)
+                with open(path, "rb") as src, zf.open(info, mode="w") as dest:
+                    while chunk := src.read(ZIP_CHUNK_SIZE):
+                        dest.write(chunk)
+                        yield sink.drain()
+            zf.writestr(settings.GROUND_CONTROL_POINTS_FILE_NAME, gcp_file)
+        yield sink.drain()
+
+    return _iterate_in_thread(_generate())
+
+
+class UploadProgress:
+    """Thread-safe upload counters reported as ``task:upload-progress``."""
+
+    def __init__(self, odm_task: ODMTask, total: int, uploaded: int):
+        # Resolved up front so worker threads never touch the database
+        self.user_id = odm_task.workspace.user_id
+        self.workspace_uuid = str(odm_task.workspace.uuid)
+        self.task_uuid = str(odm_task.uuid)
+        self.total = total
+        self.uploaded = uploaded
+        self.bytes = 0
+        self._started = time.monotonic()
+        self._reported = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.uploaded += 1
+            self.bytes += size
+            now = time.monotonic()
+            due = (
+                now - self._reported
+                >= settings.NODEODM_UPLOAD_PROGRESS_INTERVAL_SECONDS
+            )
+            if due:
+                self._reported = now
+        if due:
+            self.report()
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self._started
+        # Published right away: the task's own events are only flushed
+        # once the whole Celery task has finished
+        publish_events(
+            [
+                PendingEvent(
+                    self.user_id,
+                    "task:upload-progress",
+                    {
+                        "uuid": self.task_uuid,
+                        "uploaded": self.uploaded,
+                        "total": self.total,
+                        "bytes": self.bytes,
+                        "bytes_per_second": self.bytes / elapsed if elapsed else 0.0,
+                    },
+                    self.workspace_uuid,
+                    self.task_uuid,
+                )
+            ]
+        )
+
+
+class TaskSubmission:
+    """
+    Submits files to NodeODM through ``/task/new/init`` -> ``upload`` ->
+    ``/task/new/commit``.
+
+    Files are uploaded concurrently, each retried with jittered exponential
+    backoff. Redis remembers which files the node already has, so a
+    submission interrupted by a failure or a worker restart resumes where
+    it stopped instead of starting over.
+    """
+
+    def __init__(self, odm_task: ODMTask, node: NodeODMClient):
+        self.odm_task = odm_task
+        self.node = node
+        self.conn = get_redis_connection("default")
+
+    def submit(self, files: Dict[str, str], options: dict) -> None:
+        """Upload ``files`` (upload name -> path) and start processing."""
+        key = submission_key(self.odm_task)
+        uploaded_key = uploaded_files_key(self.odm_task)
+
+        if not self.conn.exists(key):
+            self.conn.delete(uploaded_key)
+            self.node.init_task(name=self.odm_task.name, options=options)
+            self.conn.set(key, 1, ex=settings.NODEODM_UPLOAD_STATE_TTL_SECONDS)
+
+        uploaded = {name.decode() for name in self.conn.smembers(uploaded_key)}
+        pending = {name: path for name, path in files.items() if name not in uploaded}
+        if uploaded:
+            logger.info(
+                f"Resuming submission of task {self.odm_task.uuid}: "
+                f"{len(pending)} of {len(files)} files left"
+            )
+
+        progress = UploadProgress(self.odm_task, len(files), len(files) - len(pending))
+        try:
+            self._upload_all(pending, progress)
+            progress.report()
+            self.node.commit_task()
+        except NodeResponseError:
+            # The node rejected the upload (e.g. it lost the initialized
+            # task), so the next attempt has to start from a fresh init
+            self.conn.delete(key, uploaded_key)
+            raise
+        self.conn.delete(key, uploaded_key)
+
+    # =====================
+    # Private helpers
+    # =====================
+
+    def _upload_all(self, files: Dict[str, str], progress: UploadProgress) -> None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.NODEODM_UPLOAD_CONCURRENCY,
+            thread_name_prefix="nodeodm-upload",
+        )
+        try:
+            futures = [
+                executor.submit(self._upload, name, path, progress)
+                for name, path in files.items()
+            ]
+            for future in as_completed(futures):
+                future.result()
+        finally:
+            # On the first permanent failure, drop uploads not yet started
+            executor.shutdown(cancel_futures=True)
+
+    def _upload(self, name: str, path: str, progress: UploadProgress) -> None:
+        for attempt in range(settings.NODEODM_UPLOAD_MAX_RETRIES + 1):
+            try:
+                self.node.upload_file(name, path)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == settings.NODEODM_UPLOAD_MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, self._backoff(attempt))
+                logger.warning(
+                    f"Upload of {name} for task {self.odm_task.uuid} failed "
+                    f"({e}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+        uploaded_key = uploaded_files_key(self.odm_task)
+        pipe = self.conn.pipeline(transaction=False)
+        pipe.sadd(uploaded_key, name)
+        pipe.expire(uploaded_key, settings.NODEODM_UPLOAD_STATE_TTL_SECONDS)
+        pipe.expire(
+            submission_lock_key(self.odm_task.uuid),
+            settings.NODEODM_SUBMISSION_LOCK_TTL_SECONDS,
+        )
+        pipe.execute()
+        progress.add(Path(path).stat().st_size)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(
+            settings.NODEODM_UPLOAD_RETRY_BACKOFF_MAX_SECONDS,
+            settings.NODEODM_UPLOAD_RETRY_BACKOFF_SECONDS * 2**attempt,
+        )
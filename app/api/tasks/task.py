@@ -1,27 +1,89 @@
+import json
+import math
+import random
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from tempfile import NamedTemporaryFile
-from typing import Optional, Callable
+from typing import Dict, List, Optional, Callable, Tuple
 from uuid import UUID
-from celery import shared_task
+from celery import Task, shared_task
 from pathlib import Path
-from django.core.files import File
+from django.conf import settings
 from django.db import transaction
+from django_redis import get_redis_connection
 from pyodm.exceptions import OdmError, NodeResponseError
+from redis.exceptions import LockError
 from loguru import logger
 from datetime import datetime
 
 from app.api.models.task import ODMTask
-from app.api.models.image import Image
 from app.api.models.result import ODMTaskResult
-from app.api.models.gcp import GroundControlPoint
-from app.api.sse import emit_event
-from app.api.constants.odm import ODMTaskStatus, ODMTaskResultType
+from app.api.sse import collect_events, emit_event
+from app.api.constants.odm import (
+    IllegalTransitionError,
+    NodeODMTaskStatus,
+    ODMProcessingStage,
+    ODMTaskStatus,
+    ODMTaskResultType,
+)
 from app.api.constants.odm_client import NodeODMClient
-
-
-def save_task_status(odm_task: ODMTask, status: ODMTaskStatus):
-    with transaction.atomic():
-        odm_task.status = status.value
-        odm_task.save(update_fields=["status"])
+from app.api.constants.odm_nodes import (
+    NoNodeAvailableError,
+    NodeCircuitBreaker,
+    NodeCircuitOpenError,
+    NodeODMRegistry,
+)
+from app.api.tasks.submission import (
+    RETRYABLE_ERRORS,
+    TaskSubmission,
+    dataset_files,
+    dataset_zip_url,
+    render_gcp_file,
+    submission_active,
+    submission_lock,
+)
+
+# Hash of task uuid -> [next log line, last reported progress, run]
+TASK_PROGRESS_CURSORS_KEY = "odm_task_progress_cursors"
+# Logged by ODM as each stage of a run starts
+RUNNING_STAGE_PATTERN = re.compile(r"Running (\w+) stage")
+
+# Paused tasks wait for the user, there is nothing to drive
+RECONCILED_STATES = ODMTaskStatus.non_terminal_states() - {ODMTaskStatus.PAUSED}
+
+
+# Held while a sweep runs, expiring after this many intervals if its
+# worker dies
+RECONCILE_LOCK_KEY = "odm_task_reconcile_lock"
+RECONCILE_LOCK_INTERVALS = 5
+
+
+def reconcile_seen_key(odm_task: ODMTask) -> str:
+    """[status, step, since] of a task, while the sweeper watches it."""
+    return f"odm_task_{odm_task.uuid}_reconcile"
+
+
+def stage_ingested_key(odm_task: ODMTask) -> str:
+    """Set once the results of the run that ended at the task's step are in."""
+    return f"odm_task_{odm_task.uuid}_ingested_{odm_task.step}"
+
+
+def save_task_status(odm_task: ODMTask, status: ODMTaskStatus) -> bool:
+    """
+    Move the task to ``status`` unless that is illegal or another worker
+    changed the task meanwhile; returns whether it moved.
+    """
+    try:
+        moved = odm_task.transition(status)
+    except IllegalTransitionError as e:
+        logger.warning(f"Task {odm_task.uuid} not updated: {e}")
+        return False
+    if not moved:
+        logger.info(f"Task {odm_task.uuid} changed before it could be {status}")
+    return moved
 
 
 def emit_task_event(
@@ -35,7 +97,13 @@ def emit_task_event(
         data["error"] = error
     else:
         data.update(payload)
-    emit_event(odm_task.workspace.user_id, event_type, data)
+    emit_event(
+        odm_task.workspace.user_id,
+        event_type,
+        data,
+        workspace_uuid=odm_task.workspace.uuid,
+        task_uuid=odm_task.uuid,
+    )
 
 
 def handle_task_failure(
@@ -50,25 +118,58 @@ def handle_task_failure(
         error_message = f"Unexpected error: {error}"
         logger.exception(f"Task {odm_task.uuid} failed unexpectedly")
 
-    save_task_status(odm_task, ODMTaskStatus.FAILED)
-    emit_task_event(odm_task, "task:failed", error=error_message)
+    if save_task_status(odm_task, ODMTaskStatus.FAILED):
+        emit_task_event(odm_task, "task:failed", error=error_message)
 
 
 def execute_task_operation(
+    task: Task,
     odm_task_uuid: UUID,
     operation: Callable[[ODMTask], None],
     success_status: ODMTaskStatus,
     success_event: str,
 ):
+    """
+    Run ``operation`` on the task, then move it to ``success_status``.
+
+    Transient node errors (connection errors, timeouts, 5xx) retry ``task``
+    with jittered exponential backoff, and are counted against the node's
+    circuit breaker. The task is only marked FAILED once
+    ``NODEODM_TASK_MAX_RETRIES`` is exhausted, or on any other error.
+    """
     odm_task = None
     try:
         odm_task = ODMTask.objects.get(uuid=odm_task_uuid)
+        # Nothing is sent to NodeODM for a task that cannot end up there
+        odm_task.check_transition(success_status)
         operation(odm_task)
-        save_task_status(odm_task, success_status)
-        emit_task_event(odm_task, success_event)
+        _node_breaker(odm_task).record_success()
+        if save_task_status(odm_task, success_status):
+            emit_task_event(odm_task, success_event)
 
     except ODMTask.DoesNotExist:
         logger.error(f"Task {odm_task_uuid} not found")
+    except IllegalTransitionError as e:
+        logger.warning(f"Task {odm_task_uuid} skipped: {e}")
+    except RETRYABLE_ERRORS as e:
+        # Only failures of the node itself count against it
+        if not isinstance(e, (NodeCircuitOpenError, NoNodeAvailableError)):
+            _node_breaker(odm_task).record_failure()
+        if task.request.retries < settings.NODEODM_TASK_MAX_RETRIES:
+            countdown = max(
+                random.uniform(0, _retry_backoff(task.request.retries)),
+                getattr(e, "retry_after", 0),
+            )
+            logger.warning(
+                f"Node error for task {odm_task_uuid} ({e}), "
+                f"retrying in {countdown:.1f}s"
+            )
+            raise task.retry(
+                exc=e,
+                countdown=countdown,
+                max_retries=settings.NODEODM_TASK_MAX_RETRIES,
+            )
+        handle_task_failure(odm_task, e, is_node_error=True)
     except OdmError as e:
         if odm_task:
             handle_task_failure(odm_task, e, is_node_error=True)
@@ -81,27 +182,97 @@ def execute_task_operation(
             logger.exception(f"Unexpected error for task {odm_task_uuid}")
 
 
-def save_task_stage_result(
-    odm_task: ODMTask, odm_task_result_file_path: Path, stage_result: ODMTaskResultType
-):
+def save_task_stage_results(
+    odm_task: ODMTask, stage_results: List[ODMTaskResultType]
+) -> List[ODMTaskResult]:
+    """
+    Ingest the task's ``stage_results`` that NodeODM produced.
+
+    Files are placed concurrently (``RESULTS_INGEST_CONCURRENCY``), then the
+    results are inserted at once and announced with a single
+    ``task-result:bulk-created`` event, next to the ``task-result:created``
+    event of each result that clients listened to before. All of them are
+    published in one batch.
+    """
+    workspace = odm_task.workspace
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    new_filename = f"{odm_task_result_file_path.stem}_{timestamp}{odm_task_result_file_path.suffix}"
+    pending = [
+        (ODMTaskResult(result_type=stage_result, workspace=workspace), path)
+        for stage_result in stage_results
+        if (path := odm_task.task_dir / stage_result.relative_path).exists()
+    ]
+    if not pending:
+        return []
+
+    def _ingest(task_result: ODMTaskResult, path: Path):
+        ingested = task_result.ingest(path, f"{path.stem}_{timestamp}{path.suffix}")
+        logger.info(
+            f"Ingested {path.name} of task {odm_task.uuid} "
+            f"({ingested.size} bytes, {ingested.method})"
+        )
 
-    with transaction.atomic(), open(odm_task_result_file_path, "rb") as f:
-        task_result = ODMTaskResult.objects.create(
-            result_type=stage_result,
-            workspace=odm_task.workspace,
-            file=File(f, name=new_filename),
+    task_results = [task_result for task_result, _ in pending]
+    try:
+        with ThreadPoolExecutor(
+            max_workers=settings.RESULTS_INGEST_CONCURRENCY,
+            thread_name_prefix="result-ingest",
+        ) as executor:
+            for future in [executor.submit(_ingest, *item) for item in pending]:
+                future.result()
+        with transaction.atomic():
+            ODMTaskResult.objects.bulk_create(task_results)
+    except Exception:
+        for task_result in task_results:
+            if task_result.file:
+                task_result.file.delete(save=False)
+        raise
+
+    with collect_events():
+        for task_result in task_results:
+            emit_event(
+                workspace.user_id,
+                "task-result:created",
+                {"uuid": str(task_result.uuid), "workspace_name": workspace.name},
+                workspace_uuid=workspace.uuid,
+                task_uuid=odm_task.uuid,
+            )
+        emit_event(
+            workspace.user_id,
+            "task-result:bulk-created",
+            {
+                "uuid": str(odm_task.uuid),
+                "workspace_name": workspace.name,
+                "results": [
+                    {"uuid": str(r.uuid), "result_type": r.result_type}
+                    for r in task_results
+                ],
+            },
+            workspace_uuid=workspace.uuid,
+            task_uuid=odm_task.uuid,
         )
+    return task_results
 
-    emit_event(
-        task_result.workspace.user_id,
-        "task-result:created",
-        {
-            "uuid": str(task_result.uuid),
-            "workspace_name": task_result.workspace.name,
-        },
-    )
+
+def task_node(odm_task: ODMTask) -> NodeODMClient:
+    """
+    Client for the node the task was submitted to. Raises
+    ``NodeCircuitOpenError`` while that node is considered down.
+    """
+    _node_breaker(odm_task).check()
+    return NodeODMClient.for_task(odm_task.uuid, node_url=odm_task.node_url or None)
+
+
+def assign_task_node(odm_task: ODMTask, image_count: int) -> NodeODMClient:
+    """
+    Schedule the task on a node unless it already has one, e.g. when its
+    submission is retried.
+    """
+    if not odm_task.node_url:
+        node = NodeODMRegistry().select(image_count)
+        odm_task.node_url = node.url
+        odm_task.save(update_fields=["node_url"])
+        logger.info(f"Task {odm_task.uuid} scheduled on NodeODM node {node.id}")
+    return task_node(odm_task)
 
 
 def make_temp_gcp_file(odm_task: ODMTask) -> Path:
@@ -113,17 +284,7 @@ def make_temp_gcp_file(odm_task: ODMTask) -> Path:
     )
 
     try:
-        tmp.write("EPSG:4326\n")
-
-        gcps = (
-            GroundControlPoint.objects.filter(image__workspace=odm_task.workspace)
-            .select_related("image")
-            .order_by("label")
-        )
-
-        for gcp in gcps:
-            tmp.write(gcp.to_odm_repr() + "\n")
-
+        tmp.write(render_gcp_file(odm_task))
         tmp.flush()
         return Path(tmp.name)
 
@@ -131,45 +292,57 @@ def make_temp_gcp_file(odm_task: ODMTask) -> Path:
         tmp.close()
 
 
-@shared_task
-def on_task_create(odm_task_uuid: UUID):
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True, ignore_result=True)
+def on_task_create(self, odm_task_uuid: UUID):
     def _create(odm_task: ODMTask):
-        images = Image.objects.filter(workspace=odm_task.workspace, is_thumbnail=False)
-        image_paths = [str(img.image_file.path) for img in images]
-        node = NodeODMClient.for_task(odm_task.uuid)
-        options = {
-            **odm_task.get_current_step_options(),
-            "rerun-from": odm_task.step,
-            "end-with": odm_task.step,
-        }
+        files = dataset_files(odm_task)
+        node = assign_task_node(odm_task, len(files))
+        options = odm_task.get_run_options()
+        if settings.NODEODM_SUBMISSION_MODE == "zipurl":
+            # NodeODM downloads the dataset itself, the worker is done
+            node.create_task_from_zipurl(
+                dataset_zip_url(odm_task), options=options, name=odm_task.name
+            )
+            return
+
         try:
             gcp_path = make_temp_gcp_file(odm_task)
-            node.create_task(
-                files=[*image_paths, str(gcp_path)],
-                options=options,
-                name=odm_task.name,
-            )
+            files[settings.GROUND_CONTROL_POINTS_FILE_NAME] = str(gcp_path)
+            TaskSubmission(odm_task, node).submit(files, options)
         finally:
             gcp_path.unlink(missing_ok=True)
 
-    execute_task_operation(
-        odm_task_uuid,
-        _create,
-        ODMTaskStatus.RUNNING,
-        "task:started",
-    )
+    lock = submission_lock(odm_task_uuid)
+    # A redelivered or resubmitted task must not upload next to a live run
+    if not lock.acquire(blocking=False):
+        logger.info(f"Task {odm_task_uuid} is already being submitted")
+        return
+    try:
+        execute_task_operation(
+            self,
+            odm_task_uuid,
+            _create,
+            ODMTaskStatus.RUNNING,
+            "task:started",
+        )
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning(f"Submission lock of task {odm_task_uuid} expired")
 
 
-@shared_task
-def on_task_pause(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_pause(self, odm_task_uuid: UUID):
     def _pause(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
 
         if not task.cancel():
             raise NodeResponseError("Failed to pause task")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _pause,
         ODMTaskStatus.PAUSED,
@@ -177,22 +350,19 @@ def on_task_pause(odm_task_uuid: UUID):
     )
 
 
-@shared_task
-def on_task_resume(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_resume(self, odm_task_uuid: UUID):
     def _resume(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
 
-        options = {
-            **odm_task.get_current_step_options(),
-            "rerun-from": odm_task.step,
-            "end-with": odm_task.step,
-        }
+        options = odm_task.get_run_options()
 
         if not task.restart(options=options):
             raise NodeResponseError("Failed to resume task")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _resume,
         ODMTaskStatus.RUNNING,
@@ -200,15 +370,16 @@ def on_task_resume(odm_task_uuid: UUID):
     )
 
 
-@shared_task
-def on_task_cancel(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_cancel(self, odm_task_uuid: UUID):
     def _cancel(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
         if not task.remove():
             raise NodeResponseError("Failed to cancel task")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _cancel,
         ODMTaskStatus.CANCELLED,
@@ -216,28 +387,39 @@ def on_task_cancel(odm_task_uuid: UUID):
     )
 
 
-@shared_task
-def on_task_nodeodm_webhook(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_nodeodm_webhook(self, odm_task_uuid: UUID):
     def _next_stage(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
 
-        options = {
-            **odm_task.get_current_step_options(),
-            "rerun-from": odm_task.step,
-            "end-with": odm_task.step,
-        }
-
-        for stage_result in odm_task.odm_step.previous_stage.stage_results:
-            result_file_path = odm_task.task_dir / stage_result.relative_path
-            if not result_file_path.exists():
-                continue
-            save_task_stage_result(odm_task, result_file_path, stage_result)
-
-        if not task.restart(options=options):
-            raise NodeResponseError("Failed to start new stage task")
+        options = odm_task.get_run_options()
+        conn = get_redis_connection("default")
+        ingested_key = stage_ingested_key(odm_task)
+
+        # The next run only reruns later stages, so it can start while the
+        # outputs of the stage that ended the previous run are ingested
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            restarted = executor.submit(task.restart, options=options)
+            try:
+                # Retries after a failed restart must not ingest them twice
+                if not conn.exists(ingested_key):
+                    save_task_stage_results(
+                        odm_task, odm_task.odm_step.previous_stage.stage_results
+                    )
+                    conn.set(
+                        ingested_key, 1, ex=settings.NODEODM_WEBHOOK_DEDUP_TTL_SECONDS
+                    )
+            except Exception:
+                # The task fails, so the run started for it must not go on
+                if restarted.exception() is None and restarted.result():
+                    task.cancel()
+                raise
+            if not restarted.result():
+                raise NodeResponseError("Failed to start new stage task")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _next_stage,
         ODMTaskStatus.RUNNING,
@@ -245,16 +427,17 @@ def on_task_nodeodm_webhook(odm_task_uuid: UUID):
     )
 
 
-@shared_task
-def on_task_finish(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_finish(self, odm_task_uuid: UUID):
     def _finish(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
 
         if not task.remove():
             raise NodeResponseError("Failed to cleanup task artifacts on nodeodm")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _finish,
         ODMTaskStatus.COMPLETED,
@@ -262,18 +445,330 @@ def on_task_finish(odm_task_uuid: UUID):
     )
 
 
-@shared_task
-def on_task_failure(odm_task_uuid: UUID):
+@shared_task(bind=True, ignore_result=True)
+def on_task_failure(self, odm_task_uuid: UUID):
     def _failed(odm_task: ODMTask):
-        node = NodeODMClient.for_task(odm_task.uuid)
+        node = task_node(odm_task)
         task = node.get_task(str(odm_task.uuid))
 
         if not task.remove():
             raise NodeResponseError("Failed to cleanup task artifacts on nodeodm")
 
     execute_task_operation(
+        self,
         odm_task_uuid,
         _failed,
         ODMTaskStatus.FAILED,
         "task:failed",
     )
+
+
+@shared_task(ignore_result=True)
+def poll_running_tasks():
+    """
+    Push ``task:progress`` events for every RUNNING task.
+
+    Each task costs one ``/task/{uuid}/info?with_output=N`` request that
+    returns progress and only the log lines past the stored offset. Requests
+    run concurrently and the resulting events are published as one batch.
+    """
+    running = list(
+        ODMTask.objects.filter(status=ODMTaskStatus.RUNNING).select_related("workspace")
+    )
+    conn = get_redis_connection("default")
+    cursors = {
+        uuid.decode(): json.loads(cursor)
+        for uuid, cursor in conn.hgetall(TASK_PROGRESS_CURSORS_KEY).items()
+    }
+
+    finished = cursors.keys() - {str(odm_task.uuid) for odm_task in running}
+    if finished:
+        conn.hdel(TASK_PROGRESS_CURSORS_KEY, *finished)
+    if not running:
+        return
+
+    def _poll(odm_task: ODMTask):
+        offset, _ = _progress_cursor(cursors, odm_task)
+        try:
+            node = task_node(odm_task)
+            return node.get_task(str(odm_task.uuid)).info(with_output=offset)
+        except OdmError as e:
+            logger.warning(f"Cannot poll progress of task {odm_task.uuid}: {e}")
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=settings.NODEODM_PROGRESS_POLL_CONCURRENCY
+    ) as executor:
+        infos = list(executor.map(_poll, running))
+
+    updated = {}
+    for odm_task, info in zip(running, infos):
+        uuid = str(odm_task.uuid)
+        offset, last_progress = _progress_cursor(cursors, odm_task)
+        if info is None or (not info.output and info.progress == last_progress):
+            continue
+
+        emit_task_event(
+            odm_task,
+            "task:progress",
+            progress=info.progress,
+            offset=offset,
+            output=info.output,
+        )
+        stage = _running_stage(odm_task, info.output)
+        if stage:
+            # Only within the run that was polled, so resumes start there
+            ODMTask.objects.filter(
+                uuid=odm_task.uuid, status=odm_task.status, step=odm_task.step
+            ).update(run_step=stage.value)
+        updated[uuid] = json.dumps(
+            [offset + len(info.output), info.progress, _progress_run(odm_task)]
+        )
+
+    if updated:
+        conn.hset(TASK_PROGRESS_CURSORS_KEY, mapping=updated)
+
+
+@shared_task(ignore_result=True)
+def reconcile_tasks():
+    """
+    Drive tasks whose webhook or Celery task got lost to the state their
+    NodeODM node reports.
+
+    Only tasks that kept the same status and step for
+    ``NODEODM_RECONCILE_GRACE_SECONDS`` are looked at, so in-flight work is
+    left alone. Each node costs one ``/task/list`` plus concurrent
+    ``/task/{uuid}/info`` calls, made with no transaction open. Tasks that
+    moved while their node was queried are skipped, and changes are
+    conditional UPDATEs, so the sweeper never overwrites newer state. A
+    Redis lock keeps sweeps from overlapping.
+    """
+    conn = get_redis_connection("default")
+    lock_ttl = math.ceil(
+        RECONCILE_LOCK_INTERVALS * settings.NODEODM_RECONCILE_INTERVAL_SECONDS
+    )
+    if not conn.set(RECONCILE_LOCK_KEY, 1, nx=True, ex=lock_ttl):
+        logger.info("Skipping reconciliation, another sweep is running")
+        return
+
+    try:
+        odm_tasks = list(
+            ODMTask.objects.filter(status__in=RECONCILED_STATES)
+            .select_related("workspace")
+            .order_by("created_at")[: settings.NODEODM_RECONCILE_BATCH_SIZE]
+        )
+        stuck = _stuck_tasks(odm_tasks)
+        if not stuck:
+            return
+
+        remote_statuses = _remote_statuses(stuck)
+        unchanged = set(
+            ODMTask.objects.filter(
+                uuid__in=[odm_task.uuid for odm_task in stuck]
+            ).values_list("uuid", "status", "step")
+        )
+        reconciled = [
+            odm_task
+            for odm_task in stuck
+            if str(odm_task.uuid) in remote_statuses
+            and (odm_task.uuid, odm_task.status, odm_task.step) in unchanged
+            and reconcile_task(odm_task, remote_statuses[str(odm_task.uuid)])
+        ]
+    finally:
+        conn.delete(RECONCILE_LOCK_KEY)
+
+    if reconciled:
+        # Whatever was redone gets a full grace period of its own
+        conn.delete(*map(reconcile_seen_key, reconciled))
+
+
+def reconcile_task(
+    odm_task: ODMTask, remote_status: Optional[NodeODMTaskStatus]
+) -> bool:
+    """
+    Bring ``odm_task`` in line with its NodeODM status (None when the node
+    does not have it) through the regular handlers. Returns whether
+    anything was done.
+    """
+    # The service enqueues this module's tasks
+    from app.api.services.task import TaskModelService
+
+    uuid = odm_task.uuid
+    active = (NodeODMTaskStatus.QUEUED, NodeODMTaskStatus.RUNNING)
+    match odm_task.odm_status, remote_status:
+        case ODMTaskStatus.CANCELLING, None:
+            _mark_reconciled(odm_task, ODMTaskStatus.CANCELLED, "task:cancelled")
+        case ODMTaskStatus.CANCELLING, _:
+            _enqueue(on_task_cancel, uuid)
+        case ODMTaskStatus.FINISHING, None:
+            _mark_reconciled(odm_task, ODMTaskStatus.COMPLETED, "task:completed")
+        case ODMTaskStatus.FINISHING, _:
+            _enqueue(on_task_finish, uuid)
+        case ODMTaskStatus.QUEUED, None if submission_active(odm_task):
+            # NodeODM only lists a task once its upload is committed
+            return False
+        case ODMTaskStatus.QUEUED, None if odm_task.step == ODMProcessingStage.DATASET:
+            # Submission never completed, it resumes where it stopped
+            _enqueue(on_task_create, uuid)
+        case _, None:
+            handle_task_failure(
+                odm_task,
+                NodeResponseError("Task is missing from its node"),
+                is_node_error=True,
+            )
+        case ODMTaskStatus.PAUSING, NodeODMTaskStatus.CANCELED:
+            _mark_reconciled(odm_task, ODMTaskStatus.PAUSED, "task:paused")
+        case ODMTaskStatus.RESUMING, NodeODMTaskStatus.CANCELED:
+            _enqueue(on_task_resume, uuid)
+        case ODMTaskStatus.QUEUED, NodeODMTaskStatus.COMPLETED:
+            # The previous run ended but the next one never started
+            _enqueue(on_task_nodeodm_webhook, uuid)
+        case _, NodeODMTaskStatus.COMPLETED:
+            # Lost webhook
+            try:
+                TaskModelService(ODMTask).proceed_next_task_step(odm_task)
+            except IllegalTransitionError as e:
+                logger.warning(f"Task {uuid} not reconciled: {e}")
+                return False
+        case _, NodeODMTaskStatus.FAILED | NodeODMTaskStatus.CANCELED:
+            _enqueue(on_task_failure, uuid)
+        case ODMTaskStatus.PAUSING, _:
+            _enqueue(on_task_pause, uuid)
+        case ODMTaskStatus.QUEUED, status if status in active:
+            _mark_reconciled(odm_task, ODMTaskStatus.RUNNING, "task:started")
+        case ODMTaskStatus.RESUMING, status if status in active:
+            _mark_reconciled(odm_task, ODMTaskStatus.RUNNING, "task:resumed")
+        case _:  # RUNNING on both sides
+            return False
+
+    logger.info(
+        f"Reconciled task {uuid} ({odm_task.status} locally, "
+        f"{remote_status.name if remote_status else 'missing'} on its node)"
+    )
+    return True
+
+
+def _progress_run(odm_task: ODMTask) -> str:
+    # Every NodeODM restart (next stage, resume) goes through a new status
+    return odm_task.status_changed_at.isoformat()
+
+
+def _running_stage(
+    odm_task: ODMTask, output: List[str]
+) -> Optional[ODMProcessingStage]:
+    """Latest stage of the task's run that the log lines report starting."""
+    run = odm_task.odm_step.through(odm_task.run_end)
+    for line in reversed(output):
+        match = RUNNING_STAGE_PATTERN.search(line)
+        if match and match.group(1) in run:
+            return ODMProcessingStage(match.group(1))
+    return None
+
+
+def _progress_cursor(
+    cursors: Dict[str, list], odm_task: ODMTask
+) -> Tuple[int, Optional[float]]:
+    """Log offset and progress last reported for the task's current run."""
+    cursor = cursors.get(str(odm_task.uuid))
+    # NodeODM clears a task's output when it restarts it
+    if not cursor or cursor[2:] != [_progress_run(odm_task)]:
+        return 0, None
+    return cursor[0], cursor[1]
+
+
+def _node_breaker(odm_task: ODMTask) -> NodeCircuitBreaker:
+    return NodeCircuitBreaker(odm_task.node_url or settings.NODEODM_URL)
+
+
+def _retry_backoff(retries: int) -> float:
+    return min(
+        settings.NODEODM_TASK_RETRY_BACKOFF_MAX_SECONDS,
+        settings.NODEODM_TASK_RETRY_BACKOFF_SECONDS * 2**retries,
+    )
+
+
+def _enqueue(task: Task, uuid: UUID) -> None:
+    transaction.on_commit(partial(task.delay, uuid))
+
+
+def _mark_reconciled(odm_task: ODMTask, status: ODMTaskStatus, event: str):
+    if save_task_status(odm_task, status):
+        emit_task_event(odm_task, event)
+
+
+def _stuck_tasks(odm_tasks: List[ODMTask]) -> List[ODMTask]:
+    """Tasks that kept their status and step for the grace period."""
+    if not odm_tasks:
+        return []
+
+    conn = get_redis_connection("default")
+    keys = [reconcile_seen_key(odm_task) for odm_task in odm_tasks]
+    # Outlives the sweeps between two sightings of a task
+    ttl = math.ceil(
+        settings.NODEODM_RECONCILE_GRACE_SECONDS
+        + 3 * settings.NODEODM_RECONCILE_INTERVAL_SECONDS
+    )
+    now = time.time()
+
+    stuck = []
+    pipe = conn.pipeline(transaction=False)
+    for odm_task, key, seen in zip(odm_tasks, keys, conn.mget(keys)):
+        state = [odm_task.status, odm_task.step]
+        since = now
+        if seen and (previous := json.loads(seen))[:2] == state:
+            since = previous[2]
+        if now - since >= settings.NODEODM_RECONCILE_GRACE_SECONDS:
+            stuck.append(odm_task)
+        pipe.set(key, json.dumps([*state, since]), ex=ttl)
+    pipe.execute()
+    return stuck
+
+
+def _remote_statuses(
+    odm_tasks: List[ODMTask],
+) -> Dict[str, Optional[NodeODMTaskStatus]]:
+    """
+    Task uuid -> NodeODM status, None for tasks their node does not have.
+    Tasks on nodes that cannot be reached are left out.
+    """
+    statuses: Dict[str, Optional[NodeODMTaskStatus]] = {}
+    by_node = defaultdict(list)
+    for odm_task in odm_tasks:
+        # Tasks without a node were sent to the default one, as in task_node
+        url = odm_task.node_url or settings.NODEODM_URL
+        by_node[url].append(str(odm_task.uuid))
+
+    def _list(url: str):
+        try:
+            return NodeODMClient.for_node(url).list_tasks()
+        except OdmError as e:
+            logger.warning(f"Cannot list tasks of NodeODM node {url}: {e}")
+            return None
+
+    def _info(url_and_uuid):
+        url, uuid = url_and_uuid
+        try:
+            info = NodeODMClient.for_node(url, uuid).get_task(uuid).info()
+            return NodeODMTaskStatus(info.status.value)
+        except (OdmError, ValueError) as e:
+            logger.warning(f"Cannot get status of task {uuid}: {e}")
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=settings.NODEODM_RECONCILE_CONCURRENCY
+    ) as executor:
+        listed = dict(zip(by_node, executor.map(_list, by_node)))
+        known = []
+        for url, uuids in by_node.items():
+            if listed[url] is None:
+                continue
+            for uuid in uuids:
+                if uuid in listed[url]:
+                    known.append((url, uuid))
+                else:
+                    statuses[uuid] = None
+        for (_, uuid), status in zip(known, executor.map(_info, known)):
+            if status is not None:
+                statuses[uuid] = status
+
+    return statuses
@@ -1,12 +1,71 @@
-from typing import List
+from collections import Counter
+from itertools import groupby
+from typing import Dict, List
 from uuid import UUID
-from celery import shared_task
+from celery import group, shared_task
+from django.conf import settings
 
 from app.api.models.image import Image
+from app.api.sse import collect_events, emit_event
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def on_workspace_images_uploaded(image_uuids: List[UUID]):
-    images = Image.objects.filter(uuid__in=image_uuids)
-    for image in images:
-        image.make_thumbnail()
+    """Fan thumbnail generation out to workers in chunks."""
+    image_uuids = [str(image_uuid) for image_uuid in image_uuids]
+    size = settings.THUMBNAIL_CHUNK_SIZE
+    chunks = [
+        image_uuids[start : start + size] for start in range(0, len(image_uuids), size)
+    ]
+    if not chunks:
+        return
+
+    group(
+        make_thumbnails.s(chunk, index, len(chunks))
+        for index, chunk in enumerate(chunks, 1)
+    ).apply_async()
+
+
+# Keeps its result: the counts it returns are what callers read
+@shared_task
+def make_thumbnails(image_uuids: List[str], chunk: int, chunks: int) -> Dict[str, int]:
+    """Returns how many thumbnails were created, skipped and copied (hits)."""
+    images = (
+        Image.objects.filter(uuid__in=image_uuids, is_thumbnail=False)
+        .select_related("workspace")
+        .order_by("workspace_id")
+    )
+    counts = Counter(created=0, skipped=0, hits=0)
+
+    with collect_events():
+        for workspace, workspace_images in groupby(
+            images, key=lambda image: image.workspace
+        ):
+            batch = Image.bulk_make_thumbnails(workspace_images)
+            batch_counts = {
+                "created": len(batch.created),
+                "skipped": batch.skipped,
+                "hits": batch.hits,
+            }
+            counts.update(batch_counts)
+            emit_event(
+                workspace.user_id,
+                "workspace:thumbnails-created",
+                {
+                    "uuid": str(workspace.uuid),
+                    **batch_counts,
+                    "chunk": chunk,
+                    "chunks": chunks,
+                },
+                workspace_uuid=workspace.uuid,
+            )
+
+    return dict(counts)
+
+
+@shared_task(ignore_result=True)
+def make_image_previews(image_uuid: UUID):
+    """Render the previews of an image uploaded before previews existed."""
+    image = Image.objects.filter(uuid=image_uuid, is_thumbnail=False).first()
+    if image is not None:
+        image.make_previews()
@@ -19,6 +19,7 @@ from .mixins import (
     ODMSettingsMixin,
     TusSettingsMixin,
     CelerySettingsMixin,
+    SSESettingsMixin,
 )
 
 
@@ -40,6 +41,7 @@ class PydanticDjangoSettings(
     ODMSettingsMixin,
     TusSettingsMixin,
     CelerySettingsMixin,
+    SSESettingsMixin,
 ):
     """
     Complete Django settings using multiple inheritance.
@@ -15,6 +15,7 @@ from .core import CoreSettingsMixin
 from .odm import ODMSettingsMixin
 from .tus import TusSettingsMixin
 from .celery import CelerySettingsMixin
+from .sse import SSESettingsMixin
 
 __all__ = [
     "AppsSettingsMixin",
@@ -34,4 +35,5 @@ __all__ = [
     "ODMSettingsMixin",
     "TusSettingsMixin",
     "CelerySettingsMixin",
+    "SSESettingsMixin",
 ]
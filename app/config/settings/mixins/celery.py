@@ -1,8 +1,27 @@
-from pydantic import computed_field
+from typing import Any, Dict, Optional
+from pydantic import Field, computed_field
 from .base import BaseSettingsMixin
 
+# Celery queues, by workload class
+CONTROL_QUEUE = "control"  # Pause/resume/cancel calls a user is waiting on
+NODEODM_QUEUE = "nodeodm"  # Long dataset uploads to NodeODM
+RESULTS_QUEUE = "results"  # Disk-heavy result ingestion
+THUMBNAILS_QUEUE = "thumbnails"  # CPU-heavy image processing
+
 
 class CelerySettingsMixin(BaseSettingsMixin):
+    CELERY_TASK_DEFAULT_QUEUE: str = Field(default="default")
+    # The Redis transport serves lower numbers first
+    CELERY_TASK_DEFAULT_PRIORITY: int = Field(default=6, ge=0, le=9)
+    CELERY_CONTROL_TASK_PRIORITY: int = Field(default=0, ge=0, le=9)
+
+    # Set per worker: each queue gets its own workers (see docker-compose.yml)
+    CELERY_WORKER_CONCURRENCY: Optional[int] = Field(default=None, gt=0)
+    CELERY_WORKER_PREFETCH_MULTIPLIER: int = Field(default=1, gt=0)
+    # Unacknowledged tasks are redelivered after this long, so it has to
+    # outlast the slowest acks_late task: a full dataset upload to NodeODM
+    CELERY_BROKER_VISIBILITY_TIMEOUT_SECONDS: int = Field(default=43200, gt=0)
+
     @computed_field
     @property
     def CELERY_BROKER_URL(self) -> str:
@@ -12,3 +31,47 @@ class CelerySettingsMixin(BaseSettingsMixin):
     @property
     def CELERY_RESULT_BACKEND(self) -> str:
         return self.CACHE_LOCATION
+
+    @computed_field
+    @property
+    def CELERY_BROKER_TRANSPORT_OPTIONS(self) -> Dict[str, Any]:
+        # A worker consuming several queues drains them in the order given
+        # to -Q, so listing "control" first keeps it ahead of bulk work
+        return {
+            "queue_order_strategy": "priority",
+            "visibility_timeout": self.CELERY_BROKER_VISIBILITY_TIMEOUT_SECONDS,
+        }
+
+    @computed_field
+    @property
+    def CELERY_TASK_ROUTES(self) -> Dict[str, Dict[str, Any]]:
+        control = {
+            "queue": CONTROL_QUEUE,
+            "priority": self.CELERY_CONTROL_TASK_PRIORITY,
+        }
+        return {
+            "app.api.tasks.task.on_task_pause": control,
+            "app.api.tasks.task.on_task_resume": control,
+            "app.api.tasks.task.on_task_cancel": control,
+            "app.api.tasks.task.on_task_failure": control,
+            "app.api.tasks.task.poll_running_tasks": {"queue": CONTROL_QUEUE},
+            "app.api.tasks.task.reconcile_tasks": {"queue": CONTROL_QUEUE},
+            "app.api.tasks.task.on_task_create": {"queue": NODEODM_QUEUE},
+            "app.api.tasks.task.on_task_nodeodm_webhook": {"queue": RESULTS_QUEUE},
+            "app.api.tasks.task.on_task_finish": {"queue": RESULTS_QUEUE},
+            "app.api.tasks.workspace.*": {"queue": THUMBNAILS_QUEUE},
+        }
+
+    @computed_field
+    @property
+    def CELERY_BEAT_SCHEDULE(self) -> Dict[str, Any]:
+        return {
+            "poll-running-tasks": {
+                "task": "app.api.tasks.task.poll_running_tasks",
+                "schedule": self.NODEODM_PROGRESS_POLL_INTERVAL_SECONDS,
+            },
+            "reconcile-tasks": {
+                "task": "app.api.tasks.task.reconcile_tasks",
+                "schedule": self.NODEODM_RECONCILE_INTERVAL_SECONDS,
+            },
+        }
@@ -41,6 +41,7 @@ class MiddlewareSettingsMixin(BaseSettingsMixin):
                 "django.contrib.auth.middleware.AuthenticationMiddleware",
                 "django.contrib.messages.middleware.MessageMiddleware",
                 "django.middleware.clickjacking.XFrameOptionsMiddleware",
+                "app.api.middleware.EventCollectorMiddleware",
             ]
         )
 
@@ -1,5 +1,5 @@
-from typing import List
-from pydantic import Field, computed_field
+from typing import List, Literal
+from pydantic import Field, computed_field, field_validator
 
 from pathlib import Path
 from .base import BaseSettingsMixin
@@ -11,12 +11,83 @@ class ODMSettingsMixin(BaseSettingsMixin):
     TASKS_DIR_NAME: str = Field(default="tasks")
     THUMBNAILS_DIR_NAME: str = Field(default="thumbnails")
     IMAGES_DIR_NAME: str = Field(default="images")
+    PREVIEWS_DIR_NAME: str = Field(default="previews")
     RESULTS_DIR_NAME: str = Field(default="results")
     GROUND_CONTROL_POINTS_FILE_NAME: str = Field(default="gcp_list.txt")
 
     NINJAODM_BASE_URL: str = Field(...)
     NODEODM_URL: str = Field(...)
+    NODEODM_URLS: List[str] = Field(default=[])
     NODEODM_WEBHOOK_SECRET: str = Field(...)
+    NODEODM_WEBHOOK_DEDUP_TTL_SECONDS: int = Field(default=86400, gt=0)
+
+    NODEODM_HTTP_POOL_SIZE: int = Field(default=16, ge=1)
+    NODEODM_CONNECT_TIMEOUT_SECONDS: float = Field(default=5.0, gt=0)
+    NODEODM_READ_TIMEOUT_SECONDS: float = Field(default=30.0, gt=0)
+    NODEODM_SLOW_CALL_SECONDS: float = Field(default=5.0, gt=0)
+    NODEODM_NODE_INFO_TTL_SECONDS: float = Field(default=15.0, gt=0)
+
+    @field_validator("NODEODM_URLS", mode="before")
+    @classmethod
+    def split_csv_to_urls(cls, v):
+        if isinstance(v, str):
+            return [item.strip() for item in v.split(",") if item.strip()]
+        return v
+
+    NODEODM_PROGRESS_POLL_INTERVAL_SECONDS: float = Field(default=5.0, gt=0)
+    NODEODM_PROGRESS_POLL_CONCURRENCY: int = Field(default=8, ge=1)
+
+    # Sweeper for tasks whose webhook or Celery task got lost
+    NODEODM_RECONCILE_INTERVAL_SECONDS: float = Field(default=60.0, gt=0)
+    NODEODM_RECONCILE_GRACE_SECONDS: float = Field(default=300.0, ge=0)
+    NODEODM_RECONCILE_BATCH_SIZE: int = Field(default=200, ge=1)
+    NODEODM_RECONCILE_CONCURRENCY: int = Field(default=8, ge=1)
+
+    # Retries of node operations failing for transient reasons (connection
+    # errors, timeouts, 5xx) before the task is marked FAILED
+    NODEODM_TASK_MAX_RETRIES: int = Field(default=6, ge=0)
+    NODEODM_TASK_RETRY_BACKOFF_SECONDS: float = Field(default=5.0, ge=0)
+    NODEODM_TASK_RETRY_BACKOFF_MAX_SECONDS: float = Field(default=300.0, ge=0)
+    # The failure window should outlast the cooldown, see NodeCircuitBreaker
+    NODEODM_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, ge=1)
+    NODEODM_CIRCUIT_WINDOW_SECONDS: int = Field(default=120, gt=0)
+    NODEODM_CIRCUIT_COOLDOWN_SECONDS: int = Field(default=30, gt=0)
+
+    NODEODM_COALESCE_STAGES: bool = Field(default=True)
+    NODEODM_SUBMISSION_MODE: Literal["upload", "zipurl"] = Field(default="upload")
+    NODEODM_DATASET_TOKEN_LIFETIME_MINUTES: int = Field(default=30, ge=1)
+    NODEODM_UPLOAD_CONCURRENCY: int = Field(default=8, ge=1)
+    NODEODM_UPLOAD_MAX_RETRIES: int = Field(default=5, ge=0)
+    NODEODM_UPLOAD_RETRY_BACKOFF_SECONDS: float = Field(default=1.0, ge=0)
+    NODEODM_UPLOAD_RETRY_BACKOFF_MAX_SECONDS: float = Field(default=30.0, ge=0)
+    NODEODM_UPLOAD_PROGRESS_INTERVAL_SECONDS: float = Field(default=1.0, ge=0)
+    NODEODM_UPLOAD_STATE_TTL_SECONDS: int = Field(default=86400, gt=0)
+    # Renewed with every uploaded file, so it only needs to outlast one
+    NODEODM_SUBMISSION_LOCK_TTL_SECONDS: int = Field(default=600, gt=0)
+
+    # "reflink" clones the file where the filesystem can, else copies it.
+    # "hardlink" also tries a hardlink first, which shares the inode with
+    # NodeODM's output: only for nodes that never rewrite finished outputs
+    RESULTS_INGEST_MODE: Literal["reflink", "hardlink", "copy"] = Field(
+        default="reflink"
+    )
+    RESULTS_COPY_BUFFER_SIZE: int = Field(default=8 * 1024 * 1024, ge=64 * 1024)
+    RESULTS_INGEST_CONCURRENCY: int = Field(default=4, ge=1)
+
+    THUMBNAIL_CHUNK_SIZE: int = Field(default=50, ge=1)
+    IMAGE_PREVIEW_SIZES: List[int] = Field(default=[128, 512, 1600], min_length=1)
+    IMAGE_PREVIEW_FORMAT: Literal["WEBP", "JPEG"] = Field(default="WEBP")
+    IMAGE_PREVIEW_QUALITY: int = Field(default=80, ge=1, le=100)
+    IMAGE_PREVIEW_MAX_AGE_SECONDS: int = Field(default=31536000, ge=0)
+    IMAGE_PREVIEW_RETRY_AFTER_SECONDS: int = Field(default=2, ge=1)
+    IMAGE_PREVIEW_RENDER_TTL_SECONDS: int = Field(default=60, gt=0)
+
+    @field_validator("IMAGE_PREVIEW_SIZES", mode="before")
+    @classmethod
+    def split_csv_to_sizes(cls, v):
+        if isinstance(v, str):
+            return [int(item) for item in v.split(",")]
+        return v
 
     WORKSPACE_ALLOWED_FILE_MIME_TYPES: List[FILE_MIME_TYPE] = Field(
         default=[
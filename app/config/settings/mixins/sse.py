@@ -0,0 +1,26 @@
+from typing import Literal
+from pydantic import Field
+
+from .base import BaseSettingsMixin
+
+
+class SSESettingsMixin(BaseSettingsMixin):
+    # Per-user event log used for Last-Event-ID replay
+    SSE_STREAM_MAXLEN: int = Field(default=1000, ge=1)
+    SSE_STREAM_TTL_SECONDS: int = Field(default=24 * 60 * 60, ge=1)
+
+    SSE_HEARTBEAT_INTERVAL_SECONDS: float = Field(default=20.0, gt=0)
+
+    # Default and upper bound for the per-connection ``coalesce_ms`` window
+    SSE_COALESCE_WINDOW_MS: int = Field(default=0, ge=0)
+    SSE_COALESCE_MAX_WINDOW_MS: int = Field(default=5000, ge=0)
+
+    # Per-connection buffer between the Redis reader and a (possibly slow) client
+    SSE_QUEUE_MAXSIZE: int = Field(default=256, ge=1)
+    SSE_QUEUE_OVERFLOW_POLICY: Literal["drop_oldest", "coalesce", "disconnect"] = Field(
+        default="drop_oldest"
+    )
+
+    # How often each worker reports to Redis, and the publish-rate window
+    SSE_METRICS_INTERVAL_SECONDS: float = Field(default=10.0, gt=0)
+    SSE_METRICS_WINDOW_SECONDS: int = Field(default=60, ge=1)
@@ -0,0 +1,74 @@
+import json
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+from app.api.constants.odm import ODMProcessingStage, ODMTaskStatus
+from app.api.sse.encoding import encode_event, sse_frame
+
+EVENTS_PER_RUN = 20_000
+SUBSCRIBERS = 10
+EVENT_ID = b"1700000000000-0"
+
+
+def _event_data():
+    return {
+        "uuid": uuid4(),
+        "status": ODMTaskStatus.RUNNING,
+        "step": ODMProcessingStage.OPENSFM,
+        "progress": 42.5,
+        "updated_at": datetime.now(timezone.utc),
+        "output": [f"[12:00:{i:02d}] Matching features" for i in range(10)],
+    }
+
+
+def _legacy_path(data) -> None:
+    """Previous pipeline: stringify, json.dumps, then decode + f-string per subscriber."""
+    payload = json.dumps(
+        {
+            "event": "task:progress",
+            "data": {
+                **data,
+                "uuid": str(data["uuid"]),
+                "status": str(data["status"]),
+                "step": str(data["step"]),
+                "updated_at": data["updated_at"].isoformat(),
+            },
+        }
+    ).encode("utf-8")
+    for _ in range(SUBSCRIBERS):
+        frame = f"id: {EVENT_ID.decode('utf-8')}\ndata: {payload.decode('utf-8')}\n\n"
+        frame.encode("utf-8")  # what StreamingHttpResponse does with str chunks
+
+
+def _current_path(data) -> None:
+    payload = encode_event("task:progress", data)
+    for _ in range(SUBSCRIBERS):
+        sse_frame(EVENT_ID, payload)
+
+
+def _events_per_second(path) -> float:
+    events = [_event_data() for _ in range(EVENTS_PER_RUN)]
+    start = time.perf_counter()
+    for data in events:
+        path(data)
+    return EVENTS_PER_RUN / (time.perf_counter() - start)
+
+
+@pytest.mark.slow
+def test_sse_encoding_benchmark(capsys):
+    legacy = _events_per_second(_legacy_path)
+    current = _events_per_second(_current_path)
+
+    with capsys.disabled():
+        print()
+        print(
+            f"{'pipeline':>10} | {'events/s (x' + str(SUBSCRIBERS) + ' subscribers)':>30}"
+        )
+        print(f"{'json+str':>10} | {legacy:>30,.0f}")
+        print(f"{'orjson':>10} | {current:>30,.0f}")
+        print(f"{'speed-up':>10} | {current / legacy:>29.2f}x")
+
+    assert current > legacy
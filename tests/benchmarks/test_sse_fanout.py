@@ -0,0 +1,101 @@
+import time
+import asyncio
+import pytest
+import fakeredis
+from unittest.mock import patch
+
+from app.api.sse import RedisEventBroker, emit_event, user_channel
+
+CLIENT_COUNTS = [1, 10, 100, 1000]
+EVENTS_PER_RUN = 20
+
+
+class ConnectionCounter:
+    """Stands in for ``aioredis.from_url`` and counts opened connections."""
+
+    def __init__(self, server):
+        self.server = server
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+        return fakeredis.FakeAsyncRedis(server=self.server)
+
+
+async def _measure_fan_out(queues, user_id: str) -> float:
+    """Average seconds between publish and delivery to every client."""
+    total = 0.0
+    for i in range(EVENTS_PER_RUN):
+        start = time.perf_counter()
+        emit_event(user_id, "workspace:updated", {"uuid": str(i), "name": "bench"})
+        await asyncio.gather(*(queue.get() for queue in queues))
+        total += time.perf_counter() - start
+    return total / EVENTS_PER_RUN
+
+
+async def _run_shared_broker(server, clients: int):
+    counter = ConnectionCounter(server)
+    with patch("app.api.sse.broker.aioredis.from_url", counter):
+        broker = RedisEventBroker()
+        queues = [await broker.subscribe("bench") for _ in range(clients)]
+        latency = await _measure_fan_out(queues, "bench")
+        for queue in queues:
+            await broker.unsubscribe("bench", queue)
+    return counter.count, latency
+
+
+async def _run_per_client_pubsub(server, clients: int):
+    """Baseline: the previous one-connection-per-client stream."""
+    counter = ConnectionCounter(server)
+    connections = []
+    for _ in range(clients):
+        redis = counter()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(user_channel("bench"))
+        connections.append((redis, pubsub))
+
+    async def _next(pubsub):
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=1.0
+            )
+            if message:
+                return message
+
+    total = 0.0
+    for i in range(EVENTS_PER_RUN):
+        start = time.perf_counter()
+        emit_event("bench", "workspace:updated", {"uuid": str(i), "name": "bench"})
+        await asyncio.gather(*(_next(pubsub) for _, pubsub in connections))
+        total += time.perf_counter() - start
+
+    for redis, pubsub in connections:
+        await pubsub.aclose()
+        await redis.aclose()
+    return counter.count, total / EVENTS_PER_RUN
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_sse_fan_out_benchmark(mock_redis, capsys):
+    rows = []
+    for clients in CLIENT_COUNTS:
+        per_client = await _run_per_client_pubsub(mock_redis, clients)
+        shared = await _run_shared_broker(mock_redis, clients)
+        rows.append((clients, per_client, shared))
+
+    with capsys.disabled():
+        print()
+        print(
+            f"{'clients':>8} | {'conns (per-client)':>18} | {'fan-out ms':>10} "
+            f"| {'conns (shared)':>14} | {'fan-out ms':>10}"
+        )
+        for clients, (old_conns, old_lat), (new_conns, new_lat) in rows:
+            print(
+                f"{clients:>8} | {old_conns:>18} | {old_lat * 1000:>10.3f} "
+                f"| {new_conns:>14} | {new_lat * 1000:>10.3f}"
+            )
+
+    for clients, (old_conns, _), (new_conns, _) in rows:
+        assert old_conns == clients
+        assert new_conns == 1
@@ -52,6 +52,9 @@ def test_settings(tmp_path_factory, settings):
     settings.TUS_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     settings.CELERY_TASK_ALWAYS_EAGER = True
     settings.CELERY_TASK_EAGER_PROPAGATES = True
+    settings.NODEODM_UPLOAD_RETRY_BACKOFF_SECONDS = 0
+    # Eager retries raise ``Retry``, so tests of retries set their own budget
+    settings.NODEODM_TASK_MAX_RETRIES = 0
     yield
 
 
@@ -82,7 +85,7 @@ def mock_redis():
     sync_redis = fakeredis.FakeRedis(server=server)
 
     with (
-        patch("app.api.sse.aioredis.from_url", return_value=async_redis),
+        patch("app.api.sse.broker.aioredis.from_url", return_value=async_redis),
         patch("django_redis.client.DefaultClient.get_client", return_value=sync_redis),
         patch("django_redis.get_redis_connection", return_value=sync_redis),
     ):
@@ -1,6 +1,10 @@
+import io
 import pytest
 from datetime import timedelta
+from unittest.mock import patch
+from django.core.files.storage import default_storage
 from django.utils import timezone
+from PIL import Image as PILImage
 from ninja_extra.testing import TestClient
 
 from app.api.models.image import Image
@@ -83,6 +87,18 @@ def user_image_factory(image_factory, user_image_workspace, image_file_factory):
     return factory
 
 
+@pytest.fixture
+def user_previewed_image_factory(user_image_factory):
+    """Factory for user_999's images with their previews rendered."""
+
+    def factory(**kwargs):
+        image = user_image_factory(**kwargs)
+        image.make_previews()
+        return image
+
+    return factory
+
+
 @pytest.fixture
 def other_image_factory(user_image_factory, other_image_workspace):
     """Factory for images with file in other user's workspace."""
@@ -211,6 +227,22 @@ def assert_image_download(image_file_factory):
     return assertion
 
 
+@pytest.fixture
+def assert_image_preview():
+    """Assertion for a cacheable WebP preview."""
+
+    def assertion(obj, resp):
+        assert resp.status_code == 200
+        assert resp.headers["Content-Type"] == "image/webp"
+        assert "immutable" in resp.headers["Cache-Control"]
+        with PILImage.open(io.BytesIO(resp.content)) as im:
+            assert im.format == "WEBP"
+            assert max(im.size) <= 512
+        return True
+
+    return assertion
+
+
 # =========================================================================
 # TEST SUITE
 # =========================================================================
@@ -238,8 +270,9 @@ class TestImageAPI(APITestSuite):
                 "scenarios": [
                     {
                         "name": "jwt_own",
-                        "assert": lambda s, obj, resp: str(obj.uuid)
-                        == resp.json()["uuid"],
+                        "assert": lambda s, obj, resp: (
+                            str(obj.uuid) == resp.json()["uuid"]
+                        ),
                     },
                     {
                         "name": "jwt_other_denied",
@@ -289,6 +322,23 @@ class TestImageAPI(APITestSuite):
                     },
                 ],
             },
+            "preview": {
+                "url": lambda s, obj: f"/{obj.uuid}/preview?size=300",
+                "method": "get",
+                "scenarios": [
+                    {
+                        "name": "jwt_own",
+                        "factory": "user_previewed_image_factory",
+                        "assert": "assert_image_preview",
+                    },
+                    {
+                        "name": "jwt_other_denied",
+                        "factory": "other_image_factory",
+                        "expected_status": [403, 404],
+                        "access_denied": True,
+                    },
+                ],
+            },
         },
         # ===== LIST =====
         "list": {
@@ -317,3 +367,97 @@ class TestImageAPI(APITestSuite):
             ],
         },
     }
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestImagePreview:
+    @pytest.fixture
+    def image(self, user_image_factory):
+        return user_image_factory()
+
+    @pytest.fixture
+    def rendered_image(self, image):
+        image.make_previews()
+        return image
+
+    def _preview(self, client, image, size, **headers):
+        return client.get(f"/{image.uuid}/preview?size={size}", headers=headers)
+
+    @pytest.mark.parametrize(
+        "requested, served", [(1, 128), (128, 128), (129, 512), (4000, 1600)]
+    )
+    def test_serves_smallest_covering_size(
+        self, image_public_client, rendered_image, requested, served
+    ):
+        resp = self._preview(image_public_client, rendered_image, requested)
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] == f'"{rendered_image.uuid}-{served}.webp"'
+
+    def test_missing_previews_are_rendered_by_a_worker(
+        self, image_public_client, image
+    ):
+        resp = self._preview(image_public_client, image, 128)
+
+        assert resp.status_code == 202
+        assert resp.headers["Retry-After"] == "2"
+        for size in (128, 512, 1600):
+            assert default_storage.exists(image.preview_name(size))
+        assert self._preview(image_public_client, image, 128).status_code == 200
+
+    def test_render_is_queued_once(self, image_public_client, image):
+        with patch("app.api.services.image.make_image_previews") as render:
+            for _ in range(3):
+                resp = self._preview(image_public_client, image, 128)
+                assert resp.status_code == 202
+
+        render.delay.assert_called_once_with(image.uuid)
+
+    def test_revalidation_returns_not_modified(
+        self, image_public_client, rendered_image
+    ):
+        etag = self._preview(image_public_client, rendered_image, 512).headers["ETag"]
+        resp = self._preview(
+            image_public_client, rendered_image, 512, **{"If-None-Match": etag}
+        )
+        assert resp.status_code == 304
+        assert "max-age=31536000" in resp.headers["Cache-Control"]
+
+    def test_jpeg_previews(self, settings, image_public_client, image):
+        settings.IMAGE_PREVIEW_FORMAT = "JPEG"
+        image.make_previews()
+        resp = self._preview(image_public_client, image, 128)
+        assert resp.headers["Content-Type"] == "image/jpeg"
+        with PILImage.open(io.BytesIO(resp.content)) as im:
+            assert im.format == "JPEG"
+            assert im.size == (128, 128)
+
+    def test_thumbnails_have_no_previews(self, image_public_client, user_image_factory):
+        thumbnail = user_image_factory(is_thumbnail=True)
+
+        with patch("app.api.services.image.make_image_previews") as render:
+            resp = self._preview(image_public_client, thumbnail, 128)
+
+        assert resp.status_code == 404
+        render.delay.assert_not_called()
+
+    def test_rejects_non_positive_size(self, image_public_client, image):
+        assert self._preview(image_public_client, image, 0).status_code == 422
+
+    def test_delete_removes_previews(
+        self, image_public_client, rendered_image, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            image_public_client.delete(f"/{rendered_image.uuid}")
+
+        assert not default_storage.exists(rendered_image.preview_name(128))
+        assert not default_storage.exists(rendered_image.image_file.name)
+
+    def test_workspace_delete_removes_image_files(
+        self, rendered_image, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            rendered_image.workspace.delete()
+
+        assert not default_storage.exists(rendered_image.preview_name(128))
+        assert not default_storage.exists(rendered_image.image_file.name)
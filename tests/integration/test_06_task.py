@@ -1,12 +1,18 @@
+import io
+import zipfile
 import pytest
+from pathlib import Path
 from uuid import uuid4
 from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient
 from django.utils import timezone
 from ninja_extra.testing import TestClient
 
 from app.api.models.task import ODMTask
 from app.api.models.workspace import Workspace
 from app.api.auth.nodeodm import NodeODMServiceAuth
+from app.api.constants.token import DatasetToken
 from app.api.constants.odm import ODMTaskStatus, ODMProcessingStage, NodeODMTaskStatus
 from app.api.controllers.task import TaskControllerInternal, TaskControllerPublic
 from tests.utils import APITestSuite, AuthStrategyEnum, AuthenticatedTestClient
@@ -100,9 +106,19 @@ def user_non_terminal_task_factory(odm_task_factory, user_task_workspace):
     return factory
 
 
+@pytest.fixture
+def user_paused_task_factory(odm_task_factory, user_task_workspace):
+    def factory(**kwargs):
+        kwargs.setdefault("status", ODMTaskStatus.PAUSED)
+        return odm_task_factory(workspace=user_task_workspace, **kwargs)
+
+    return factory
+
+
 @pytest.fixture
 def webhook_task_meshing_factory(odm_task_factory, workspace_factory):
     def factory(**kwargs):
+        kwargs.setdefault("status", ODMTaskStatus.RUNNING)
         ws = workspace_factory()
         return odm_task_factory(
             workspace=ws, step=ODMProcessingStage.ODM_MESHING, **kwargs
@@ -114,6 +130,7 @@ def webhook_task_meshing_factory(odm_task_factory, workspace_factory):
 @pytest.fixture
 def webhook_task_postprocess_factory(odm_task_factory, workspace_factory):
     def factory(**kwargs):
+        kwargs.setdefault("status", ODMTaskStatus.RUNNING)
         ws = workspace_factory()
         return odm_task_factory(
             workspace=ws, step=ODMProcessingStage.ODM_POSTPROCESS, **kwargs
@@ -159,6 +176,27 @@ def invalid_nodeodm_signature():
     return NodeODMServiceAuth.generate_hmac_signature("INVALID_HMAC_MESSAGE")
 
 
+# =========================================================================
+# DATASET FIXTURES
+# =========================================================================
+
+
+@pytest.fixture
+def dataset_task_factory(
+    odm_task_factory, workspace_factory, image_factory, image_file_factory
+):
+    def factory(**kwargs):
+        ws = workspace_factory()
+        for i in range(2):
+            image_factory(
+                workspace=ws, image_file=image_file_factory(name=f"img_{i}.jpg")
+            )
+        image_factory(workspace=ws, image_file=image_file_factory(), is_thumbnail=True)
+        return odm_task_factory(workspace=ws, **kwargs)
+
+    return factory
+
+
 # =========================================================================
 # ASSERTION FIXTURES
 # =========================================================================
@@ -222,6 +260,20 @@ def assert_webhook_processed(mock_task_on_task_nodeodm_webhook):
     return assertion
 
 
+@pytest.fixture
+def assert_task_advanced_to_next_run(mock_task_on_task_nodeodm_webhook):
+    def assertion(obj, resp):
+        assert resp.status_code == 200
+        obj.refresh_from_db()
+        # Meshing ran together with texturing, the next run georeferences
+        assert obj.odm_step == ODMProcessingStage.ODM_GEOREFERENCING
+        assert obj.odm_status == ODMTaskStatus.QUEUED
+        mock_task_on_task_nodeodm_webhook.delay.assert_called_with(obj.uuid)
+        return True
+
+    return assertion
+
+
 @pytest.fixture
 def assert_task_finished(mock_task_on_task_finish):
     def assertion(obj, resp):
@@ -503,7 +555,16 @@ class TestTaskAPI(APITestSuite):
                 "url": lambda s, obj: f"/{obj.uuid}/pause",
                 "method": "post",
                 "scenarios": [
-                    {"name": "jwt_own", "assert": "assert_task_paused"},
+                    {
+                        "name": "jwt_own",
+                        "factory": "user_non_terminal_task_factory",
+                        "assert": "assert_task_paused",
+                    },
+                    {
+                        "name": "jwt_own_paused_conflict",
+                        "factory": "user_paused_task_factory",
+                        "expected_status": 409,
+                    },
                     {
                         "name": "jwt_other_denied",
                         "factory": "other_task_factory",
@@ -516,14 +577,32 @@ class TestTaskAPI(APITestSuite):
                 "url": lambda s, obj: f"/{obj.uuid}/resume",
                 "method": "post",
                 "scenarios": [
-                    {"name": "jwt_own", "assert": "assert_task_resumed"},
+                    {
+                        "name": "jwt_own",
+                        "factory": "user_paused_task_factory",
+                        "assert": "assert_task_resumed",
+                    },
+                    {
+                        "name": "jwt_own_running_conflict",
+                        "factory": "user_non_terminal_task_factory",
+                        "expected_status": 409,
+                    },
                 ],
             },
             "cancel": {
                 "url": lambda s, obj: f"/{obj.uuid}/cancel",
                 "method": "post",
                 "scenarios": [
-                    {"name": "jwt_own", "assert": "assert_task_cancelled"},
+                    {
+                        "name": "jwt_own",
+                        "factory": "user_non_terminal_task_factory",
+                        "assert": "assert_task_cancelled",
+                    },
+                    {
+                        "name": "jwt_own_terminal_conflict",
+                        "factory": "user_terminal_task_factory",
+                        "expected_status": 409,
+                    },
                 ],
             },
             # ----- NodeODM Webhook -----
@@ -561,6 +640,51 @@ class TestTaskAPI(APITestSuite):
                     },
                 ],
             },
+            "webhook_meshing_completed": {
+                "url": lambda s,
+                obj: f"/{obj.uuid}/webhooks/odm?signature={s.fixture('valid_nodeodm_signature')}",
+                "method": "post",
+                "payload": lambda s: {
+                    **s.fixture("nodeodm_webhook_payload"),
+                    "status": {"code": NodeODMTaskStatus.COMPLETED},
+                },
+                "scenarios": [
+                    {
+                        "name": "next_run_queued",
+                        "client": "task_internal_client",
+                        "factory": "webhook_task_meshing_factory",
+                        "assert": "assert_task_advanced_to_next_run",
+                    },
+                ],
+            },
+            "dataset_zip_foreign_token": {
+                "url": lambda s, obj: (
+                    f"/{obj.uuid}/dataset.zip?token={DatasetToken.for_task(s.fixture('any_task_factory')())}"
+                ),
+                "method": "get",
+                "scenarios": [
+                    {
+                        "name": "other_task_token_denied",
+                        "client": "task_anon_internal_client",
+                        "factory": "dataset_task_factory",
+                        "expected_status": [403, 404],
+                        "access_denied": True,
+                    },
+                ],
+            },
+            "dataset_zip_invalid_token": {
+                "url": lambda s, obj: f"/{obj.uuid}/dataset.zip?token=invalid",
+                "method": "get",
+                "scenarios": [
+                    {
+                        "name": "invalid_token_denied",
+                        "client": "task_anon_internal_client",
+                        "factory": "dataset_task_factory",
+                        "expected_status": 401,
+                        "access_denied": True,
+                    },
+                ],
+            },
             "webhook_invalid_signature": {
                 "url": lambda s,
                 obj: f"/{obj.uuid}/webhooks/odm?signature={s.fixture('invalid_nodeodm_signature')}",
@@ -599,3 +723,202 @@ class TestTaskAPI(APITestSuite):
             ],
         },
     }
+
+
+# =========================================================================
+# WEBHOOK DELIVERY
+# =========================================================================
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestNodeODMWebhookDelivery:
+    @pytest.fixture
+    def post_webhook(self, task_internal_client, valid_nodeodm_signature):
+        def _post(task, payload):
+            return task_internal_client.post(
+                f"/{task.uuid}/webhooks/odm?signature={valid_nodeodm_signature}",
+                json=payload,
+            )
+
+        return _post
+
+    def test_redelivery_is_processed_once(
+        self,
+        post_webhook,
+        webhook_task_meshing_factory,
+        nodeodm_webhook_payload,
+        mock_task_on_task_nodeodm_webhook,
+    ):
+        task = webhook_task_meshing_factory()
+
+        first = post_webhook(task, nodeodm_webhook_payload)
+        task.refresh_from_db()
+        second = post_webhook(task, nodeodm_webhook_payload)
+
+        assert first.json() == {"message": "ok"}
+        assert second.status_code == 200
+        assert second.json() == {"message": "duplicate"}
+        mock_task_on_task_nodeodm_webhook.delay.assert_called_once_with(task.uuid)
+
+    def test_callback_about_the_next_run_is_processed(
+        self,
+        post_webhook,
+        webhook_task_meshing_factory,
+        nodeodm_webhook_payload,
+        mock_task_on_task_nodeodm_webhook,
+    ):
+        task = webhook_task_meshing_factory()
+        post_webhook(task, nodeodm_webhook_payload)
+
+        response = post_webhook(
+            task, {**nodeodm_webhook_payload, "processingTime": 456.78}
+        )
+
+        assert response.json() == {"message": "ok"}
+        assert mock_task_on_task_nodeodm_webhook.delay.call_count == 2
+
+    def test_later_run_reporting_the_same_times_is_processed(
+        self,
+        post_webhook,
+        webhook_task_meshing_factory,
+        nodeodm_webhook_payload,
+        mock_task_on_task_nodeodm_webhook,
+    ):
+        task = webhook_task_meshing_factory()
+        post_webhook(task, nodeodm_webhook_payload)
+        ODMTask.objects.filter(uuid=task.uuid).update(
+            status=ODMTaskStatus.RUNNING, step=ODMProcessingStage.ODM_DEM
+        )
+
+        response = post_webhook(task, nodeodm_webhook_payload)
+
+        assert response.json() == {"message": "ok"}
+        assert mock_task_on_task_nodeodm_webhook.delay.call_count == 2
+
+    def test_stale_task_does_not_advance_twice(
+        self,
+        webhook_task_meshing_factory,
+        mock_task_on_task_nodeodm_webhook,
+    ):
+        from app.api.services.task import TaskModelService
+
+        task = webhook_task_meshing_factory(status=ODMTaskStatus.RUNNING)
+        stale = ODMTask.objects.get(uuid=task.uuid)
+        service = TaskModelService(ODMTask)
+
+        service.proceed_next_task_step(task)
+        service.proceed_next_task_step(stale)
+
+        task.refresh_from_db()
+        assert task.odm_step == ODMProcessingStage.ODM_GEOREFERENCING
+        mock_task_on_task_nodeodm_webhook.delay.assert_called_once_with(task.uuid)
+
+    def test_failed_processing_releases_the_delivery(
+        self,
+        post_webhook,
+        webhook_task_meshing_factory,
+        nodeodm_webhook_payload,
+        mock_task_on_task_nodeodm_webhook,
+    ):
+        task = webhook_task_meshing_factory()
+        mock_task_on_task_nodeodm_webhook.delay.side_effect = [
+            ConnectionError("broker down"),
+            None,
+        ]
+
+        with pytest.raises(ConnectionError):
+            post_webhook(task, nodeodm_webhook_payload)
+        response = post_webhook(task, nodeodm_webhook_payload)
+
+        assert response.json() == {"message": "ok"}
+
+
+# =========================================================================
+# TRANSITION LOG
+# =========================================================================
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis", "mock_task_on_task_pause")
+class TestTaskTransitionLog:
+    def test_lists_transitions_in_order(
+        self, task_public_client, user_non_terminal_task_factory
+    ):
+        task = user_non_terminal_task_factory()
+        task_public_client.post(f"/{task.uuid}/pause")
+        task.refresh_from_db()
+        task.transition(ODMTaskStatus.PAUSED)
+
+        response = task_public_client.get(f"/{task.uuid}/transitions")
+
+        assert response.status_code == 200
+        assert [(t["from_status"], t["to_status"]) for t in response.json()] == [
+            ("running", "pausing"),
+            ("pausing", "paused"),
+        ]
+        assert all(t["duration"] >= 0 for t in response.json())
+
+    def test_other_users_task_is_denied(self, task_public_client, other_task_factory):
+        task = other_task_factory()
+
+        response = task_public_client.get(f"/{task.uuid}/transitions")
+
+        assert response.status_code in [403, 404]
+
+    def test_transitions_path_is_not_an_action(
+        self, task_public_client, user_non_terminal_task_factory
+    ):
+        task = user_non_terminal_task_factory()
+
+        response = task_public_client.post(f"/{task.uuid}/transitions")
+
+        assert response.status_code == 405
+        task.refresh_from_db()
+        assert task.status == ODMTaskStatus.RUNNING
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_redis")
+class TestDatasetZip:
+    @pytest.fixture
+    def task(self, dataset_task_factory):
+        return dataset_task_factory()
+
+    async def _download(self, task):
+        return await AsyncClient().get(
+            f"/api/internal/tasks/{task.uuid}/dataset.zip"
+            f"?token={DatasetToken.for_task(task)}"
+        )
+
+    async def test_streams_the_dataset(self, task):
+        response = await self._download(task)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/zip"
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        with zipfile.ZipFile(io.BytesIO(content)) as zf:
+            assert zf.testzip() is None
+            assert zf.read("gcp_list.txt").startswith(b"EPSG:4326")
+            names = zf.namelist()
+        images = await sync_to_async(list)(
+            task.workspace.images.filter(is_thumbnail=False)
+        )
+        assert sorted(names) == sorted(
+            [*(Path(image.image_file.name).name for image in images), "gcp_list.txt"]
+        )
+
+    async def test_chunks_are_sent_as_they_are_read(self, monkeypatch, task):
+        monkeypatch.setattr("app.api.tasks.submission.ZIP_CHUNK_SIZE", 1024)
+
+        response = await self._download(task)
+
+        # Read asynchronously, so Django does not buffer the whole body
+        assert response.is_async
+        chunks = response.streaming_content.__aiter__()
+        first = await chunks.__anext__()
+        assert 0 < len(first) <= 2 * 1024
+        sizes = [len(chunk) async for chunk in chunks]
+        assert len(sizes) > 2
+        assert max(sizes) <= 2 * 1024
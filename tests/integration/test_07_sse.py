@@ -1,7 +1,13 @@
 import pytest
 import pytest_asyncio
 import asyncio
+import json
+import time
+from uuid import UUID, uuid4
+import fakeredis
+from unittest.mock import patch
 from asgiref.sync import sync_to_async
+from django.db import transaction
 from django.test import AsyncClient
 
 from app.api.controllers.workspace import WorkspaceControllerPublic
@@ -9,7 +15,27 @@ from app.api.controllers.task import TaskControllerPublic
 from app.api.controllers.gcp import GCPControllerPublic
 from app.api.controllers.image import ImageControllerPublic
 from app.api.controllers.result import ResultControllerPublic
+from app.api.controllers.sse import SSEControllerInternal
 from app.api.constants.odm import ODMTaskStatus
+from app.api.sse import broker as sse_broker
+from app.api.sse import metrics as sse_metrics
+from app.api.sse.coalescing import coalesce
+from app.api.sse.events import (
+    EventMessage,
+    PendingEvent,
+    publish_events,
+    user_channel,
+)
+from app.api.sse.filters import EventFilter
+from app.api.sse.queue import OVERFLOWED, SubscriberQueue
+from app.api.constants.sse import SSEOverflowPolicy
+from app.api.sse import (
+    RedisEventBroker,
+    collect_events,
+    emit_event,
+    get_event_broker,
+    user_stream,
+)
 from tests.utils import AuthenticatedTestClient, AuthStrategyEnum
 
 
@@ -62,7 +88,7 @@ class SSEListener:
             raise TimeoutError("SSE Stream stopped or timed out.")
 
 
-@pytest.mark.django_db
+@pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
 class TestSSEAPIPublic:
     @pytest.fixture
@@ -173,12 +199,30 @@ class TestSSEAPIPublic:
         )
 
     @pytest.mark.parametrize(
-        "action_key, payload, event_type, expected_status, mock_fixture",
+        "action_key, status, event_type, expected_status, mock_fixture",
         [
-            ("pause", None, "task:updated", 200, "mock_task_on_task_pause"),
-            ("resume", None, "task:updated", 200, "mock_task_on_task_resume"),
-            ("cancel", None, "task:updated", 200, "mock_task_on_task_cancel"),
-            ("delete", None, "task:deleted", 204, None),
+            (
+                "pause",
+                ODMTaskStatus.RUNNING,
+                "task:updated",
+                200,
+                "mock_task_on_task_pause",
+            ),
+            (
+                "resume",
+                ODMTaskStatus.PAUSED,
+                "task:updated",
+                200,
+                "mock_task_on_task_resume",
+            ),
+            (
+                "cancel",
+                ODMTaskStatus.RUNNING,
+                "task:updated",
+                200,
+                "mock_task_on_task_cancel",
+            ),
+            ("delete", ODMTaskStatus.COMPLETED, "task:deleted", 204, None),
         ],
     )
     async def test_odm_task_lifecycle(
@@ -188,7 +232,7 @@ class TestSSEAPIPublic:
         odm_task_factory,
         workspace_factory,
         action_key,
-        payload,
+        status,
         event_type,
         expected_status,
         mock_fixture,
@@ -198,7 +242,7 @@ class TestSSEAPIPublic:
             request.getfixturevalue(mock_fixture)
         user_workspace = await sync_to_async(workspace_factory)(user_id="user_999")
         odm_task = await sync_to_async(odm_task_factory)(
-            workspace=user_workspace, status=ODMTaskStatus.COMPLETED
+            workspace=user_workspace, status=status
         )
 
         await self._run_lifecycle_test(
@@ -206,7 +250,7 @@ class TestSSEAPIPublic:
             target_obj=odm_task,
             action_func=TASK_ACTIONS[action_key],
             listener=sse_listener,
-            payload=payload,
+            payload=None,
             expected_status=expected_status,
             expected_event_key=event_type,
         )
@@ -326,3 +370,581 @@ class TestSSEAPIPublic:
             expected_status=expected_status,
             expected_event_key=event_type,
         )
+
+
+@pytest.mark.asyncio
+class TestRedisEventBroker:
+    async def test_single_connection_fans_out_per_user(self, mock_redis):
+        broker = RedisEventBroker()
+        queues = [await broker.subscribe("user_999") for _ in range(3)]
+        other = await broker.subscribe("user_111")
+
+        assert sse_broker.aioredis.from_url.call_count == 1
+        assert broker.subscriber_count == 4
+        assert broker.channel_count == 2
+
+        emit_event("user_999", "workspace:created", {"uuid": "abc", "name": "x"})
+
+        for queue in queues:
+            data = await asyncio.wait_for(queue.get(), timeout=2)
+            assert b"workspace:created" in data
+        assert other.empty()
+
+        for queue in queues:
+            await broker.unsubscribe("user_999", queue)
+        assert broker.channel_count == 1
+
+        await broker.unsubscribe("user_111", other)
+        assert broker.subscriber_count == 0
+        assert broker._reader is None
+
+    async def test_reconnects_after_last_subscriber_left(self, mock_redis):
+        broker = RedisEventBroker()
+        queue = await broker.subscribe("user_999")
+        await broker.unsubscribe("user_999", queue)
+
+        queue = await broker.subscribe("user_999")
+        emit_event("user_999", "workspace:deleted", {"uuid": "abc", "name": "x"})
+
+        data = await asyncio.wait_for(queue.get(), timeout=2)
+        assert b"workspace:deleted" in data
+        assert sse_broker.aioredis.from_url.call_count == 2
+        await broker.unsubscribe("user_999", queue)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestSSEReplay:
+    async def _connect(self, valid_token, **headers):
+        client = AsyncClient()
+        response = await client.get(
+            "/api/events",
+            headers={"Authorization": f"Bearer {valid_token}", **headers},
+        )
+        assert response.status_code == 200
+        listener = SSEListener(response)
+        assert ": ok" in await listener.next_event()
+        return response, listener
+
+    async def test_frames_carry_stream_ids(self, valid_token, mock_redis):
+        response, listener = await self._connect(valid_token)
+        emit_event("user_999", "workspace:created", {"uuid": "abc", "name": "x"})
+
+        frame = await listener.next_event()
+        stream = fakeredis.FakeRedis(server=mock_redis).xrange(user_stream("user_999"))
+        assert frame.startswith(f"id: {stream[-1][0].decode()}\n")
+        assert "workspace:created" in frame
+        response.close()
+
+    async def test_replays_events_after_last_event_id(self, valid_token, mock_redis):
+        for name in ("first", "second", "third"):
+            emit_event("user_999", "workspace:updated", {"uuid": name, "name": name})
+        stream = fakeredis.FakeRedis(server=mock_redis).xrange(user_stream("user_999"))
+
+        response, listener = await self._connect(
+            valid_token, **{"Last-Event-ID": stream[0][0].decode()}
+        )
+
+        assert '"second"' in await listener.next_event()
+        assert '"third"' in await listener.next_event()
+
+        emit_event("user_999", "workspace:updated", {"uuid": "live", "name": "live"})
+        assert '"live"' in await listener.next_event()
+        response.close()
+
+    async def test_trimmed_last_event_id_asks_for_resync(self, valid_token, mock_redis):
+        for name in ("first", "second", "third"):
+            emit_event("user_999", "workspace:updated", {"uuid": name, "name": name})
+        redis = fakeredis.FakeRedis(server=mock_redis)
+        stream = redis.xrange(user_stream("user_999"))
+        redis.xtrim(user_stream("user_999"), maxlen=1, approximate=False)
+
+        response, listener = await self._connect(
+            valid_token, **{"Last-Event-ID": stream[0][0].decode()}
+        )
+
+        frame = await listener.next_event()
+        assert '"resync"' in frame
+        assert '"trimmed"' in frame
+        assert '"third"' in await listener.next_event()
+        response.close()
+
+    async def test_invalid_last_event_id_is_ignored(self, valid_token, mock_redis):
+        emit_event("user_999", "workspace:updated", {"uuid": "old", "name": "old"})
+        response, listener = await self._connect(
+            valid_token, **{"Last-Event-ID": "not-an-id"}
+        )
+
+        emit_event("user_999", "workspace:updated", {"uuid": "new", "name": "new"})
+        assert '"new"' in await listener.next_event()
+        response.close()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEventCollector:
+    def _stream_length(self, server, user_id="user_999"):
+        return fakeredis.FakeRedis(server=server).xlen(user_stream(user_id))
+
+    def test_events_are_published_after_commit(self, mock_redis):
+        with transaction.atomic():
+            emit_event("user_999", "workspace:created", {"uuid": "a", "name": "a"})
+            assert self._stream_length(mock_redis) == 0
+
+        assert self._stream_length(mock_redis) == 1
+
+    def test_events_are_dropped_on_rollback(self, mock_redis):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                emit_event("user_999", "workspace:created", {"uuid": "a", "name": "a"})
+                raise RuntimeError
+
+        assert self._stream_length(mock_redis) == 0
+
+    def test_collector_flushes_all_events_in_one_batch(self, mock_redis):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            with collect_events():
+                with transaction.atomic():
+                    for i in range(5):
+                        emit_event("user_999", "image:deleted", {"uuid": str(i)})
+                emit_event("user_111", "workspace:deleted", {"uuid": "w"})
+                mock_publish.assert_not_called()
+
+        mock_publish.assert_called_once()
+        events = mock_publish.call_args.args[0]
+        assert [event.data["uuid"] for event in events] == [
+            "0",
+            "1",
+            "2",
+            "3",
+            "4",
+            "w",
+        ]
+
+    def test_batch_is_published_in_one_round_trip(self, mock_redis):
+        redis = fakeredis.FakeRedis(server=mock_redis)
+        pubsub = redis.pubsub()
+        pubsub.subscribe(user_channel("user_999"))
+        assert pubsub.get_message(timeout=1)["type"] == "subscribe"
+        # Loads the script, which only the first batch pays for
+        publish_events([PendingEvent("user_999", "gcp:created", {"uuid": "first"})])
+        events = [
+            PendingEvent("user_999", "gcp:created", {"uuid": str(i)}) for i in range(3)
+        ]
+
+        with patch.object(
+            fakeredis.FakeRedis,
+            "execute_command",
+            autospec=True,
+            side_effect=fakeredis.FakeRedis.execute_command,
+        ) as execute:
+            publish_events(events)
+
+        assert [call.args[1] for call in execute.call_args_list] == ["EVALSHA"]
+        stream_ids = [entry_id for entry_id, _ in redis.xrange(user_stream("user_999"))]
+        published = [pubsub.get_message(timeout=1)["data"] for _ in stream_ids]
+        assert [EventMessage.decode(data).id for data in published] == stream_ids
+
+    def test_collector_skips_rolled_back_savepoints(self, mock_redis):
+        with collect_events():
+            with transaction.atomic():
+                emit_event("user_999", "gcp:created", {"uuid": "kept"})
+                try:
+                    with transaction.atomic():
+                        emit_event("user_999", "gcp:created", {"uuid": "dropped"})
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        stream = fakeredis.FakeRedis(server=mock_redis).xrange(user_stream("user_999"))
+        assert len(stream) == 1
+        assert b"kept" in stream[0][1][b"payload"]
+
+    def test_middleware_flushes_request_events_once(
+        self, client, valid_token, mock_redis
+    ):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            response = client.post(
+                "/api/workspaces/",
+                {"name": "New"},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {valid_token}"},
+            )
+
+        assert response.status_code == 201
+        mock_publish.assert_called_once()
+        events = mock_publish.call_args.args[0]
+        assert [event.event_name for event in events] == ["workspace:created"]
+
+    def test_collector_waits_for_enclosing_transaction(self, mock_redis):
+        with transaction.atomic():
+            with collect_events():
+                emit_event("user_999", "gcp:created", {"uuid": "a"})
+            assert self._stream_length(mock_redis) == 0
+
+        assert self._stream_length(mock_redis) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestSSECoalescing:
+    async def _connect(self, valid_token, query="", **headers):
+        client = AsyncClient()
+        response = await client.get(
+            f"/api/events{query}",
+            headers={"Authorization": f"Bearer {valid_token}", **headers},
+        )
+        assert response.status_code == 200
+        listener = SSEListener(response)
+        assert ": ok" in await listener.next_event()
+        return response, listener
+
+    async def test_coalesce_keeps_latest_event_per_entity(self):
+        def message(event_id, event, uuid=""):
+            return EventMessage(event_id, event, uuid, "", "", b"{}")
+
+        messages = [
+            message(b"1-0", "task:updated", "a"),
+            message(b"2-0", "task:updated", "b"),
+            message(b"3-0", "task:updated", "a"),
+            message(b"4-0", "task:completed", "a"),
+            message(b"5-0", "heartbeat"),
+            message(b"6-0", "heartbeat"),
+        ]
+
+        assert [message.id for message in coalesce(messages)] == [
+            b"2-0",
+            b"3-0",
+            b"4-0",
+            b"5-0",
+            b"6-0",
+        ]
+
+    async def test_burst_is_collapsed_within_window(self, valid_token, mock_redis):
+        response, listener = await self._connect(valid_token, "?coalesce_ms=200")
+
+        for step in ("dataset", "opensfm", "odm_meshing"):
+            emit_event("user_999", "task:updated", {"uuid": "t", "step": step})
+        emit_event("user_999", "workspace:updated", {"uuid": "w", "name": "w"})
+
+        first = await listener.next_event()
+        second = await listener.next_event()
+        assert "odm_meshing" in first
+        assert "workspace:updated" in second
+
+        emit_event("user_999", "task:updated", {"uuid": "t", "step": "done"})
+        assert '"done"' in await listener.next_event()
+        response.close()
+
+    async def test_replay_is_coalesced(self, valid_token, mock_redis):
+        for name in ("start", "first", "second", "third"):
+            emit_event("user_999", "workspace:updated", {"uuid": "w", "name": name})
+        stream = fakeredis.FakeRedis(server=mock_redis).xrange(user_stream("user_999"))
+
+        response, listener = await self._connect(
+            valid_token,
+            "?coalesce_ms=50",
+            **{"Last-Event-ID": stream[0][0].decode()},
+        )
+
+        frame = await listener.next_event()
+        assert frame.startswith(f"id: {stream[-1][0].decode()}\n")
+        assert '"third"' in frame
+        response.close()
+
+    async def test_window_is_bounded(self, valid_token, settings):
+        client = AsyncClient()
+        response = await client.get(
+            f"/api/events?coalesce_ms={settings.SSE_COALESCE_MAX_WINDOW_MS + 1}",
+            headers={"Authorization": f"Bearer {valid_token}"},
+        )
+        assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+class TestSubscriberQueue:
+    def _message(self, event_id, uuid, name="x"):
+        payload = json.dumps(
+            {"event": "workspace:updated", "data": {"uuid": uuid, "name": name}}
+        )
+        return EventMessage(
+            event_id.encode(), "workspace:updated", uuid, "", "", payload.encode()
+        ).encode()
+
+    async def test_drop_oldest_keeps_newest_messages(self):
+        queue = SubscriberQueue(2, SSEOverflowPolicy.DROP_OLDEST)
+        for i in range(5):
+            queue.offer(self._message(f"{i}-0", str(i)))
+
+        assert [queue.get_nowait()[:3] for _ in range(2)] == [b"3-0", b"4-0"]
+        assert queue.dropped == 3
+        assert queue.high_water == 2
+
+    async def test_coalesce_collapses_before_dropping(self):
+        queue = SubscriberQueue(2, SSEOverflowPolicy.COALESCE)
+        queue.offer(self._message("1-0", "a", "old"))
+        queue.offer(self._message("2-0", "a", "new"))
+        queue.offer(self._message("3-0", "b"))
+
+        assert queue.qsize() == 2
+        assert queue.dropped == 1
+        assert b'"new"' in queue.get_nowait()
+
+    async def test_disconnect_discards_backlog(self):
+        queue = SubscriberQueue(2, SSEOverflowPolicy.DISCONNECT)
+        for i in range(4):
+            queue.offer(self._message(f"{i}-0", str(i)))
+
+        assert queue.overflowed
+        assert queue.get_nowait() is OVERFLOWED
+        assert queue.empty()
+        assert queue.dropped == 4
+
+    async def test_broker_aggregates_counters(self, mock_redis, settings):
+        settings.SSE_QUEUE_MAXSIZE = 1
+        broker = RedisEventBroker()
+        queue = await broker.subscribe("user_999")
+        queue.offer(self._message("1-0", "a"))
+        queue.offer(self._message("2-0", "b"))
+        assert broker.dropped_count == 1
+
+        await broker.unsubscribe("user_999", queue)
+        assert broker.dropped_count == 1
+        assert broker.high_water_mark == 1
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestSSESlowConsumer:
+    async def test_overflow_disconnects_with_resync_hint(
+        self, valid_token, mock_redis, settings
+    ):
+        settings.SSE_QUEUE_MAXSIZE = 2
+        settings.SSE_QUEUE_OVERFLOW_POLICY = "disconnect"
+        client = AsyncClient()
+        response = await client.get(
+            "/api/events", headers={"Authorization": f"Bearer {valid_token}"}
+        )
+        listener = SSEListener(response)
+        assert ": ok" in await listener.next_event()
+
+        for i in range(5):
+            emit_event("user_999", "workspace:updated", {"uuid": str(i), "name": "x"})
+        await asyncio.sleep(0.2)
+
+        frame = await listener.next_event()
+        assert '"resync"' in frame
+        assert '"overflow"' in frame
+        with pytest.raises(TimeoutError):
+            await listener.next_event()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestSSETopicFilters:
+    WORKSPACE = "11111111-1111-1111-1111-111111111111"
+    TASK = "22222222-2222-2222-2222-222222222222"
+
+    async def _connect(self, valid_token, query, **headers):
+        client = AsyncClient()
+        response = await client.get(
+            f"/api/events{query}",
+            headers={"Authorization": f"Bearer {valid_token}", **headers},
+        )
+        assert response.status_code == 200
+        listener = SSEListener(response)
+        assert ": ok" in await listener.next_event()
+        return response, listener
+
+    def _emit_mixed_events(self):
+        emit_event(
+            "user_999", "gcp:created", {"uuid": "g"}, workspace_uuid=self.WORKSPACE
+        )
+        emit_event(
+            "user_999", "task:updated", {"uuid": "other"}, workspace_uuid=uuid4()
+        )
+        emit_event(
+            "user_999",
+            "task:updated",
+            {"uuid": self.TASK},
+            workspace_uuid=self.WORKSPACE,
+            task_uuid=self.TASK,
+        )
+
+    async def test_matcher(self):
+        message = EventMessage(
+            b"1-0", "task:updated", "t", self.WORKSPACE, self.TASK, b""
+        )
+
+        assert EventFilter().is_empty
+        assert EventFilter(["task:*"])(message)
+        assert EventFilter(["gcp:*", "task:updated"])(message)
+        assert not EventFilter(["task:deleted"])(message)
+        assert EventFilter(workspace_uuid=UUID(self.WORKSPACE))(message)
+        assert not EventFilter(task_uuid=uuid4())(message)
+
+    async def test_filters_live_events(self, valid_token, mock_redis):
+        response, listener = await self._connect(
+            valid_token, f"?events=task:*&workspace_uuid={self.WORKSPACE}"
+        )
+        self._emit_mixed_events()
+
+        frame = await listener.next_event()
+        assert "task:updated" in frame
+        assert self.TASK in frame
+        with pytest.raises(TimeoutError):
+            await listener.next_event(timeout=0.3)
+        response.close()
+
+    async def test_filtered_out_events_do_not_delay_heartbeats(
+        self, valid_token, mock_redis, settings
+    ):
+        settings.SSE_HEARTBEAT_INTERVAL_SECONDS = 0.3
+        response, listener = await self._connect(valid_token, "?events=task:*")
+
+        async def _emit_filtered_out_events():
+            for _ in range(10):
+                emit_event("user_999", "gcp:created", {"uuid": "g"})
+                await asyncio.sleep(0.1)
+
+        emitting = asyncio.create_task(_emit_filtered_out_events())
+        assert ": heartbeat" in await listener.next_event(timeout=0.6)
+        await emitting
+        response.close()
+
+    async def test_filters_replay(self, valid_token, mock_redis):
+        emit_event("user_999", "workspace:updated", {"uuid": self.WORKSPACE})
+        self._emit_mixed_events()
+        stream = fakeredis.FakeRedis(server=mock_redis).xrange(user_stream("user_999"))
+
+        response, listener = await self._connect(
+            valid_token,
+            f"?task_uuid={self.TASK}",
+            **{"Last-Event-ID": stream[0][0].decode()},
+        )
+
+        frame = await listener.next_event()
+        assert frame.startswith(f"id: {stream[-1][0].decode()}\n")
+        response.close()
+
+    async def test_service_events_carry_workspace_scope(
+        self, valid_token, mock_redis, workspace_factory
+    ):
+        workspace = await sync_to_async(workspace_factory)(user_id="user_999")
+        response, listener = await self._connect(
+            valid_token, f"?workspace_uuid={workspace.uuid}"
+        )
+        client = AuthenticatedTestClient(
+            WorkspaceControllerPublic, auth=AuthStrategyEnum.jwt
+        )
+
+        await sync_to_async(client.patch)(f"/{workspace.uuid}", json={"name": "Upd"})
+        assert "workspace:updated" in await listener.next_event()
+        response.close()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+class TestSSEMetrics:
+    @pytest.fixture
+    def metrics_client(self):
+        return AuthenticatedTestClient(
+            SSEControllerInternal, auth=AuthStrategyEnum.service
+        )
+
+    async def _metrics(self, client):
+        response = await sync_to_async(client.get)("/metrics")
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_reports_connections_and_delivery_latency(
+        self, metrics_client, valid_token, mock_redis, settings
+    ):
+        settings.SSE_METRICS_INTERVAL_SECONDS = 0.05
+        client = AsyncClient()
+        responses = [
+            await client.get(
+                "/api/events", headers={"Authorization": f"Bearer {valid_token}"}
+            )
+            for _ in range(2)
+        ]
+        listeners = [SSEListener(response) for response in responses]
+        for listener in listeners:
+            assert ": ok" in await listener.next_event()
+
+        emit_event("user_999", "workspace:updated", {"uuid": "w", "name": "w"})
+        for listener in listeners:
+            assert "workspace:updated" in await listener.next_event()
+        await asyncio.sleep(0.2)
+
+        metrics = await self._metrics(metrics_client)
+        assert metrics["clients"] == 2
+        assert metrics["users"] == {"user_999": 2}
+        (worker,) = metrics["workers"]
+        assert worker["clients"] == 2
+
+        for response in responses:
+            response.close()
+
+    async def test_records_live_delivery_latency(self, valid_token, mock_redis):
+        response = await AsyncClient().get(
+            "/api/events", headers={"Authorization": f"Bearer {valid_token}"}
+        )
+        listener = SSEListener(response)
+        assert ": ok" in await listener.next_event()
+
+        emit_event("user_999", "workspace:updated", {"uuid": "w", "name": "w"})
+        assert "workspace:updated" in await listener.next_event()
+
+        stats = get_event_broker().snapshot()
+        assert stats["delivered"] == 1
+        assert 0 <= stats["latency_ms_max"] < 1000
+        assert get_event_broker().snapshot()["delivered"] == 0
+        response.close()
+
+    async def test_latency_is_aggregated_across_workers(
+        self, metrics_client, mock_redis
+    ):
+        redis = fakeredis.FakeRedis(server=mock_redis)
+        for name, delivered, avg, peak in (("a:1", 3, 10.0, 20), ("b:2", 1, 50.0, 50)):
+            snapshot = {
+                "worker": name,
+                "reported_at": time.time(),
+                "clients": 1,
+                "users": {"user_999": 1},
+                "dropped": 0,
+                "high_water": 1,
+                "delivered": delivered,
+                "latency_ms_avg": avg,
+                "latency_ms_max": peak,
+            }
+            redis.hset(sse_metrics.WORKERS_KEY, name, json.dumps(snapshot))
+        stale = {**snapshot, "worker": "c:3", "reported_at": time.time() - 3600}
+        redis.hset(sse_metrics.WORKERS_KEY, "c:3", json.dumps(stale))
+
+        metrics = await self._metrics(metrics_client)
+        assert [worker["worker"] for worker in metrics["workers"]] == ["a:1", "b:2"]
+        assert metrics["users"] == {"user_999": 2}
+        assert metrics["delivered"] == 4
+        assert metrics["latency_ms_avg"] == 20.0
+        assert metrics["latency_ms_max"] == 50
+        assert not redis.hexists(sse_metrics.WORKERS_KEY, "c:3")
+
+    async def test_counts_published_events(self, metrics_client, mock_redis):
+        for _ in range(3):
+            emit_event("user_999", "workspace:updated", {"uuid": "w", "name": "w"})
+        second = int(time.time())
+        redis = fakeredis.FakeRedis(server=mock_redis)
+        redis.rename(
+            sse_metrics.published_key(second), sse_metrics.published_key(second - 1)
+        )
+
+        metrics = await self._metrics(metrics_client)
+        assert metrics["published"] == 3
+        assert metrics["publish_rate"] == 3 / metrics["window_seconds"]
+
+    async def test_requires_service_auth(self, valid_token):
+        client = AuthenticatedTestClient(
+            SSEControllerInternal, auth=AuthStrategyEnum.jwt
+        )
+        response = await sync_to_async(client.get)("/metrics")
+        assert response.status_code == 401
@@ -6,8 +6,14 @@ from pyodm import Node
 from pyodm.api import Task
 from pyodm.types import NodeInfo, NodeOption, TaskInfo
 from pyodm.exceptions import NodeConnectionError, NodeResponseError
-
-from app.api.constants.odm_client import NodeODMClient
+from urllib3.connectionpool import HTTPConnectionPool
+
+from app.api.constants.odm_client import (
+    NodeODMClient,
+    NodeODMSessionPool,
+    call_route,
+    get_session_pool,
+)
 from app.api.auth.nodeodm import NodeODMServiceAuth
 
 
@@ -71,7 +77,7 @@ class TestNodeODMClient:
     ):
         client = NodeODMClient.for_task(task_uuid)
 
-        with patch("requests.post") as mock_post:
+        with patch("requests.Session.post") as mock_post:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.headers = {"Content-Type": "application/json"}
@@ -160,3 +166,90 @@ class TestNodeODMClient:
 
         with pytest.raises(NodeResponseError, match="Task not found"):
             task.info()
+
+
+class TestNodeODMSessionPool:
+    def test_clients_share_one_session_per_node(self, mock_odm_server):
+        first = NodeODMClient.for_task(uuid4())
+        second = NodeODMClient.for_task(uuid4())
+
+        assert first.session is second.session
+
+    def test_session_connections_are_bounded(self, mock_odm_server, settings):
+        settings.NODEODM_HTTP_POOL_SIZE = 3
+        pool = NodeODMSessionPool()
+
+        adapter = pool.session("node:3000").get_adapter("http://node:3000/info")
+
+        assert adapter._pool_maxsize == 3
+        assert adapter._pool_block is True
+
+    def test_calls_reuse_kept_alive_connection(self, nodeodm_client):
+        with patch.object(
+            HTTPConnectionPool,
+            "_new_conn",
+            autospec=True,
+            side_effect=HTTPConnectionPool._new_conn,
+        ) as new_conn:
+            for _ in range(3):
+                nodeodm_client.info()
+
+        assert new_conn.call_count <= 1
+
+    def test_session_is_replaced_after_fork(self, monkeypatch):
+        pool = NodeODMSessionPool()
+        session = pool.session("node:3000")
+
+        monkeypatch.setattr("os.getpid", lambda: -1)
+
+        assert pool.session("node:3000") is not session
+
+    def test_calls_use_connect_and_read_timeouts(self, nodeodm_client, settings):
+        settings.NODEODM_CONNECT_TIMEOUT_SECONDS = 2
+        client = NodeODMClient.for_task(nodeodm_client.uuid, timeout=60)
+
+        with patch("requests.Session.get", wraps=client.session.get) as mock_get:
+            client.info()
+
+        assert mock_get.call_args.kwargs["timeout"] == (2, 60)
+
+    def test_set_uuid_header_does_not_leak_into_caller_headers(self, nodeodm_client):
+        headers = {}
+        with patch("requests.Session.post") as mock_post:
+            mock_post.return_value = MagicMock(
+                status_code=200, headers={"Content-Type": "application/json"}
+            )
+            mock_post.return_value.json.return_value = {"uuid": "x"}
+            nodeodm_client.post("/task/new", data={}, headers=headers)
+
+        assert mock_post.call_args.kwargs["headers"] == {
+            "set-uuid": str(nodeodm_client.uuid)
+        }
+        assert headers == {}
+
+    def test_call_latency_is_recorded_per_route(self, initialized_task):
+        get_session_pool().stats.snapshot()
+
+        initialized_task.info()
+        initialized_task.info()
+        stats = get_session_pool().stats.snapshot()
+
+        route = stats[call_route("GET", f"/task/{initialized_task.uuid}/info")]
+        assert route["calls"] == 2
+        assert route["errors"] == 0
+        assert route["latency_ms_max"] >= route["latency_ms_avg"] >= 0
+        assert get_session_pool().stats.snapshot() == {}
+
+    def test_failed_calls_are_counted(self, nodeodm_client):
+        get_session_pool().stats.snapshot()
+
+        with pytest.raises(NodeResponseError):
+            nodeodm_client.get_task(str(uuid4())).info()
+
+        (route,) = get_session_pool().stats.snapshot().values()
+        assert route["errors"] == 1
+
+    def test_call_route_folds_task_uuids(self):
+        uuid = uuid4()
+
+        assert call_route("GET", f"/task/{uuid}/info") == "GET /task/{uuid}/info"
@@ -1,6 +1,17 @@
+import hashlib
+import threading
 import pytest
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
 from uuid import uuid4
 from unittest.mock import patch
+from django.core.files.storage import default_storage
+from django_redis import get_redis_connection
+from celery.exceptions import Retry
+from pyodm.exceptions import NodeConnectionError, NodeResponseError, NodeServerError
+from PIL import Image as PILImage
+from pyodm.api import Task
 
 from app.api.tasks.task import (
     on_task_create,
@@ -10,9 +21,24 @@ from app.api.tasks.task import (
     on_task_nodeodm_webhook,
     on_task_finish,
     on_task_failure,
+    poll_running_tasks,
+    RECONCILE_LOCK_KEY,
+    reconcile_seen_key,
+    reconcile_tasks,
 )
-from app.api.tasks.workspace import on_workspace_images_uploaded
+from app.api.tasks import task as task_module
+from app.api.tasks.submission import (
+    submission_key,
+    submission_lock,
+    uploaded_files_key,
+)
+from app.api.tasks.workspace import make_thumbnails, on_workspace_images_uploaded
+from app.api.constants.odm_client import NodeODMClient
+from app.api.constants.odm_nodes import node_failures_key, node_id
+from app.api.constants.token import DatasetToken
+from app.api.models import image as image_module
 from app.api.models.image import Image
+from app.api.models.task import ODMTask
 from app.api.models.result import ODMTaskResult
 from app.api.constants.odm import ODMTaskStatus, ODMProcessingStage, ODMTaskResultType
 
@@ -63,6 +89,11 @@ def create_task_result_files(settings, tmp_path):
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskCreate:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.QUEUED
+        odm_task.save()
+
     def test_success(self, mock_odm_server, odm_task):
         on_task_create.apply(args=[odm_task.uuid]).get()
         remote_task = mock_odm_server.manager.get_task(str(odm_task.uuid))
@@ -75,6 +106,17 @@ class TestOnTaskCreate:
         odm_task.refresh_from_db()
         assert odm_task.odm_status == ODMTaskStatus.RUNNING
 
+    def test_first_run_goes_up_to_first_stage_with_results(
+        self, mock_odm_server, odm_task
+    ):
+        odm_task.step = ODMProcessingStage.DATASET
+        odm_task.save()
+        on_task_create.apply(args=[odm_task.uuid]).get()
+
+        options = mock_odm_server.manager.get_task(str(odm_task.uuid)).options
+        assert {"name": "rerun-from", "value": "dataset"} in options
+        assert {"name": "end-with", "value": "mvs_texturing"} in options
+
     def test_task_not_found_locally(self, mock_odm_server):
         random_uuid = uuid4()
         try:
@@ -104,13 +146,159 @@ class TestOnTaskCreate:
         odm_task.refresh_from_db()
         assert odm_task.odm_status == ODMTaskStatus.FAILED
 
+    def test_concurrent_submission_is_skipped(self, mock_odm_server, odm_task):
+        lock = submission_lock(odm_task.uuid)
+        assert lock.acquire(blocking=False)
+
+        on_task_create.apply(args=[odm_task.uuid]).get()
+
+        assert mock_odm_server.manager.get_task(str(odm_task.uuid)) is None
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.QUEUED
+
+    def test_lock_is_released_after_submission(self, mock_odm_server, odm_task):
+        on_task_create.apply(args=[odm_task.uuid]).get()
+
+        assert not submission_lock(odm_task.uuid).locked()
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestTaskSubmission:
+    # 3 images of ``workspace_with_images`` plus the GCP file
+    FILES = 4
+
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.QUEUED
+        odm_task.save()
+
+    @pytest.fixture
+    def flaky_upload(self):
+        """Make uploads of files matching ``fail`` raise ``times`` times."""
+        upload_file = NodeODMClient.upload_file
+        failures = Counter()
+
+        def install(fail, times):
+            def upload(node, name, path):
+                if fail(name) and failures[name] < times:
+                    failures[name] += 1
+                    raise NodeConnectionError("Connection reset")
+                return upload_file(node, name, path)
+
+            return patch.object(
+                NodeODMClient, "upload_file", autospec=True, side_effect=upload
+            )
+
+        install.failures = failures
+        return install
+
+    def _remote(self, mock_odm_server, odm_task):
+        return mock_odm_server.manager.get_task(str(odm_task.uuid))
+
+    def test_uploads_every_file_then_commits(self, mock_odm_server, odm_task):
+        on_task_create.apply(args=[odm_task.uuid]).get()
+
+        remote_task = self._remote(mock_odm_server, odm_task)
+        assert remote_task.imagesCount == self.FILES
+        assert remote_task.status.code == 20  # RUNNING
+        conn = get_redis_connection("default")
+        assert not conn.exists(submission_key(odm_task))
+        assert not conn.exists(uploaded_files_key(odm_task))
+
+    def test_retries_transient_upload_errors(
+        self, mock_odm_server, odm_task, flaky_upload
+    ):
+        with flaky_upload(lambda name: True, times=2):
+            on_task_create.apply(args=[odm_task.uuid]).get()
+
+        assert sum(flaky_upload.failures.values()) == 2 * self.FILES
+        assert self._remote(mock_odm_server, odm_task).imagesCount == self.FILES
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+
+    def test_resumes_interrupted_submission(
+        self, settings, mock_odm_server, odm_task, flaky_upload
+    ):
+        settings.NODEODM_UPLOAD_MAX_RETRIES = 1
+        with flaky_upload(lambda name: name.startswith("test_0"), times=2):
+            on_task_create.apply(args=[odm_task.uuid]).get()
+
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.FAILED
+        # Uploads not started before the failure are dropped
+        uploaded = self._remote(mock_odm_server, odm_task).imagesCount
+        assert uploaded <= self.FILES - 1
+
+        # A failed task is final, as if the worker had died mid-upload instead
+        odm_task.status = ODMTaskStatus.QUEUED
+        odm_task.save()
+        with (
+            patch.object(NodeODMClient, "init_task", autospec=True) as mock_init_task,
+            flaky_upload(lambda name: False, times=0) as mock_upload_file,
+        ):
+            on_task_create.apply(args=[odm_task.uuid]).get()
+
+        mock_init_task.assert_not_called()
+        names = [call.args[1] for call in mock_upload_file.call_args_list]
+        assert len(names) == self.FILES - uploaded
+        assert any(name.startswith("test_0") for name in names)
+        assert self._remote(mock_odm_server, odm_task).imagesCount == self.FILES
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+
+    def test_rejected_upload_restarts_from_init(self, mock_odm_server, odm_task):
+        with patch.object(
+            NodeODMClient,
+            "upload_file",
+            autospec=True,
+            side_effect=NodeResponseError("Task not found"),
+        ):
+            on_task_create.apply(args=[odm_task.uuid]).get()
+
+        assert not get_redis_connection("default").exists(submission_key(odm_task))
+
+    def test_zipurl_mode_lets_the_node_pull_the_dataset(
+        self, settings, httpserver, mock_odm_server, odm_task
+    ):
+        settings.NODEODM_SUBMISSION_MODE = "zipurl"
+        on_task_create.apply(args=[odm_task.uuid]).get()
+
+        # Scheduling probes /info, then the node is only asked to pull
+        requests = [request for request, _ in httpserver.log if request.path != "/info"]
+        assert [request.path for request in requests] == ["/task/new"]
+        zipurl = urlparse(requests[0].form["zipurl"])
+        assert zipurl.path == f"/api/internal/tasks/{odm_task.uuid}/dataset.zip"
+        token = DatasetToken(parse_qs(zipurl.query)["token"][0])
+        assert token["task_uuid"] == str(odm_task.uuid)
+        assert requests[0].headers["set-uuid"] == str(odm_task.uuid)
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+
+    def test_publishes_upload_progress(self, settings, mock_odm_server, odm_task):
+        settings.NODEODM_UPLOAD_PROGRESS_INTERVAL_SECONDS = 0
+        with patch("app.api.tasks.submission.publish_events") as mock_publish:
+            on_task_create.apply(args=[odm_task.uuid]).get()
+
+        events = [call.args[0][0] for call in mock_publish.call_args_list]
+        assert {event.event_name for event in events} == {"task:upload-progress"}
+        assert [event.data["uploaded"] for event in events][-1] == self.FILES
+        final = events[-1].data
+        assert final["total"] == self.FILES
+        assert final["bytes"] > 0
+        assert final["bytes_per_second"] > 0
+        assert events[-1].task_uuid == str(odm_task.uuid)
+
 
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskPause:
-    def test_success(self, initialized_mock_task, odm_task):
-        odm_task.status = ODMTaskStatus.RUNNING
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.PAUSING
         odm_task.save()
+
+    def test_success(self, initialized_mock_task, odm_task):
         initialized_mock_task.commit()
         assert initialized_mock_task.status.code == 20  # RUNNING
         on_task_pause.apply(args=[odm_task.uuid]).get()
@@ -142,11 +330,14 @@ class TestOnTaskPause:
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskResume:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.RESUMING
+        odm_task.save()
+
     def test_success(self, initialized_mock_task, odm_task):
         initialized_mock_task.cancel()
         assert initialized_mock_task.status.code == 50  # CANCELED/PAUSED
-        odm_task.status = ODMTaskStatus.PAUSED
-        odm_task.save()
         on_task_resume.apply(args=[odm_task.uuid]).get()
         assert initialized_mock_task.status.code == 10
         assert initialized_mock_task.progress == 0.0
@@ -173,15 +364,30 @@ class TestOnTaskResume:
                 "dsm": True,
             }
         }
-        odm_task.status = ODMTaskStatus.PAUSED
         odm_task.save()
         on_task_resume.apply(args=[odm_task.uuid]).get()
         assert {"name": "dsm", "value": True} in initialized_mock_task.options
 
+    def test_resume_reruns_from_the_running_stage(
+        self, initialized_mock_task, odm_task
+    ):
+        odm_task.step = ODMProcessingStage.DATASET
+        odm_task.run_step = ODMProcessingStage.OPENMVS
+        odm_task.save()
+        on_task_resume.apply(args=[odm_task.uuid]).get()
+        options = initialized_mock_task.options
+        assert {"name": "rerun-from", "value": "openmvs"} in options
+        assert {"name": "end-with", "value": "mvs_texturing"} in options
+
 
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskCancel:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.CANCELLING
+        odm_task.save()
+
     def test_success(self, initialized_mock_task, odm_task):
         on_task_cancel.apply(args=[odm_task.uuid]).get()
         odm_task.refresh_from_db()
@@ -204,6 +410,11 @@ class TestOnTaskCancel:
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskNodeodmWebhook:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.QUEUED
+        odm_task.save()
+
     def test_success_with_restarting(
         self, initialized_mock_task, odm_task, create_task_result_files
     ):
@@ -223,6 +434,123 @@ class TestOnTaskNodeodmWebhook:
             results = ODMTaskResult.objects.filter(workspace=odm_task.workspace)
             assert results.count() == len(expected_types)
             assert {r.result_type for r in results} == set(expected_types)
+            for result in results:
+                content = Path(result.file.path).read_bytes()
+                assert result.size == len(content)
+                assert result.sha256 == hashlib.sha256(content).hexdigest()
+
+    @pytest.fixture
+    def georeferenced_task(self, odm_task, create_task_result_files):
+        odm_task.step = ODMProcessingStage.ODM_GEOREFERENCING.next_stage
+        odm_task.save()
+        return odm_task, create_task_result_files(
+            odm_task, ODMProcessingStage.ODM_GEOREFERENCING.stage_results
+        )
+
+    def test_results_are_bulk_inserted_and_announced_once(
+        self, initialized_mock_task, georeferenced_task
+    ):
+        odm_task, expected_types = georeferenced_task
+        with (
+            patch.object(
+                ODMTaskResult.objects,
+                "bulk_create",
+                wraps=ODMTaskResult.objects.bulk_create,
+            ) as mock_bulk_create,
+            patch("app.api.tasks.task.emit_event") as mock_emit,
+        ):
+            on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
+
+        mock_bulk_create.assert_called_once()
+        (call,) = [
+            c
+            for c in mock_emit.call_args_list
+            if c.args[1] == "task-result:bulk-created"
+        ]
+        data = call.args[2]
+        assert data["uuid"] == str(odm_task.uuid)
+        assert {r["result_type"] for r in data["results"]} == set(expected_types)
+        result_uuids = {
+            str(uuid)
+            for uuid in ODMTaskResult.objects.filter(
+                workspace=odm_task.workspace
+            ).values_list("uuid", flat=True)
+        }
+        assert {r["uuid"] for r in data["results"]} == result_uuids
+        # Still announced one by one for clients of task-result:created
+        created = [
+            c.args[2]["uuid"]
+            for c in mock_emit.call_args_list
+            if c.args[1] == "task-result:created"
+        ]
+        assert sorted(created) == sorted(result_uuids)
+
+    def test_results_are_ingested_concurrently_with_restart(
+        self, settings, initialized_mock_task, georeferenced_task
+    ):
+        odm_task, expected_types = georeferenced_task
+        settings.RESULTS_INGEST_CONCURRENCY = len(expected_types)
+        # Every ingestion waits for all the others and for the restart
+        barrier = threading.Barrier(len(expected_types), timeout=5)
+        restarted = threading.Event()
+        ingest, restart = ODMTaskResult.ingest, Task.restart
+
+        def _ingest(task_result, path, filename):
+            barrier.wait()
+            assert restarted.wait(timeout=5)
+            return ingest(task_result, path, filename)
+
+        def _restart(task, *args, **kwargs):
+            restarted.set()
+            return restart(task, *args, **kwargs)
+
+        with (
+            patch.object(ODMTaskResult, "ingest", autospec=True, side_effect=_ingest),
+            patch.object(Task, "restart", autospec=True, side_effect=_restart),
+        ):
+            on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
+
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+        assert initialized_mock_task.status.code == 10
+        results = ODMTaskResult.objects.filter(workspace=odm_task.workspace)
+        assert results.count() == len(expected_types)
+
+    def test_failed_ingestion_leaves_no_results(
+        self, settings, initialized_mock_task, georeferenced_task
+    ):
+        odm_task, _ = georeferenced_task
+        ingest = ODMTaskResult.ingest
+
+        def _ingest(task_result, path, filename):
+            if task_result.result_type == ODMTaskResultType.POINT_CLOUD_LAZ:
+                raise OSError("No space left on device")
+            return ingest(task_result, path, filename)
+
+        with patch.object(ODMTaskResult, "ingest", autospec=True, side_effect=_ingest):
+            on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
+
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.FAILED
+        assert not ODMTaskResult.objects.filter(workspace=odm_task.workspace).exists()
+        results_dir = (
+            Path(settings.MEDIA_ROOT)
+            / settings.RESULTS_DIR_NAME
+            / str(odm_task.workspace.uuid)
+        )
+        assert list(results_dir.glob("*")) == []
+
+    def test_failed_ingestion_cancels_the_restarted_run(
+        self, initialized_mock_task, georeferenced_task
+    ):
+        odm_task, _ = georeferenced_task
+
+        with patch.object(ODMTaskResult, "ingest", side_effect=OSError("Disk full")):
+            on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
+
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.FAILED
+        assert initialized_mock_task.status.code == 50  # CANCELED
 
     def test_restart_fails_on_server(self, mock_odm_server, odm_task):
         on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
@@ -250,6 +578,11 @@ class TestOnTaskNodeodmWebhook:
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskFinish:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.FINISHING
+        odm_task.save()
+
     def test_success(self, initialized_mock_task, odm_task):
         on_task_finish.apply(args=[odm_task.uuid]).get()
         odm_task.refresh_from_db()
@@ -277,6 +610,11 @@ class TestOnTaskFinish:
 @pytest.mark.django_db
 @pytest.mark.usefixtures("mock_redis")
 class TestOnTaskFailure:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.RUNNING
+        odm_task.save()
+
     def test_success(self, initialized_mock_task, odm_task):
         on_task_failure.apply(args=[odm_task.uuid]).get()
         odm_task.refresh_from_db()
@@ -301,37 +639,580 @@ class TestOnTaskFailure:
         assert len(mock_odm_server.manager.list_uuids()) == 0
 
 
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("mock_redis")
+class TestTaskEventCollection:
+    @pytest.fixture(autouse=True)
+    def odm_task_status(self, odm_task):
+        odm_task.status = ODMTaskStatus.CANCELLING
+        odm_task.save()
+
+    def test_events_are_flushed_once_when_task_finishes(
+        self, initialized_mock_task, odm_task
+    ):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            on_task_cancel.apply(args=[odm_task.uuid]).get()
+
+        mock_publish.assert_called_once()
+        events = mock_publish.call_args.args[0]
+        assert [event.event_name for event in events] == ["task:cancelled"]
+
+    def test_failed_task_publishes_failure_event(self, mock_odm_server, odm_task):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            on_task_cancel.apply(args=[odm_task.uuid]).get()
+
+        events = mock_publish.call_args.args[0]
+        assert [event.event_name for event in events] == ["task:failed"]
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("mock_redis")
+class TestPollRunningTasks:
+    def _poll(self):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            poll_running_tasks.apply().get()
+        if not mock_publish.called:
+            return []
+        return [event.data for event in mock_publish.call_args.args[0]]
+
+    @pytest.fixture
+    def running_mock_task(self, initialized_mock_task, odm_task):
+        odm_task.status = ODMTaskStatus.RUNNING
+        odm_task.save()
+        initialized_mock_task.commit()
+        return initialized_mock_task
+
+    def test_emits_progress_and_only_new_log_lines(self, running_mock_task, odm_task):
+        (event,) = self._poll()
+        assert event["uuid"] == str(odm_task.uuid)
+        assert event["progress"] == 15.0
+        assert event["offset"] == 0
+        assert len(event["output"]) == 2
+
+        running_mock_task.progress = 40.0
+        running_mock_task.add_log("Running OpenSfM")
+        (event,) = self._poll()
+        assert event["progress"] == 40.0
+        assert event["offset"] == 2
+        assert len(event["output"]) == 1
+        assert "Running OpenSfM" in event["output"][0]
+
+    def test_log_starts_over_when_the_task_restarts(self, running_mock_task, odm_task):
+        (event,) = self._poll()
+        assert event["offset"] == 0
+
+        # Paused and resumed between two polls
+        for status in ("pausing", "paused", "resuming"):
+            odm_task.transition(ODMTaskStatus(status))
+        running_mock_task.restart()
+        odm_task.transition(ODMTaskStatus.RUNNING)
+
+        (event,) = self._poll()
+        assert event["offset"] == 0
+        assert event["progress"] == 0.0
+        assert "Task restarted" in event["output"][0]
+
+    def test_records_the_stage_the_run_got_to(self, running_mock_task, odm_task):
+        odm_task.step = ODMProcessingStage.DATASET
+        odm_task.save()
+        running_mock_task.add_log("[INFO]    Running opensfm stage")
+        running_mock_task.add_log("[INFO]    Running openmvs stage")
+        self._poll()
+
+        odm_task.refresh_from_db()
+        assert odm_task.run_step == ODMProcessingStage.OPENMVS
+
+    def test_ignores_stages_outside_the_run(self, running_mock_task, odm_task):
+        odm_task.step = ODMProcessingStage.ODM_DEM
+        odm_task.save()
+        running_mock_task.add_log("[INFO]    Running odm_orthophoto stage")
+        self._poll()
+
+        odm_task.refresh_from_db()
+        assert odm_task.run_step == ""
+
+    def test_skips_tasks_without_changes(self, running_mock_task):
+        assert len(self._poll()) == 1
+        assert self._poll() == []
+
+    def test_ignores_tasks_that_are_not_running(self, initialized_mock_task, odm_task):
+        odm_task.status = ODMTaskStatus.PAUSED
+        odm_task.save()
+        assert self._poll() == []
+
+    def test_node_errors_do_not_stop_other_tasks(
+        self, running_mock_task, odm_task, odm_task_factory
+    ):
+        odm_task_factory(workspace=odm_task.workspace, status=ODMTaskStatus.RUNNING)
+        events = self._poll()
+        assert [event["uuid"] for event in events] == [str(odm_task.uuid)]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestReconcileTasks:
+    @pytest.fixture(autouse=True)
+    def no_grace(self, settings):
+        settings.NODEODM_RECONCILE_GRACE_SECONDS = 0
+
+    @pytest.fixture
+    def stuck_task(self, mock_odm_server, odm_task):
+        def _stuck(status, remote_status=None, step=None):
+            odm_task.status = status
+            odm_task.step = step or odm_task.step
+            odm_task.node_url = mock_odm_server.base_url
+            odm_task.save()
+            if remote_status:
+                mock_odm_server.manager.create_shortcut(str(odm_task.uuid), "x")
+                mock_odm_server.manager.set_status(str(odm_task.uuid), remote_status)
+            return odm_task
+
+        return _stuck
+
+    @pytest.fixture(autouse=True)
+    def on_commit(self, django_capture_on_commit_callbacks):
+        self.on_commit = django_capture_on_commit_callbacks
+
+    def _reconcile(self, odm_task):
+        # Tasks are enqueued once the sweep's changes are committed
+        with self.on_commit(execute=True):
+            reconcile_tasks.apply().get()
+        odm_task.refresh_from_db()
+        return odm_task.odm_status
+
+    def test_lost_completion_webhook_advances_the_task(
+        self, stuck_task, mock_task_on_task_nodeodm_webhook
+    ):
+        odm_task = stuck_task(
+            ODMTaskStatus.RUNNING, "COMPLETED", ODMProcessingStage.ODM_MESHING
+        )
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.QUEUED
+        assert odm_task.odm_step == ODMProcessingStage.ODM_GEOREFERENCING
+        mock_task_on_task_nodeodm_webhook.delay.assert_called_once_with(odm_task.uuid)
+
+    def test_task_without_node_is_looked_up_on_the_default_node(
+        self, stuck_task, mock_odm_server
+    ):
+        odm_task = stuck_task(ODMTaskStatus.RUNNING, "RUNNING")
+        odm_task.node_url = ""
+        odm_task.save()
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.RUNNING
+        paths = [r.path for r, _ in mock_odm_server.httpserver.log]
+        assert f"/task/{odm_task.uuid}/info" in paths
+
+    def test_task_missing_from_its_node_fails(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.RUNNING)
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.FAILED
+
+    def test_interrupted_submission_is_resumed(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.QUEUED, step=ODMProcessingStage.DATASET)
+
+        with patch.object(task_module, "on_task_create") as mock_create:
+            assert self._reconcile(odm_task) == ODMTaskStatus.QUEUED
+        mock_create.delay.assert_called_once_with(odm_task.uuid)
+
+    def test_ongoing_submission_is_left_alone(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.QUEUED, step=ODMProcessingStage.DATASET)
+        assert submission_lock(odm_task.uuid).acquire(blocking=False)
+
+        with patch.object(task_module, "on_task_create") as mock_create:
+            assert self._reconcile(odm_task) == ODMTaskStatus.QUEUED
+        mock_create.delay.assert_not_called()
+
+    def test_queued_rerun_missing_from_its_node_fails(self, stuck_task):
+        odm_task = stuck_task(
+            ODMTaskStatus.QUEUED, step=ODMProcessingStage.ODM_GEOREFERENCING
+        )
+
+        with patch.object(task_module, "on_task_create") as mock_create:
+            assert self._reconcile(odm_task) == ODMTaskStatus.FAILED
+        mock_create.delay.assert_not_called()
+
+    def test_interrupted_pause_is_completed(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.PAUSING, "CANCELED")
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.PAUSED
+
+    def test_interrupted_cancel_is_completed(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.CANCELLING)
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.CANCELLED
+
+    def test_interrupted_finish_is_redone(self, stuck_task, mock_odm_server):
+        odm_task = stuck_task(ODMTaskStatus.FINISHING, "COMPLETED")
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.COMPLETED
+        assert mock_odm_server.manager.get_task(str(odm_task.uuid)) is None
+
+    def test_running_task_is_left_alone(self, stuck_task, mock_odm_server):
+        odm_task = stuck_task(ODMTaskStatus.RUNNING, "RUNNING")
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.RUNNING
+        assert mock_odm_server.manager.get_task(str(odm_task.uuid)) is not None
+
+    def test_unreachable_node_is_skipped(self, settings, stuck_task):
+        settings.NODEODM_CONNECT_TIMEOUT_SECONDS = 1
+        odm_task = stuck_task(ODMTaskStatus.RUNNING)
+        odm_task.node_url = "http://nonexistent.invalid:9999"
+        odm_task.save()
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.RUNNING
+
+    def test_waits_for_the_grace_period(self, settings, stuck_task):
+        settings.NODEODM_RECONCILE_GRACE_SECONDS = 300
+        odm_task = stuck_task(ODMTaskStatus.CANCELLING)
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.CANCELLING
+        seen = get_redis_connection("default").get(reconcile_seen_key(odm_task))
+        assert seen is not None
+
+    def test_task_that_moved_meanwhile_is_left_alone(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.CANCELLING, "RUNNING")
+        remote_statuses = task_module._remote_statuses
+
+        def _cancelled_meanwhile(odm_tasks):
+            statuses = remote_statuses(odm_tasks)
+            ODMTask.objects.filter(uuid=odm_task.uuid).update(
+                status=ODMTaskStatus.CANCELLED
+            )
+            return statuses
+
+        with (
+            patch.object(
+                task_module, "_remote_statuses", side_effect=_cancelled_meanwhile
+            ),
+            patch.object(task_module, "on_task_cancel") as on_task_cancel,
+        ):
+            assert self._reconcile(odm_task) == ODMTaskStatus.CANCELLED
+
+        on_task_cancel.delay.assert_not_called()
+
+    def test_overlapping_sweep_is_skipped(self, stuck_task):
+        odm_task = stuck_task(ODMTaskStatus.CANCELLING)
+        get_redis_connection("default").set(RECONCILE_LOCK_KEY, 1)
+
+        assert self._reconcile(odm_task) == ODMTaskStatus.CANCELLING
+
+    def test_one_list_call_per_node(
+        self, stuck_task, odm_task_factory, mock_odm_server
+    ):
+        odm_task = stuck_task(ODMTaskStatus.RUNNING, "RUNNING")
+        other = odm_task_factory(
+            workspace=odm_task.workspace,
+            status=ODMTaskStatus.RUNNING,
+            node_url=mock_odm_server.base_url,
+        )
+        mock_odm_server.manager.create_shortcut(str(other.uuid), "y")
+
+        reconcile_tasks.apply().get()
+
+        paths = [r.path for r, _ in mock_odm_server.httpserver.log]
+        assert paths.count("/task/list") == 1
+        assert f"/task/{odm_task.uuid}/info" in paths
+        assert f"/task/{other.uuid}/info" in paths
+
+
 @pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestNodeODMRetries:
+    @pytest.fixture(autouse=True)
+    def retry_budget(self, settings):
+        settings.NODEODM_TASK_MAX_RETRIES = 3
+        settings.NODEODM_TASK_RETRY_BACKOFF_SECONDS = 2
+        settings.NODEODM_CIRCUIT_FAILURE_THRESHOLD = 2
+        settings.NODEODM_CIRCUIT_COOLDOWN_SECONDS = 30
+
+    @pytest.fixture
+    def pausing_task(self, initialized_mock_task, odm_task):
+        odm_task.status = ODMTaskStatus.PAUSING
+        odm_task.save()
+        return odm_task
+
+    def _pause(self, odm_task, retries=0):
+        return on_task_pause.apply(args=[odm_task.uuid], retries=retries).get()
+
+    def test_transient_error_is_retried_with_backoff(self, pausing_task):
+        with (
+            patch.object(
+                Task, "cancel", side_effect=NodeServerError("Unexpected status code")
+            ),
+            pytest.raises(Retry) as retry,
+        ):
+            self._pause(pausing_task, retries=1)
+
+        assert 0 <= retry.value.when <= 4
+        pausing_task.refresh_from_db()
+        assert pausing_task.odm_status == ODMTaskStatus.PAUSING
+
+    def test_retry_succeeds_once_the_node_is_back(self, pausing_task):
+        with patch.object(
+            Task, "cancel", side_effect=[NodeConnectionError("Refused"), True]
+        ):
+            with pytest.raises(Retry):
+                self._pause(pausing_task)
+            self._pause(pausing_task, retries=1)
+
+        pausing_task.refresh_from_db()
+        assert pausing_task.odm_status == ODMTaskStatus.PAUSED
+
+    def test_task_fails_once_retries_are_exhausted(self, pausing_task):
+        with patch.object(Task, "cancel", side_effect=NodeConnectionError("Refused")):
+            self._pause(pausing_task, retries=3)
+
+        pausing_task.refresh_from_db()
+        assert pausing_task.odm_status == ODMTaskStatus.FAILED
+
+    def test_rejected_call_is_not_retried(self, pausing_task):
+        with patch.object(Task, "cancel", side_effect=NodeResponseError("No")):
+            self._pause(pausing_task)
+
+        pausing_task.refresh_from_db()
+        assert pausing_task.odm_status == ODMTaskStatus.FAILED
+
+    def test_open_circuit_spares_the_node(self, pausing_task):
+        with patch.object(
+            Task, "cancel", side_effect=NodeConnectionError("Refused")
+        ) as cancel:
+            for retries in range(2):
+                with pytest.raises(Retry):
+                    self._pause(pausing_task, retries)
+            with pytest.raises(Retry) as retry:
+                self._pause(pausing_task, 2)
+
+        assert cancel.call_count == 2
+        # Retried no earlier than the circuit closes
+        assert 29 <= retry.value.when <= 30
+
+    def test_success_closes_the_circuit(self, settings, pausing_task):
+        with patch.object(
+            Task, "cancel", side_effect=[NodeConnectionError("Refused"), True]
+        ):
+            with pytest.raises(Retry):
+                self._pause(pausing_task)
+            self._pause(pausing_task, retries=1)
+
+        failures = node_failures_key(node_id(settings.NODEODM_URL))
+        assert not get_redis_connection("default").exists(failures)
+
+    def test_retried_webhook_ingests_results_once(
+        self, initialized_mock_task, odm_task, create_task_result_files
+    ):
+        odm_task.status = ODMTaskStatus.QUEUED
+        odm_task.step = ODMProcessingStage.ODM_GEOREFERENCING.next_stage
+        odm_task.save()
+        expected_types = create_task_result_files(
+            odm_task, ODMProcessingStage.ODM_GEOREFERENCING.stage_results
+        )
+
+        with patch.object(
+            Task, "restart", side_effect=[NodeServerError("Unexpected"), True]
+        ):
+            with pytest.raises(Retry):
+                on_task_nodeodm_webhook.apply(args=[odm_task.uuid]).get()
+            on_task_nodeodm_webhook.apply(args=[odm_task.uuid], retries=1).get()
+
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+        results = ODMTaskResult.objects.filter(workspace=odm_task.workspace)
+        assert results.count() == len(expected_types)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.usefixtures("mock_redis")
 class TestOnWorkspaceImagesUploaded:
-    def test_makes_thumbnail_for_each_image(self, image_factory):
-        image1 = image_factory()
-        image2 = image_factory()
+    @pytest.fixture
+    def images(self, workspace_factory, image_factory, image_file_factory):
+        workspace = workspace_factory()
+        return [
+            image_factory(
+                workspace=workspace,
+                name=f"image_{i}.jpg",
+                image_file=image_file_factory(name=f"image_{i}.jpg"),
+            )
+            for i in range(5)
+        ]
 
-        with patch.object(Image, "make_thumbnail") as mock_make_thumbnail:
-            on_workspace_images_uploaded.apply(args=([image1.uuid, image2.uuid],))
+    def _upload(self, image_uuids):
+        with patch("app.api.sse.events.publish_events") as mock_publish:
+            on_workspace_images_uploaded.apply(args=(image_uuids,))
+        return [
+            event.data for call in mock_publish.call_args_list for event in call.args[0]
+        ]
 
-        assert mock_make_thumbnail.call_count == 2
+    def test_makes_thumbnail_for_each_image(self, images):
+        self._upload([image.uuid for image in images])
 
-    def test_ignores_images_not_in_uuid_list(self, image_factory):
-        included = image_factory()
-        image_factory()
+        thumbnails = Image.objects.filter(is_thumbnail=True)
+        assert sorted(thumbnails.values_list("name", flat=True)) == [
+            image.name for image in images
+        ]
+        for thumbnail in thumbnails:
+            with PILImage.open(thumbnail.image_file.path) as im:
+                assert max(im.size) <= 256
 
-        with patch.object(Image, "make_thumbnail") as mock_make_thumbnail:
-            on_workspace_images_uploaded.apply(args=([included.uuid],))
+    def test_renders_previews_with_thumbnails(self, images):
+        self._upload([images[0].uuid])
 
-        mock_make_thumbnail.assert_called_once()
+        for size in (128, 512, 1600):
+            assert default_storage.exists(images[0].preview_name(size))
+        assert not default_storage.exists(images[1].preview_name(128))
+
+    def test_emits_one_event_per_chunk(self, settings, images):
+        settings.THUMBNAIL_CHUNK_SIZE = 2
+        events = self._upload([image.uuid for image in images])
+
+        assert [(event["chunk"], event["chunks"]) for event in events] == [
+            (1, 3),
+            (2, 3),
+            (3, 3),
+        ]
+        assert [event["created"] for event in events] == [2, 2, 1]
+        assert {event["uuid"] for event in events} == {str(images[0].workspace.uuid)}
+
+    def test_thumbnails_are_bulk_inserted(self, images):
+        with patch.object(
+            Image.objects, "bulk_create", wraps=Image.objects.bulk_create
+        ) as mock_bulk_create:
+            self._upload([image.uuid for image in images])
+
+        mock_bulk_create.assert_called_once()
+        assert len(mock_bulk_create.call_args.args[0]) == len(images)
+
+    def test_existing_thumbnails_are_skipped(self, images):
+        self._upload([images[0].uuid])
+        events = self._upload([image.uuid for image in images])
+
+        assert events[0]["created"] == len(images) - 1
+        assert events[0]["skipped"] == 1
+        assert Image.objects.filter(is_thumbnail=True).count() == len(images)
+
+    def test_rerun_is_a_lookup_not_a_decode(self, images):
+        image_uuids = [str(image.uuid) for image in images]
+        make_thumbnails.apply(args=(image_uuids, 1, 1))
+
+        with patch("app.api.models.image.render_variants") as mock_render:
+            result = make_thumbnails.apply(args=(image_uuids, 1, 1)).get()
+
+        mock_render.assert_not_called()
+        assert result == {"created": 0, "skipped": len(images), "hits": 0}
+
+    def test_identical_content_is_a_cache_hit(self, images):
+        image_uuids = [str(image.uuid) for image in images]
+        result = make_thumbnails.apply(args=(image_uuids, 1, 1)).get()
+
+        # Every fixture image has the same bytes, so only the first is decoded
+        assert result == {"created": len(images), "skipped": 0, "hits": 4}
+        thumbnails = Image.objects.filter(is_thumbnail=True)
+        assert len({thumbnail.source_hash for thumbnail in thumbnails}) == 1
+
+    def test_cache_hit_gets_previews(self, images):
+        make_thumbnails.apply(args=([str(images[0].uuid)], 1, 1))
+
+        with patch("app.api.models.image.render_variants") as mock_render:
+            result = make_thumbnails.apply(args=([str(images[1].uuid)], 1, 1)).get()
+
+        mock_render.assert_not_called()
+        assert result == {"created": 1, "skipped": 0, "hits": 1}
+        for name in images[1].preview_names():
+            assert default_storage.exists(name)
+
+    def test_thumbnail_inserted_by_an_overlapping_run_is_skipped(
+        self, settings, images
+    ):
+        image = images[0]
+        render_variants = image_module.render_variants
+
+        def _render(path, variants):
+            # Another worker stores the same thumbnail meanwhile
+            Image.objects.create(
+                workspace=image.workspace,
+                name=image.file_name,
+                is_thumbnail=True,
+                image_file="thumbnails/other.png",
+            )
+            return render_variants(path, variants)
+
+        with patch.object(image_module, "render_variants", side_effect=_render):
+            result = make_thumbnails.apply(args=([str(image.uuid)], 1, 1)).get()
+
+        assert result == {"created": 0, "skipped": 1, "hits": 0}
+        thumbnail = Image.objects.get(is_thumbnail=True)
+        assert thumbnail.image_file.name == "thumbnails/other.png"
+        _, files = default_storage.listdir(
+            str(Path(settings.THUMBNAILS_DIR_NAME) / str(image.workspace.uuid))
+        )
+        assert files == []
+
+    def test_changed_source_replaces_thumbnail(self, images):
+        image = images[0]
+        make_thumbnails.apply(args=([str(image.uuid)], 1, 1))
+        old = Image.objects.get(is_thumbnail=True)
+
+        PILImage.new("RGB", (64, 32), color="blue").save(
+            image.image_file.path, format="JPEG"
+        )
+        result = make_thumbnails.apply(args=([str(image.uuid)], 1, 1)).get()
+
+        assert result == {"created": 1, "skipped": 0, "hits": 0}
+        new = Image.objects.get(is_thumbnail=True)
+        assert new.source_hash != old.source_hash
+        assert not default_storage.exists(old.image_file.name)
+
+    def test_ignores_images_not_in_uuid_list(self, images):
+        self._upload([images[0].uuid])
+        assert Image.objects.filter(is_thumbnail=True).count() == 1
 
     def test_handles_empty_uuid_list(self):
-        with patch.object(Image, "make_thumbnail") as mock_make_thumbnail:
-            on_workspace_images_uploaded.apply(args=([],))
+        assert self._upload([]) == []
+        assert not Image.objects.filter(is_thumbnail=True).exists()
+
+    def test_nonexistent_uuids_are_safely_ignored(self, images):
+        self._upload([images[0].uuid, uuid4()])
+        assert Image.objects.filter(is_thumbnail=True).count() == 1
+
+
+class TestTaskRouting:
+    @pytest.fixture
+    def route(self):
+        from app.config.celery import app
+
+        def _route(task):
+            options = app.amqp.router.route({}, task.name)
+            return options["queue"].name, options.get("priority")
+
+        return _route
+
+    @pytest.mark.parametrize("task", [on_task_pause, on_task_resume, on_task_cancel])
+    def test_control_tasks_jump_the_queue(self, route, task):
+        assert route(task) == ("control", 0)
+
+    @pytest.mark.parametrize(
+        "task, queue",
+        [
+            (on_task_create, "nodeodm"),
+            (on_task_nodeodm_webhook, "results"),
+            (on_task_finish, "results"),
+            (make_thumbnails, "thumbnails"),
+            (on_workspace_images_uploaded, "thumbnails"),
+        ],
+    )
+    def test_bulk_tasks_have_their_own_queue(self, route, task, queue):
+        assert route(task)[0] == queue
 
-        mock_make_thumbnail.assert_not_called()
+    def test_results_are_not_stored(self):
+        tasks = [on_task_create, on_task_nodeodm_webhook, on_workspace_images_uploaded]
+        assert all(task.ignore_result for task in tasks)
 
-    def test_nonexistent_uuids_are_safely_ignored(self, image_factory):
-        image = image_factory()
-        missing_uuid = uuid4()
+    def test_thumbnail_counts_are_kept(self):
+        assert not make_thumbnails.ignore_result
 
-        with patch.object(Image, "make_thumbnail") as mock_make_thumbnail:
-            on_workspace_images_uploaded.apply(args=([image.uuid, missing_uuid],))
+    def test_uploads_are_not_redelivered_while_running(self):
+        from app.config.celery import app
 
-        mock_make_thumbnail.assert_called_once()
+        options = app.conf.broker_transport_options
+        assert on_task_create.acks_late
+        # The Redis transport redelivers after one hour by default
+        assert options["visibility_timeout"] > 3600
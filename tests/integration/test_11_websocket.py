@@ -0,0 +1,179 @@
+import fakeredis
+import pytest
+from asgiref.sync import sync_to_async
+
+from app.api.sse import emit_event, user_stream
+from app.api.sse.websocket import (
+    CLOSE_NOT_FOUND,
+    CLOSE_UNAUTHORIZED,
+    WEBSOCKET_PATH,
+    websocket_application,
+)
+from tests.utils import WebSocketTestClient
+from tests.utils.auth_clients import ServiceAuth
+
+
+@pytest.fixture
+def jwt_headers(valid_token):
+    return {"Authorization": f"Bearer {valid_token}"}
+
+
+@pytest.fixture
+def service_headers(db):
+    auth = ServiceAuth()
+    return {"Authorization": auth.build_service_auth_header("GET", WEBSOCKET_PATH)}
+
+
+async def open_socket(headers=None, subprotocols=None, **kwargs):
+    socket = WebSocketTestClient(
+        websocket_application,
+        kwargs.pop("path", WEBSOCKET_PATH),
+        headers=headers,
+        subprotocols=subprotocols,
+        **kwargs,
+    )
+    return socket, await socket.connect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_redis")
+class TestWebSocketHandshake:
+    async def test_rejects_anonymous(self):
+        _, message = await open_socket()
+        assert message == {"type": "websocket.close", "code": CLOSE_UNAUTHORIZED}
+
+    async def test_rejects_unknown_path(self, jwt_headers):
+        _, message = await open_socket(jwt_headers, path="/api/ws/other")
+        assert message["code"] == CLOSE_NOT_FOUND
+
+    @pytest.mark.parametrize(
+        "offered, accepted",
+        [
+            (["msgpack", "json"], "msgpack"),
+            (["json", "msgpack"], "json"),
+            (["v9.unknown"], None),
+            ([], None),
+        ],
+    )
+    async def test_negotiates_framing(self, jwt_headers, offered, accepted):
+        socket, message = await open_socket(jwt_headers, offered)
+        assert message == {"type": "websocket.accept", "subprotocol": accepted}
+        await socket.disconnect()
+
+    async def test_accepts_token_query_parameter(self, valid_token):
+        socket, message = await open_socket(query_string=f"token={valid_token}")
+        assert message["type"] == "websocket.accept"
+        await socket.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("mock_redis")
+class TestWebSocketSubscriptions:
+    async def test_user_receives_own_events_as_json(self, jwt_headers):
+        socket, _ = await open_socket(jwt_headers, ["json"])
+        await socket.send_json({"action": "subscribe", "events": ["task:*"]})
+        subscribed = await socket.receive_json()
+        assert subscribed["event"] == "subscribed"
+        topic = subscribed["data"]["topic"]
+
+        emit_event("user_999", "gcp:created", {"uuid": "g"})
+        emit_event("user_999", "task:updated", {"uuid": "t", "step": "x"})
+
+        message = await socket.receive_json()
+        assert message["topic"] == topic
+        assert message["event"] == "task:updated"
+        assert message["data"]["uuid"] == "t"
+        assert message["id"]
+        await socket.disconnect()
+
+    async def test_user_cannot_subscribe_to_other_users(self, jwt_headers):
+        socket, _ = await open_socket(jwt_headers)
+        await socket.send_json({"action": "subscribe", "user_id": "user_111"})
+        error = await socket.receive_json()
+        assert error["event"] == "error"
+        await socket.disconnect()
+
+    async def test_unknown_event_pattern_is_rejected(self, jwt_headers):
+        socket, _ = await open_socket(jwt_headers)
+        await socket.send_json({"action": "subscribe", "events": ["nope:*"]})
+        error = await socket.receive_json()
+        assert error["event"] == "error"
+        assert "nope:*" in error["data"]["detail"]
+        await socket.disconnect()
+
+    async def test_service_multiplexes_topics_over_msgpack(
+        self, service_headers, workspace_factory
+    ):
+        workspace = await sync_to_async(workspace_factory)(user_id="user_222")
+        socket, _ = await open_socket(service_headers, ["msgpack"])
+
+        await socket.send_msgpack({"action": "subscribe", "user_id": "user_111"})
+        first = (await socket.receive_msgpack())["data"]["topic"]
+        await socket.send_msgpack(
+            {"action": "subscribe", "workspace_uuid": str(workspace.uuid)}
+        )
+        second = await socket.receive_msgpack()
+        assert second["data"]["user_id"] == "user_222"
+
+        emit_event("user_111", "workspace:created", {"uuid": "a", "name": "a"})
+        emit_event("user_222", "task:created", {"uuid": "other"}, workspace_uuid="x")
+        emit_event(
+            "user_222",
+            "workspace:updated",
+            {"uuid": str(workspace.uuid), "name": "b"},
+            workspace_uuid=workspace.uuid,
+        )
+
+        received = {
+            (message["topic"], message["event"])
+            for message in [
+                await socket.receive_msgpack(),
+                await socket.receive_msgpack(),
+            ]
+        }
+        assert received == {
+            (first, "workspace:created"),
+            (second["data"]["topic"], "workspace:updated"),
+        }
+        await socket.disconnect()
+
+    async def test_unsubscribe_stops_delivery(self, jwt_headers):
+        socket, _ = await open_socket(jwt_headers)
+        await socket.send_json({"action": "subscribe"})
+        topic = (await socket.receive_json())["data"]["topic"]
+
+        await socket.send_json({"action": "unsubscribe", "topic": topic})
+        assert (await socket.receive_json())["event"] == "unsubscribed"
+
+        emit_event("user_999", "task:updated", {"uuid": "t"})
+        with pytest.raises(TimeoutError):
+            await socket.receive(timeout=0.3)
+        await socket.disconnect()
+
+    async def test_trimmed_replay_flags_resync_and_keeps_the_topic(
+        self, jwt_headers, mock_redis
+    ):
+        for name in ("first", "second", "third"):
+            emit_event("user_999", "workspace:updated", {"uuid": name, "name": name})
+        redis = fakeredis.FakeRedis(server=mock_redis)
+        stream = redis.xrange(user_stream("user_999"))
+        redis.xtrim(user_stream("user_999"), maxlen=1, approximate=False)
+
+        socket, _ = await open_socket(jwt_headers)
+        await socket.send_json(
+            {"action": "subscribe", "last_event_id": stream[0][0].decode()}
+        )
+        topic = (await socket.receive_json())["data"]["topic"]
+
+        resync = await socket.receive_json()
+        assert resync["event"] == "resync"
+        assert resync["data"]["reason"] == "trimmed"
+        assert (await socket.receive_json())["data"]["uuid"] == "third"
+
+        emit_event("user_999", "task:updated", {"uuid": "live"})
+        assert (await socket.receive_json())["data"]["uuid"] == "live"
+        await socket.send_json({"action": "unsubscribe", "topic": topic})
+        assert (await socket.receive_json())["event"] == "unsubscribed"
+        await socket.disconnect()
@@ -0,0 +1,270 @@
+import json
+import time
+import pytest
+from django_redis import get_redis_connection
+
+from app.api.constants.odm import ODMTaskStatus
+from app.api.constants.odm_nodes import (
+    NoNodeAvailableError,
+    NodeCircuitBreaker,
+    NodeCircuitOpenError,
+    NodeODMRegistry,
+    node_circuit_key,
+    node_id,
+    node_info_key,
+)
+from app.api.controllers.node import NodeControllerInternal
+from app.api.tasks.task import on_task_create, on_task_pause
+from tests.utils import AuthenticatedTestClient, AuthStrategyEnum
+
+UNREACHABLE_URL = "http://nonexistent.invalid:9999"
+
+
+@pytest.fixture
+def cache_node():
+    """Put a node's ``/info`` in the cache, as if it had just been probed."""
+
+    def _cache(url, healthy=True, **info):
+        probe = {
+            "checked_at": time.time(),
+            "healthy": healthy,
+            "info": {
+                "version": "2.3.2",
+                "task_queue_count": 0,
+                "cpu_cores": 4,
+                "engine": "odm",
+                "engine_version": "3.0.0",
+                **info,
+            }
+            if healthy
+            else None,
+        }
+        get_redis_connection("default").set(
+            node_info_key(node_id(url)), json.dumps(probe)
+        )
+
+    return _cache
+
+
+@pytest.fixture
+def two_nodes(settings, cache_node):
+    settings.NODEODM_URLS = ["http://node-a:3000", "http://node-b:3000"]
+    return settings.NODEODM_URLS
+
+
+@pytest.mark.usefixtures("mock_redis")
+class TestNodeODMRegistry:
+    def test_defaults_to_nodeodm_url(self, mock_odm_server):
+        (state,) = NodeODMRegistry().states()
+
+        assert state.url == mock_odm_server.base_url
+        assert state.healthy is True
+        assert state.info["cpu_cores"] == 4
+
+    def test_info_is_cached(self, mock_odm_server):
+        registry = NodeODMRegistry()
+        registry.states()
+        registry.states()
+
+        info_calls = [r for r, _ in mock_odm_server.httpserver.log if r.path == "/info"]
+        assert len(info_calls) == 1
+
+    def test_refresh_probes_again(self, mock_odm_server):
+        registry = NodeODMRegistry()
+        registry.states()
+        registry.states(refresh=True)
+
+        info_calls = [r for r, _ in mock_odm_server.httpserver.log if r.path == "/info"]
+        assert len(info_calls) == 2
+
+    def test_unreachable_node_is_unhealthy(self, settings, mock_odm_server):
+        settings.NODEODM_URLS = [UNREACHABLE_URL, mock_odm_server.base_url]
+        settings.NODEODM_CONNECT_TIMEOUT_SECONDS = 1
+
+        states = {state.url: state for state in NodeODMRegistry().states()}
+
+        assert states[UNREACHABLE_URL].healthy is False
+        assert states[UNREACHABLE_URL].error
+        assert NodeODMRegistry().select().url == mock_odm_server.base_url
+
+    def test_selects_least_loaded_node(self, two_nodes, cache_node):
+        cache_node(two_nodes[0], task_queue_count=6, cpu_cores=4)
+        cache_node(two_nodes[1], task_queue_count=6, cpu_cores=16)
+
+        assert NodeODMRegistry().select().url == two_nodes[1]
+
+    def test_prefers_more_free_memory_on_ties(self, two_nodes, cache_node):
+        cache_node(two_nodes[0], available_memory=1_000)
+        cache_node(two_nodes[1], available_memory=8_000)
+
+        assert NodeODMRegistry().select().url == two_nodes[1]
+
+    def test_assignments_spread_tasks_until_refresh(self, two_nodes, cache_node):
+        for url in two_nodes:
+            cache_node(url)
+        registry = NodeODMRegistry()
+
+        picked = {registry.select().url for _ in range(2)}
+
+        assert picked == set(two_nodes)
+
+    def test_skips_nodes_below_image_count(self, two_nodes, cache_node):
+        cache_node(two_nodes[0], max_images=10)
+        cache_node(two_nodes[1], max_images=None, task_queue_count=8)
+
+        assert NodeODMRegistry().select(image_count=50).url == two_nodes[1]
+
+    def test_drained_node_receives_no_tasks(self, two_nodes, cache_node):
+        cache_node(two_nodes[0])
+        cache_node(two_nodes[1], task_queue_count=8)
+        registry = NodeODMRegistry()
+
+        registry.drain(node_id(two_nodes[0]))
+        assert registry.select().url == two_nodes[1]
+
+        registry.undrain(node_id(two_nodes[0]))
+        assert registry.select().url == two_nodes[0]
+
+    def test_no_available_node_raises(self, two_nodes, cache_node):
+        cache_node(two_nodes[0], healthy=False)
+        cache_node(two_nodes[1])
+        NodeODMRegistry().drain(node_id(two_nodes[1]))
+
+        with pytest.raises(NoNodeAvailableError):
+            NodeODMRegistry().select()
+
+
+@pytest.mark.usefixtures("mock_redis")
+class TestNodeCircuitBreaker:
+    @pytest.fixture(autouse=True)
+    def threshold(self, settings):
+        settings.NODEODM_CIRCUIT_FAILURE_THRESHOLD = 2
+
+    def test_opens_after_repeated_failures(self, two_nodes):
+        breaker = NodeCircuitBreaker(two_nodes[0])
+        breaker.record_failure()
+        breaker.check()
+
+        breaker.record_failure()
+        with pytest.raises(NodeCircuitOpenError):
+            breaker.check()
+
+    def test_failure_after_cooldown_reopens_at_once(self, two_nodes):
+        breaker = NodeCircuitBreaker(two_nodes[0])
+        for _ in range(2):
+            breaker.record_failure()
+        # Cooldown over, failures still counted
+        breaker.conn.delete(node_circuit_key(breaker.id))
+        breaker.check()
+
+        breaker.record_failure()
+        with pytest.raises(NodeCircuitOpenError):
+            breaker.check()
+
+    def test_success_closes_the_circuit(self, two_nodes):
+        breaker = NodeCircuitBreaker(two_nodes[0])
+        for _ in range(2):
+            breaker.record_failure()
+
+        breaker.record_success()
+        breaker.check()
+        breaker.record_failure()
+        breaker.check()
+
+    def test_open_node_receives_no_tasks(self, two_nodes, cache_node):
+        cache_node(two_nodes[0])
+        cache_node(two_nodes[1], task_queue_count=8)
+        for _ in range(2):
+            NodeCircuitBreaker(two_nodes[0]).record_failure()
+
+        states = {state.url: state for state in NodeODMRegistry().states()}
+        assert states[two_nodes[0]].circuit_open is True
+        assert NodeODMRegistry().select().url == two_nodes[1]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestTaskNodeAssignment:
+    @pytest.fixture
+    def odm_task(self, odm_task_factory, image_factory, image_file_factory):
+        odm_task = odm_task_factory(status=ODMTaskStatus.QUEUED)
+        image_factory(
+            workspace=odm_task.workspace,
+            image_file=image_file_factory(name="test.jpg"),
+        )
+        return odm_task
+
+    def test_task_runs_on_the_node_it_was_scheduled_on(
+        self, settings, mock_odm_server, cache_node, odm_task
+    ):
+        settings.NODEODM_URLS = [UNREACHABLE_URL, mock_odm_server.base_url]
+        cache_node(UNREACHABLE_URL, healthy=False)
+
+        on_task_create.apply(args=[odm_task.uuid]).get()
+        odm_task.refresh_from_db()
+        assert odm_task.node_url == mock_odm_server.base_url
+        assert odm_task.odm_status == ODMTaskStatus.RUNNING
+
+        # Later calls follow the task, whatever the default node is
+        settings.NODEODM_URL = UNREACHABLE_URL
+        odm_task.status = ODMTaskStatus.PAUSING
+        odm_task.save()
+        on_task_pause.apply(args=[odm_task.uuid]).get()
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.PAUSED
+
+    def test_task_fails_without_available_node(self, settings, cache_node, odm_task):
+        settings.NODEODM_URLS = [UNREACHABLE_URL]
+        cache_node(UNREACHABLE_URL, healthy=False)
+
+        on_task_create.apply(args=[odm_task.uuid]).get()
+        odm_task.refresh_from_db()
+        assert odm_task.odm_status == ODMTaskStatus.FAILED
+        assert odm_task.node_url == ""
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("mock_redis")
+class TestNodeControllerInternal:
+    @pytest.fixture
+    def client(self):
+        return AuthenticatedTestClient(
+            NodeControllerInternal, auth=AuthStrategyEnum.service
+        )
+
+    def test_lists_nodes_without_tokens(self, client, two_nodes, cache_node):
+        cache_node(two_nodes[0], task_queue_count=2)
+        cache_node(two_nodes[1], healthy=False)
+
+        response = client.get("/")
+
+        assert response.status_code == 200
+        nodes = {node["id"]: node for node in response.json()}
+        assert nodes["node-a:3000"]["available"] is True
+        assert nodes["node-a:3000"]["load"] == 0.5
+        assert nodes["node-b:3000"]["available"] is False
+        assert all("url" not in node for node in nodes.values())
+
+    def test_drain_and_undrain(self, client, two_nodes, cache_node):
+        for url in two_nodes:
+            cache_node(url)
+
+        response = client.post("/node-a:3000/drain")
+        assert response.status_code == 200
+        assert response.json()["drained"] is True
+        assert NodeODMRegistry().select().url == two_nodes[1]
+
+        response = client.post("/node-a:3000/undrain")
+        assert response.json()["drained"] is False
+
+    def test_unknown_node_is_not_found(self, client, two_nodes):
+        response = client.post("/node-z:3000/drain")
+
+        assert response.status_code == 404
+
+    def test_requires_service_auth(self, two_nodes):
+        client = AuthenticatedTestClient(
+            NodeControllerInternal, auth=AuthStrategyEnum.jwt
+        )
+
+        assert client.get("/").status_code == 401
@@ -1,6 +1,11 @@
+import io
 import pytest
 import datetime
+from unittest.mock import patch
 from PIL import Image as PILImage
+from PIL.JpegImagePlugin import JpegImageFile
+
+from app.api.models.image import render_thumbnail, render_variants, thumbnail_key
 
 
 @pytest.mark.django_db
@@ -27,6 +32,17 @@ class TestImage:
             assert im.width <= 128
             assert im.height <= 128
 
+    def test_make_thumbnail_twice_returns_existing_thumbnail(
+        self, image_factory, image_file_factory
+    ):
+        original = image_factory(image_file=image_file_factory())
+        first = original.make_thumbnail()
+        second = original.make_thumbnail()
+
+        assert second == first
+        assert first.source_hash == thumbnail_key(original.image_file.path, (256, 256))
+        assert thumbnail_key(original.image_file.path, (128, 128)) != first.source_hash
+
     def test_make_thumbnail_on_thumbnail_returns_self(
         self, image_factory, image_file_factory
     ):
@@ -34,3 +50,37 @@ class TestImage:
         result = thumb.make_thumbnail()
         assert result.image_file == thumb.image_file
         assert result == thumb
+
+    def test_render_thumbnail_decodes_jpeg_in_draft_mode(self, tmp_path):
+        path = tmp_path / "large.jpg"
+        PILImage.new("RGB", (4000, 3000), color="blue").save(path, format="JPEG")
+
+        with patch.object(
+            JpegImageFile, "draft", autospec=True, side_effect=JpegImageFile.draft
+        ) as mock_draft:
+            content = render_thumbnail(path, size=(256, 256))
+
+        assert mock_draft.call_args_list[0].args[1:] == ("RGB", (256, 256))
+        with PILImage.open(io.BytesIO(content)) as im:
+            assert im.size == (256, 192)
+
+    def test_render_variants_decodes_once(self, tmp_path):
+        path = tmp_path / "large.jpg"
+        PILImage.new("RGB", (2000, 1000), color="green").save(path, format="JPEG")
+
+        with patch.object(PILImage, "open", wraps=PILImage.open) as mock_open:
+            variants = render_variants(
+                path,
+                [((128, 128), "PNG"), ((1600, 1600), "WEBP"), ((512, 512), "JPEG")],
+            )
+
+        mock_open.assert_called_once()
+        sizes = []
+        for content in variants:
+            with PILImage.open(io.BytesIO(content)) as im:
+                sizes.append((im.format, im.size))
+        assert sizes == [
+            ("PNG", (128, 64)),
+            ("WEBP", (1600, 800)),
+            ("JPEG", (512, 256)),
+        ]
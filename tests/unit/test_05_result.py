@@ -1,9 +1,14 @@
 import pytest
 import datetime
+import errno
+import hashlib
+import os
 from pathlib import Path
+from unittest.mock import patch
 from django.core.files import File
 
 from app.api.constants.odm import ODMTaskResultType
+from app.api.models.result import ODMTaskResult, ingest_file
 
 
 @pytest.mark.django_db
@@ -35,3 +40,97 @@ class TestODMTaskResult:
             / str(task_result.workspace.uuid)
         )
         assert uploaded_file_path.parent == expected_path
+
+
+class TestIngestFile:
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / "source" / "odm_orthophoto.tif"
+        path.parent.mkdir()
+        path.write_bytes(os.urandom(300 * 1024))
+        return path
+
+    @pytest.fixture
+    def dest(self, tmp_path):
+        return tmp_path / "dest.tif"
+
+    def test_links_file_on_same_filesystem(self, settings, source, dest):
+        settings.RESULTS_INGEST_MODE = "hardlink"
+
+        ingested = ingest_file(source, dest)
+
+        assert ingested.method in ("reflink", "hardlink")
+        assert dest.read_bytes() == source.read_bytes()
+        if ingested.method == "hardlink":
+            assert dest.stat().st_ino == source.stat().st_ino
+
+    def test_falls_back_to_copy_across_filesystems(self, settings, source, dest):
+        settings.RESULTS_INGEST_MODE = "hardlink"
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+
+        with (
+            patch("app.api.models.result._reflink", side_effect=cross_device),
+            patch("app.api.models.result.os.link", side_effect=cross_device),
+        ):
+            ingested = ingest_file(source, dest)
+
+        assert ingested.method == "copy"
+        assert dest.stat().st_ino != source.stat().st_ino
+        assert dest.read_bytes() == source.read_bytes()
+
+    def test_default_never_shares_the_inode(self, source, dest):
+        ingested = ingest_file(source, dest)
+
+        assert ingested.method in ("reflink", "copy")
+        assert dest.stat().st_ino != source.stat().st_ino
+        assert dest.read_bytes() == source.read_bytes()
+
+    def test_reflink_falls_back_to_copy(self, settings, source, dest):
+        settings.RESULTS_INGEST_MODE = "reflink"
+        unsupported = OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+        with (
+            patch("app.api.models.result._reflink", side_effect=unsupported),
+            patch("app.api.models.result.os.link") as mock_link,
+        ):
+            ingested = ingest_file(source, dest)
+
+        mock_link.assert_not_called()
+        assert ingested.method == "copy"
+        assert dest.read_bytes() == source.read_bytes()
+
+    def test_copy_hashes_in_the_same_pass(self, settings, source, dest):
+        settings.RESULTS_INGEST_MODE = "copy"
+        settings.RESULTS_COPY_BUFFER_SIZE = 64 * 1024
+
+        ingested = ingest_file(source, dest)
+
+        assert ingested.method == "copy"
+        assert ingested.size == source.stat().st_size
+        assert ingested.sha256 == hashlib.sha256(source.read_bytes()).hexdigest()
+        assert dest.read_bytes() == source.read_bytes()
+
+    @pytest.mark.parametrize("mode", ["reflink", "hardlink", "copy"])
+    def test_never_overwrites_destination(self, settings, source, dest, mode):
+        settings.RESULTS_INGEST_MODE = mode
+        dest.write_bytes(b"existing")
+
+        with pytest.raises(FileExistsError):
+            ingest_file(source, dest)
+        assert dest.read_bytes() == b"existing"
+
+    @pytest.mark.django_db
+    def test_result_stores_size_and_checksum(self, settings, source, workspace):
+        result = ODMTaskResult(
+            result_type=ODMTaskResultType.ORTHOPHOTO_GEOTIFF, workspace=workspace
+        )
+        result.ingest(source, "orthophoto.tif")
+        result.save()
+
+        result.refresh_from_db()
+        assert result.size == source.stat().st_size
+        assert result.sha256 == hashlib.sha256(source.read_bytes()).hexdigest()
+        assert Path(result.file.path).read_bytes() == source.read_bytes()
+        assert Path(result.file.path).parent == (
+            Path(settings.MEDIA_ROOT) / settings.RESULTS_DIR_NAME / str(workspace.uuid)
+        )
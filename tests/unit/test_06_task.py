@@ -1,7 +1,15 @@
 import pytest
 import datetime
+from django.utils import timezone
 
-from app.api.constants.odm import ODMTaskStatus, ODMProcessingStage
+from app.api.constants.odm import (
+    IllegalTransitionError,
+    ODMTaskStatus,
+    ODMProcessingStage,
+    TASK_TRANSITIONS,
+    check_transition,
+)
+from app.api.models.task import ODMTask
 
 
 @pytest.mark.django_db
@@ -29,3 +37,236 @@ class TestODMTask:
         assert isinstance(options, dict)
         if task.odm_step == ODMProcessingStage.DATASET:
             assert options.get("param") == 123
+
+    def test_run_options_cover_the_whole_run(self, odm_task_factory, settings):
+        settings.NODEODM_COALESCE_STAGES = True
+        task = odm_task_factory(
+            step=ODMProcessingStage.OPENSFM,
+            options={
+                ODMProcessingStage.OPENSFM: {"min-num-features": 2000},
+                ODMProcessingStage.ODM_MESHING: {"mesh-size": 100_000},
+                ODMProcessingStage.ODM_DEM: {"dem-resolution": 30.0},
+            },
+        )
+
+        assert task.run_end == ODMProcessingStage.MVS_TEXTURING
+        assert task.get_run_options() == {
+            "min-num-features": 2000,
+            "mesh-size": 100_000,
+            "rerun-from": "opensfm",
+            "end-with": "mvs_texturing",
+        }
+
+    def test_run_options_resume_from_the_running_stage(
+        self, odm_task_factory, settings
+    ):
+        settings.NODEODM_COALESCE_STAGES = True
+        task = odm_task_factory(
+            step=ODMProcessingStage.OPENSFM,
+            run_step=ODMProcessingStage.ODM_MESHING,
+            options={
+                ODMProcessingStage.OPENSFM: {"min-num-features": 2000},
+                ODMProcessingStage.ODM_MESHING: {"mesh-size": 100_000},
+            },
+        )
+
+        assert task.get_run_options() == {
+            "mesh-size": 100_000,
+            "rerun-from": "odm_meshing",
+            "end-with": "mvs_texturing",
+        }
+
+    def test_pause_keeps_the_running_stage(self, odm_task_factory):
+        task = odm_task_factory(
+            status=ODMTaskStatus.RUNNING,
+            step=ODMProcessingStage.OPENSFM,
+            run_step=ODMProcessingStage.ODM_MESHING,
+        )
+
+        assert task.transition(ODMTaskStatus.PAUSING)
+        task.refresh_from_db()
+        assert task.run_step == ODMProcessingStage.ODM_MESHING
+
+    def test_next_run_clears_the_running_stage(self, odm_task_factory, settings):
+        settings.NODEODM_COALESCE_STAGES = True
+        task = odm_task_factory(
+            status=ODMTaskStatus.RUNNING,
+            step=ODMProcessingStage.OPENSFM,
+            run_step=ODMProcessingStage.MVS_TEXTURING,
+        )
+
+        assert task.transition(
+            ODMTaskStatus.QUEUED, ODMProcessingStage.ODM_GEOREFERENCING
+        )
+        task.refresh_from_db()
+        assert task.run_step == ""
+
+    def test_run_options_without_coalescing(self, odm_task_factory, settings):
+        settings.NODEODM_COALESCE_STAGES = False
+        task = odm_task_factory(step=ODMProcessingStage.OPENSFM)
+
+        assert task.run_end == ODMProcessingStage.OPENSFM
+        assert task.get_run_options() == {
+            "rerun-from": "opensfm",
+            "end-with": "opensfm",
+        }
+
+
+class TestExecutionPlan:
+    def test_coalesces_stages_without_results(self):
+        assert ODMProcessingStage.execution_plan() == [
+            (ODMProcessingStage.DATASET, ODMProcessingStage.MVS_TEXTURING),
+            (
+                ODMProcessingStage.ODM_GEOREFERENCING,
+                ODMProcessingStage.ODM_GEOREFERENCING,
+            ),
+            (ODMProcessingStage.ODM_DEM, ODMProcessingStage.ODM_DEM),
+            (ODMProcessingStage.ODM_ORTHOPHOTO, ODMProcessingStage.ODM_ORTHOPHOTO),
+            (ODMProcessingStage.ODM_REPORT, ODMProcessingStage.ODM_REPORT),
+            (ODMProcessingStage.ODM_POSTPROCESS, ODMProcessingStage.ODM_POSTPROCESS),
+        ]
+
+    @pytest.mark.parametrize("coalesce", [True, False])
+    def test_runs_cover_every_stage_once(self, coalesce):
+        plan = ODMProcessingStage.execution_plan(coalesce)
+
+        stages = [stage for start, end in plan for stage in start.through(end)]
+        assert stages == list(ODMProcessingStage)
+
+    def test_runs_end_at_every_stage_with_results(self):
+        ends = {end for _, end in ODMProcessingStage.execution_plan()}
+
+        assert {stage for stage in ODMProcessingStage if stage.stage_results} <= ends
+
+    def test_uncoalesced_plan_runs_each_stage_alone(self):
+        plan = ODMProcessingStage.execution_plan(coalesce=False)
+
+        assert plan == [(stage, stage) for stage in ODMProcessingStage]
+
+    @pytest.mark.parametrize(
+        "stage,end",
+        [
+            (ODMProcessingStage.DATASET, ODMProcessingStage.MVS_TEXTURING),
+            (ODMProcessingStage.ODM_MESHING, ODMProcessingStage.MVS_TEXTURING),
+            (ODMProcessingStage.ODM_DEM, ODMProcessingStage.ODM_DEM),
+        ],
+    )
+    def test_run_end(self, stage, end):
+        assert stage.run_end() == end
+
+
+class TestTaskTransitions:
+    MESHING = ODMProcessingStage.ODM_MESHING
+    LAST = ODMProcessingStage.ODM_POSTPROCESS
+
+    def test_every_status_has_rules(self):
+        assert set(TASK_TRANSITIONS) == set(ODMTaskStatus)
+
+    def test_terminal_states_are_final(self):
+        for status in ODMTaskStatus.terminal_states():
+            assert TASK_TRANSITIONS[status] == {}
+
+    def test_every_non_terminal_state_can_fail(self):
+        for status in ODMTaskStatus.non_terminal_states():
+            assert ODMTaskStatus.FAILED in TASK_TRANSITIONS[status]
+
+    @pytest.mark.parametrize(
+        "status,to_status",
+        [
+            (ODMTaskStatus.RUNNING, ODMTaskStatus.PAUSING),
+            (ODMTaskStatus.PAUSING, ODMTaskStatus.PAUSED),
+            (ODMTaskStatus.PAUSED, ODMTaskStatus.RESUMING),
+            (ODMTaskStatus.RESUMING, ODMTaskStatus.RUNNING),
+            (ODMTaskStatus.PAUSED, ODMTaskStatus.CANCELLING),
+            (ODMTaskStatus.CANCELLING, ODMTaskStatus.CANCELLED),
+        ],
+    )
+    def test_legal_transitions(self, status, to_status):
+        check_transition(status, self.MESHING, to_status, self.MESHING)
+
+    @pytest.mark.parametrize(
+        "status,to_status",
+        [
+            (ODMTaskStatus.PAUSING, ODMTaskStatus.RUNNING),
+            (ODMTaskStatus.RUNNING, ODMTaskStatus.RESUMING),
+            (ODMTaskStatus.PAUSED, ODMTaskStatus.PAUSING),
+            (ODMTaskStatus.CANCELLING, ODMTaskStatus.RUNNING),
+            (ODMTaskStatus.COMPLETED, ODMTaskStatus.FAILED),
+        ],
+    )
+    def test_illegal_transitions(self, status, to_status):
+        with pytest.raises(IllegalTransitionError):
+            check_transition(status, self.MESHING, to_status, self.MESHING)
+
+    def test_run_end_moves_to_the_next_run_only(self):
+        next_run = ODMProcessingStage.ODM_GEOREFERENCING
+        check_transition(
+            ODMTaskStatus.RUNNING, self.MESHING, ODMTaskStatus.QUEUED, next_run
+        )
+
+        for step in (self.MESHING, ODMProcessingStage.MVS_TEXTURING, self.LAST):
+            with pytest.raises(IllegalTransitionError):
+                check_transition(
+                    ODMTaskStatus.RUNNING, self.MESHING, ODMTaskStatus.QUEUED, step
+                )
+
+    def test_finishing_only_after_the_last_run(self):
+        check_transition(
+            ODMTaskStatus.RUNNING, self.LAST, ODMTaskStatus.FINISHING, self.LAST
+        )
+
+        with pytest.raises(IllegalTransitionError):
+            check_transition(
+                ODMTaskStatus.RUNNING,
+                self.MESHING,
+                ODMTaskStatus.FINISHING,
+                self.MESHING,
+            )
+
+    def test_step_cannot_change_with_other_transitions(self):
+        with pytest.raises(IllegalTransitionError):
+            check_transition(
+                ODMTaskStatus.RUNNING,
+                self.MESHING,
+                ODMTaskStatus.PAUSING,
+                ODMProcessingStage.ODM_GEOREFERENCING,
+            )
+
+
+@pytest.mark.django_db
+class TestODMTaskTransition:
+    def test_transition_is_logged_with_its_duration(self, odm_task_factory):
+        task = odm_task_factory(
+            status=ODMTaskStatus.RUNNING,
+            status_changed_at=timezone.now() - datetime.timedelta(seconds=30),
+        )
+
+        assert task.transition(ODMTaskStatus.PAUSING) is True
+
+        task.refresh_from_db()
+        assert task.odm_status == ODMTaskStatus.PAUSING
+        (logged,) = task.transitions.all()
+        assert (logged.from_status, logged.to_status) == ("running", "pausing")
+        assert logged.from_step == logged.to_step == task.step
+        assert logged.duration == pytest.approx(30, abs=5)
+
+    def test_stale_task_does_not_overwrite(self, odm_task_factory):
+        task = odm_task_factory(status=ODMTaskStatus.PAUSING)
+        stale = ODMTask.objects.get(uuid=task.uuid)
+        task.transition(ODMTaskStatus.CANCELLING)
+
+        assert stale.transition(ODMTaskStatus.PAUSED) is False
+
+        task.refresh_from_db()
+        assert task.odm_status == ODMTaskStatus.CANCELLING
+        assert task.transitions.count() == 1
+
+    def test_illegal_transition_changes_nothing(self, odm_task_factory):
+        task = odm_task_factory(status=ODMTaskStatus.COMPLETED)
+
+        with pytest.raises(IllegalTransitionError):
+            task.transition(ODMTaskStatus.RUNNING)
+
+        task.refresh_from_db()
+        assert task.odm_status == ODMTaskStatus.COMPLETED
+        assert not task.transitions.exists()
@@ -13,6 +13,7 @@ from .factories import (
 )
 from .crud import APITestSuite
 from .server_mocks import NodeODMMockHTTPServer
+from .websocket import WebSocketTestClient
 
 __all__ = [
     "AuthStrategyEnum",
@@ -26,4 +27,5 @@ __all__ = [
     "GroundControlPointFactory",
     "NodeODMMockHTTPServer",
     "APITestSuite",
+    "WebSocketTestClient",
 ]
@@ -171,7 +171,7 @@ class MockODMTaskManager:
 
     def create_shortcut(self, uuid: str, name: Optional[str]) -> MockODMTask:
         task = self.create_init(uuid, name, [])
-        self.commit(uuid)  # Start immediately
+        task.commit()  # Start immediately
         return task
 
     def remove(self, uuid: str) -> bool:
@@ -0,0 +1,64 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+import msgpack
+
+
+class WebSocketTestClient:
+    """Drives an ASGI application through a single WebSocket connection."""
+
+    def __init__(
+        self,
+        application,
+        path: str,
+        headers: Optional[Dict[str, str]] = None,
+        subprotocols: Optional[List[str]] = None,
+        query_string: str = "",
+    ):
+        self.scope = {
+            "type": "websocket",
+            "path": path,
+            "query_string": query_string.encode(),
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+            "subprotocols": subprotocols or [],
+        }
+        self.application = application
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self, timeout: float = 2) -> Dict[str, Any]:
+        self._task = asyncio.create_task(
+            self.application(self.scope, self._inbox.get, self._outbox.put)
+        )
+        await self._inbox.put({"type": "websocket.connect"})
+        return await self.receive(timeout)
+
+    async def receive(self, timeout: float = 2) -> Dict[str, Any]:
+        try:
+            return await asyncio.wait_for(self._outbox.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("WebSocket did not send anything in time.")
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        await self._inbox.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def send_msgpack(self, data: Dict[str, Any]) -> None:
+        await self._inbox.put(
+            {"type": "websocket.receive", "bytes": msgpack.packb(data)}
+        )
+
+    async def receive_json(self, timeout: float = 2) -> Dict[str, Any]:
+        return json.loads((await self.receive(timeout))["text"])
+
+    async def receive_msgpack(self, timeout: float = 2) -> Dict[str, Any]:
+        return msgpack.unpackb((await self.receive(timeout))["bytes"])
+
+    async def disconnect(self) -> None:
+        await self._inbox.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task is not None:
+            await asyncio.wait_for(self._task, timeout=2)